@@ -8,7 +8,9 @@ from flask import Blueprint, request, jsonify
 import psycopg2
 import redis
 import os
+from dataclasses import asdict
 from backend.modules.logger_system import SmartLogger, LogCategory
+from backend.database.database_manager import db_manager
 
 logger = SmartLogger("admin_routes")
 admin_blueprint = Blueprint('admin', __name__)
@@ -327,27 +329,16 @@ def get_database_stats():
     try:
         logger.info(LogCategory.SYSTEM, "Buscando estatísticas do banco de dados")
         
-        # Conectar ao banco
-        database_url = os.getenv('DATABASE_URL')
-        if not database_url:
+        # Linha única mantida por triggers (sem COUNT/SUM por requisição)
+        stats = db_manager.get_database_stats()
+        if not stats.get('connected'):
             return jsonify({
                 'success': False,
-                'error': 'DATABASE_URL não encontrada'
+                'error': stats.get('error', 'Banco de dados não conectado')
             }), 500
         
-        conn = psycopg2.connect(database_url)
-        cursor = conn.cursor()
-        
-        # Contar clientes
-        cursor.execute("SELECT COUNT(*) FROM customers")
-        clients_count = cursor.fetchone()[0]
-        
-        # Contar conversas
-        cursor.execute("SELECT COUNT(*) FROM conversation_contexts")
-        conversations_count = cursor.fetchone()[0]
-        
-        cursor.close()
-        conn.close()
+        clients_count = stats['customers_total']
+        conversations_count = stats['conversations_total']
         
         logger.info(LogCategory.SYSTEM, f"Estatísticas: {clients_count} clientes, {conversations_count} conversas")
         
@@ -355,6 +346,9 @@ def get_database_stats():
             'success': True,
             'clients_count': clients_count,
             'conversations_count': conversations_count,
+            'customers_with_debt': stats['customers_with_debt'],
+            'total_debt': stats['total_debt'],
+            'stats_updated_at': stats['stats_updated_at'],
             'total_records': clients_count + conversations_count
         })
         
@@ -365,6 +359,137 @@ def get_database_stats():
             'error': str(e)
         }), 500
 
+@admin_blueprint.route('/admin/database/query-stats', methods=['GET'])
+def get_database_query_stats():
+    """Latência por instrução SQL (p50/p95/p99, linhas, erros e consultas lentas)"""
+    try:
+        top = request.args.get('top', 20, type=int)
+        order_by = request.args.get('order_by', 'total_ms')
+        if order_by not in ('total_ms', 'avg_ms', 'max_ms', 'p95_ms', 'p99_ms', 'calls', 'errors', 'rows'):
+            return jsonify({
+                'success': False,
+                'error': f'order_by inválido: {order_by}'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            **db_manager.get_query_stats(top, order_by)
+        })
+        
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao buscar métricas de consultas: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@admin_blueprint.route('/admin/database/query-stats/reset', methods=['POST'])
+def reset_database_query_stats():
+    """Zerar as métricas de consultas"""
+    db_manager.reset_query_stats()
+    logger.info(LogCategory.SYSTEM, "Métricas de consultas zeradas")
+    return jsonify({'success': True})
+
+@admin_blueprint.route('/admin/database/partitions', methods=['GET'])
+def get_database_partitions():
+    """Listar partições mensais com linhas estimadas e tamanho"""
+    try:
+        from backend.database.partition_manager import partition_manager
+        
+        return jsonify({
+            'success': True,
+            'partitions': partition_manager.get_partition_stats()
+        })
+        
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao listar partições: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@admin_blueprint.route('/admin/database/partitions/maintenance', methods=['POST'])
+def run_database_partition_maintenance():
+    """Criar partições futuras e remover as expiradas (agendar mensalmente)"""
+    try:
+        from backend.database.partition_manager import partition_manager
+        
+        result = partition_manager.run_maintenance()
+        logger.info(LogCategory.SYSTEM, f"Manutenção de partições: {len(result['dropped'])} removidas")
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+        
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro na manutenção de partições: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@admin_blueprint.route('/admin/cache/warm', methods=['POST'])
+def warm_cache():
+    """Gravar os clientes (todos ou de uma empresa) no cache L2 antes de uma campanha"""
+    try:
+        from backend.modules.customer_data_manager import customer_data_manager
+
+        if not customer_data_manager.l2_cache:
+            return jsonify({
+                'success': False,
+                'error': 'Cache L2 desabilitado (REDIS_URL não configurada)'
+            }), 400
+
+        data = request.get_json(silent=True) or {}
+        empresa = data.get('empresa')
+        ttl = data.get('ttl_seconds')
+        if ttl is not None and (not isinstance(ttl, int) or ttl <= 0):
+            return jsonify({
+                'success': False,
+                'error': 'ttl_seconds deve ser um inteiro positivo'
+            }), 400
+
+        warmed = customer_data_manager.warm_customer_cache(empresa, ttl)
+        logger.info(LogCategory.SYSTEM, f"Cache L2 aquecido com {warmed} clientes")
+
+        return jsonify({
+            'success': True,
+            'customers_cached': warmed,
+            'cache': customer_data_manager.l2_cache.get_metrics()
+        })
+
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao aquecer cache: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@admin_blueprint.route('/admin/cache/phone-filter/rebuild', methods=['POST'])
+def rebuild_phone_filter():
+    """Reconstruir o filtro de telefones dos clientes (chamar após importar clientes)"""
+    try:
+        from backend.modules.customer_data_manager import customer_data_manager
+
+        if not customer_data_manager.rebuild_phone_filter():
+            return jsonify({
+                'success': False,
+                'error': 'Falha ao reconstruir o filtro de telefones'
+            }), 500
+
+        return jsonify({
+            'success': True,
+            'phone_filter': customer_data_manager.phone_filter.get_metrics()
+        })
+
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao reconstruir filtro de telefones: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @admin_blueprint.route('/admin/database/clear', methods=['POST'])
 def clear_database():
     """Limpar todos os dados do banco de dados"""
@@ -526,3 +651,62 @@ def export_database():
             'success': False,
             'error': str(e)
         }), 500
+
+@admin_blueprint.route('/admin/database/customers', methods=['GET'])
+def list_customers():
+    """Listar clientes paginados por cursor (keyset em updated_at, protocolo)"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        cursor = request.args.get('cursor')
+        empresa = request.args.get('empresa')
+        
+        try:
+            customers, next_cursor = db_manager.get_customers_page(limit, cursor, empresa)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'customers': [asdict(customer) for customer in customers],
+            'count': len(customers),
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao listar clientes: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@admin_blueprint.route('/admin/database/conversations', methods=['GET'])
+def list_conversations():
+    """Listar conversas paginadas por cursor (keyset em last_contact, phone)"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        cursor = request.args.get('cursor')
+        
+        try:
+            conversations, next_cursor = db_manager.get_conversations_page(limit, cursor)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'conversations': [asdict(conversation) for conversation in conversations],
+            'count': len(conversations),
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        logger.error(LogCategory.SYSTEM, f"Erro ao listar conversas: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
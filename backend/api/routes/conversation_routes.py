@@ -11,6 +11,7 @@ from flask import Blueprint, request, jsonify
 from typing import Dict, Any
 
 from backend.modules.conversation_bot import ConversationBot
+from backend.database.database_manager import db_manager, MAX_PAGE_SIZE
 from backend.modules.waha_integration import WahaIntegration
 from backend.modules.logger_system import LogManager, LogCategory
 from backend.config.settings import Config
@@ -41,7 +42,7 @@ def health_check():
     """Health check do módulo de conversação"""
     try:
         bot = get_conversation_bot()
-        stats = bot.get_context_stats()
+        stats = bot.get_conversation_statistics()
         
         return jsonify({
             'status': 'healthy',
@@ -191,41 +192,39 @@ def analyze_message():
 
 @conversation_bp.route('/contexts', methods=['GET'])
 def get_active_contexts():
-    """Obter contextos de conversa ativos"""
+    """Obter contextos de conversa ativos (paginados por cursor)"""
     try:
         bot = get_conversation_bot()
         
         # Filtros opcionais
-        phone_filter = request.args.get('phone')
-        limit = int(request.args.get('limit', 50))
+        phone_prefix = request.args.get('phone')
+        limit = max(1, min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE))
+        cursor = request.args.get('cursor')
+        
+        try:
+            page, next_cursor = bot.list_active_contexts(limit, cursor, phone_prefix)
+        except ValueError as e:
+            return jsonify({
+                'error': str(e)
+            }), 400
         
         contexts = []
-        for phone, context in bot.active_contexts.items():
-            if phone_filter and phone_filter not in phone:
-                continue
-                
+        for context in page:
+            last_activity = bot.context_index.last_activity(context.customer_phone)
             contexts.append({
-                'phone': context.user_phone,
-                'session_id': context.session_id,
-                'user_name': context.user_name,
-                'started_at': context.started_at,
-                'last_activity': context.last_activity,
-                'message_count': context.message_count,
-                'topics_discussed': list(context.topics_discussed),
-                'recent_intents': [intent.value for intent in context.intent_history[-5:]],
-                'recent_sentiments': [sentiment.value for sentiment in context.sentiment_history[-5:]]
+                'phone': context.customer_phone,
+                'user_name': context.customer_name,
+                'last_activity': datetime.fromtimestamp(last_activity).isoformat() if last_activity else None,
+                'message_count': len(context.conversation_history),
+                'debt_amount': context.debt_amount,
+                'cooperation_level': context.cooperation_level
             })
         
-        # Ordenar por última atividade
-        contexts.sort(key=lambda x: x['last_activity'], reverse=True)
-        
-        # Aplicar limite
-        contexts = contexts[:limit]
-        
         return jsonify({
             'contexts': contexts,
             'total_count': len(bot.active_contexts),
-            'filtered_count': len(contexts)
+            'filtered_count': len(contexts),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -235,6 +234,41 @@ def get_active_contexts():
             'message': str(e)
         }), 500
 
+@conversation_bp.route('/history', methods=['GET'])
+def get_persisted_conversations():
+    """Obter conversas persistidas no banco (paginadas por cursor)"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        cursor = request.args.get('cursor')
+        
+        try:
+            conversations, next_cursor = db_manager.get_conversations_page(limit, cursor)
+        except ValueError as e:
+            return jsonify({
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'conversations': [{
+                'phone': conversation.phone,
+                'user_name': conversation.customer_name,
+                'last_activity': conversation.last_contact,
+                'message_count': conversation.message_count,
+                'debt_amount': conversation.debt_amount,
+                'cooperation_level': conversation.cooperation_level,
+                'last_intent': conversation.last_intent
+            } for conversation in conversations],
+            'count': len(conversations),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        logger.error(LogCategory.CONVERSATION, f"Erro ao obter conversas persistidas: {e}")
+        return jsonify({
+            'error': 'Erro interno do servidor',
+            'message': str(e)
+        }), 500
+
 @conversation_bp.route('/contexts/<phone>', methods=['GET'])
 def get_context_details(phone):
     """Obter detalhes de um contexto específico"""
@@ -279,13 +313,11 @@ def delete_context(phone):
     try:
         bot = get_conversation_bot()
         
-        if phone not in bot.active_contexts:
+        if not bot.clear_context(phone):
             return jsonify({
                 'error': 'Contexto não encontrado'
             }), 404
         
-        del bot.active_contexts[phone]
-        
         logger.info(LogCategory.CONVERSATION, f"Contexto excluído: {phone}")
         
         return jsonify({
@@ -305,7 +337,8 @@ def get_statistics():
     """Obter estatísticas do sistema de conversação"""
     try:
         bot = get_conversation_bot()
-        stats = bot.get_context_stats()
+        stats = bot.get_conversation_statistics()
+        stats['active_contexts'] = stats['total_active_conversations']
         
         # Adicionar estatísticas do logger
         logger_stats = logger.get_stats()
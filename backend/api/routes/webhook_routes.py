@@ -9,6 +9,7 @@ import hmac
 import hashlib
 import asyncio
 from datetime import datetime
+from dataclasses import asdict
 from flask import Blueprint, request, jsonify
 from typing import Dict, Any
 
@@ -181,13 +182,13 @@ def handle_message_event(webhook_data: Dict[str, Any]):
         
         # Verificar se é cliente antes de processar
         
-        # Buscar dados do cliente
+        # Buscar dados do cliente (não clientes vêm do cache negativo, sem consulta ao banco)
         customer_data = get_customer_data(phone)
         
-        if customer_data and customer_data.get('is_customer', False):
+        if customer_data and customer_data.is_customer:
             # É cliente - processar com dados do cliente
-            logger.info(LogCategory.WHATSAPP, f"👤 Cliente identificado: {customer_data.get('name', 'Cliente')}")
-            response = bot.process_message(phone, message.content, customer_data)
+            logger.info(LogCategory.WHATSAPP, f"👤 Cliente identificado: {customer_data.name}")
+            response = bot.process_message(phone, message.content, asdict(customer_data))
         else:
             # Não é cliente - responder com mensagem geral
             logger.info(LogCategory.WHATSAPP, f"👤 Pessoa não cadastrada como cliente: {phone}")
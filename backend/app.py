@@ -50,9 +50,42 @@ def create_app():
     # Registrar handlers de erro
     register_error_handlers(app)
     
+    # Aplicar migrações pendentes e verificar índices (falha cedo se faltar algum)
+    verify_database_indexes()
+    
+    # Partições mensais: criar as próximas e remover as fora da retenção
+    maintain_database_partitions()
+    
     logger.info("✅ Aplicação Flask criada com sucesso")
     return app
 
+def verify_database_indexes():
+    """
+    Aplica as migrações pendentes (DB_MIGRATE_ON_STARTUP) e impede a
+    inicialização com o banco conectado mas sem os índices exigidos
+    """
+    try:
+        from backend.database.database_manager import db_manager, DB_MIGRATE_ON_STARTUP
+    except ImportError as e:
+        logger.warning(f"⚠️ Banco de dados não disponível: {e}")
+        return
+    
+    # O advisory lock do executor serializa os workers que sobem juntos
+    if DB_MIGRATE_ON_STARTUP and not db_manager.run_migrations():
+        logger.error("❌ Migrações não aplicadas na inicialização")
+    
+    db_manager.verify_required_indexes()
+
+def maintain_database_partitions():
+    """Manutenção das partições na inicialização (falhas só são registradas)"""
+    try:
+        from backend.database.partition_manager import run_partition_maintenance
+    except ImportError as e:
+        logger.warning(f"⚠️ Gerenciador de partições não disponível: {e}")
+        return
+    
+    run_partition_maintenance()
+
 def register_blueprints(app):
     """Registrar blueprints da aplicação"""
     try:
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Repositório Assíncrono de Clientes e Conversas
+Acesso ao PostgreSQL via asyncpg para o código asyncio (dispatcher, Waha,
+automação web), com pool próprio e sem chamadas bloqueantes no event loop.
+Espelha os métodos de cliente e conversa do DatabaseManager.
+"""
+
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    asyncpg = None
+    ASYNCPG_AVAILABLE = False
+
+from backend.database.database_manager import (
+    DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    CONVERSATION_HISTORY_LIMIT, MAX_PAGE_SIZE, CUSTOMER_SELECT, CONVERSATION_SELECT,
+    PREPARED_STATEMENTS, RECENT_HISTORY_APPEND, Customer, Conversation, DatabaseManager,
+    history_entries, recent_history_json
+)
+from backend.modules.pagination import encode_cursor, decode_cursor
+from backend.modules.phone_utils import normalize_phone_e164
+from backend.modules.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Datas trafegam como texto ISO 8601, como no DatabaseManager
+TEMPORAL_TYPES = ('date', 'timestamp', 'timestamptz')
+
+SAVE_CUSTOMER_SQL = """
+    INSERT INTO customers (
+        protocolo, first_name, documento, cobrado_fpd, dias_fpd,
+        data_vencimento_fpd, contrato, regional, territorio, dsc_plano,
+        valor_mensalidade, empresa, status, priority, is_customer, last_contact,
+        conversation_count, payment_promises, last_payment_date, phone_e164
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20)
+    ON CONFLICT (protocolo) DO UPDATE SET
+        first_name = EXCLUDED.first_name, documento = EXCLUDED.documento,
+        cobrado_fpd = EXCLUDED.cobrado_fpd, dias_fpd = EXCLUDED.dias_fpd,
+        data_vencimento_fpd = EXCLUDED.data_vencimento_fpd, contrato = EXCLUDED.contrato,
+        regional = EXCLUDED.regional, territorio = EXCLUDED.territorio,
+        dsc_plano = EXCLUDED.dsc_plano, valor_mensalidade = EXCLUDED.valor_mensalidade,
+        empresa = EXCLUDED.empresa, status = EXCLUDED.status, priority = EXCLUDED.priority,
+        is_customer = EXCLUDED.is_customer, last_contact = EXCLUDED.last_contact,
+        conversation_count = EXCLUDED.conversation_count,
+        payment_promises = EXCLUDED.payment_promises,
+        last_payment_date = EXCLUDED.last_payment_date,
+        phone_e164 = COALESCE(EXCLUDED.phone_e164, customers.phone_e164),
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING id, (xmax = 0) AS inserted
+"""
+
+# Mesmo comando único do DatabaseManager._upsert_conversation_turn: os turnos
+# vão como arrays (unnest) e, sem protocolo ($19 NULL), o UPDATE não afeta linhas
+CONVERSATION_TURN_SQL = """
+    WITH conversation AS (
+        INSERT INTO conversations (
+            phone, customer_name, debt_amount, days_overdue,
+            cooperation_level, lie_probability, urgency_level, last_intent,
+            last_sentiment, payment_promises, last_contact, message_count, recent_history
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, COALESCE($11, CURRENT_TIMESTAMP), $12, $22::jsonb)
+        ON CONFLICT (phone) DO UPDATE SET
+            customer_name = EXCLUDED.customer_name, debt_amount = EXCLUDED.debt_amount,
+            days_overdue = EXCLUDED.days_overdue, cooperation_level = EXCLUDED.cooperation_level,
+            lie_probability = EXCLUDED.lie_probability, urgency_level = EXCLUDED.urgency_level,
+            last_intent = EXCLUDED.last_intent, last_sentiment = EXCLUDED.last_sentiment,
+            payment_promises = EXCLUDED.payment_promises, last_contact = EXCLUDED.last_contact,
+            message_count = COALESCE(conversations.message_count, 0) + EXCLUDED.message_count,
+            recent_history = """ + RECENT_HISTORY_APPEND + """,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING id, (xmax = 0) AS inserted
+    ),
+    events AS (
+        INSERT INTO conversation_events (
+            phone, event_timestamp, customer_message, bot_response,
+            intent, urgency_level, message_type
+        )
+        SELECT $1, e.event_timestamp::timestamp, e.customer_message, e.bot_response,
+               e.intent, e.urgency_level, e.message_type
+        FROM unnest($13::text[], $14::text[], $15::text[], $16::text[], $17::float8[], $18::text[])
+            AS e(event_timestamp, customer_message, bot_response, intent, urgency_level, message_type)
+    ),
+    customer AS (
+        UPDATE customers SET
+            conversation_count = COALESCE(conversation_count, 0) + 1,
+            payment_promises = COALESCE(payment_promises, 0) + $20,
+            last_contact = $21,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE protocolo = $19
+        RETURNING conversation_count
+    )
+    SELECT id, inserted, (SELECT conversation_count FROM customer) AS conversation_count
+    FROM conversation
+"""
+
+def _encode_temporal(value: Any) -> str:
+    """Data/hora (ou texto ISO) para o formato texto do PostgreSQL"""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def _decode_temporal(value: str) -> str:
+    """Texto do PostgreSQL para ISO 8601 ('2024-01-02 03:04:05' -> '2024-01-02T03:04:05')"""
+    return value.replace(' ', 'T', 1)
+
+def _event_arrays(events: List[Dict]) -> Tuple[List[Any], ...]:
+    """Turnos do histórico como arrays por coluna (parâmetros do unnest)"""
+    keys = ('timestamp', 'customer_message', 'bot_response', 'intent', 'urgency_level', 'message_type')
+    entries = history_entries(events)
+    return tuple([entry[key] for entry in entries] for key in keys)
+
+class AsyncRepository:
+    """Repositório assíncrono (asyncpg) com pool de conexões próprio"""
+
+    def __init__(self, dsn: str = DATABASE_URL, min_size: int = DB_POOL_MIN_SIZE,
+                 max_size: int = DB_POOL_MAX_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pool = None
+        self._loop = None
+        self._lock: Optional[asyncio.Lock] = None
+        # Buscas simultâneas do mesmo telefone aguardam uma única consulta
+        self.single_flight = AsyncSingleFlight()
+
+    @property
+    def connected(self) -> bool:
+        """Pool criado no event loop atual"""
+        return self.pool is not None and self._loop is _running_loop()
+
+    async def connect(self) -> bool:
+        """Cria o pool no event loop atual (idempotente)"""
+        if not ASYNCPG_AVAILABLE:
+            logger.warning("⚠️ asyncpg não instalado - repositório assíncrono indisponível")
+            return False
+
+        loop = _running_loop()
+        if self._lock is None or self._loop is not loop:
+            # Pool e lock pertencem ao loop em que foram criados
+            self._discard_pool()
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        async with self._lock:
+            if self.pool is not None:
+                return True
+            try:
+                self.pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    timeout=self.timeout,
+                    init=self._init_connection
+                )
+                logger.info(f"✅ Pool assíncrono conectado ({self.min_size}-{self.max_size} conexões)")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Erro ao criar pool assíncrono: {str(e)}")
+                self.pool = None
+                return False
+
+    async def _init_connection(self, conn):
+        """Codecs de texto para datas: mesmo formato de entrada e saída do DatabaseManager"""
+        for type_name in TEMPORAL_TYPES:
+            await conn.set_type_codec(
+                type_name, schema='pg_catalog', format='text',
+                encoder=_encode_temporal, decoder=_decode_temporal
+            )
+
+    def _discard_pool(self):
+        """Descarta pool de outro event loop (não pode ser aguardado aqui)"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    async def close(self):
+        """Fecha o pool"""
+        if self.pool is not None and self._loop is _running_loop():
+            await self.pool.close()
+        self._discard_pool()
+
+    async def _fetchrow(self, query: str, *args):
+        if not await self.connect():
+            return None
+        return await self.pool.fetchrow(query, *args)
+
+    async def _fetch(self, query: str, *args) -> List[Any]:
+        if not await self.connect():
+            return []
+        return await self.pool.fetch(query, *args)
+
+    async def save_customer_data(self, customer: Customer) -> bool:
+        """Salva dados do cliente (upsert por protocolo)"""
+        try:
+            result = await self._fetchrow(
+                SAVE_CUSTOMER_SQL,
+                customer.protocolo, customer.first_name, customer.documento, customer.cobrado_fpd,
+                customer.dias_fpd, customer.data_vencimento_fpd, customer.contrato, customer.regional,
+                customer.territorio, customer.dsc_plano, customer.valor_mensalidade, customer.empresa,
+                customer.status, customer.priority, customer.is_customer, customer.last_contact,
+                customer.conversation_count, customer.payment_promises, customer.last_payment_date,
+                normalize_phone_e164(customer.phone)
+            )
+            if result is None:
+                return False
+
+            if result['inserted']:
+                logger.info(f"✅ Cliente {customer.first_name} inserido no banco")
+            else:
+                logger.info(f"🔄 Cliente {customer.first_name} atualizado no banco")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar cliente no banco: {str(e)}")
+            return False
+
+    async def get_customer_by_protocolo(self, protocolo: str) -> Optional[Customer]:
+        """Busca cliente por protocolo"""
+        try:
+            result = await self._fetchrow(PREPARED_STATEMENTS['customer_by_protocolo'][1], protocolo)
+            return DatabaseManager._convert_to_customer(result) if result else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar cliente no banco: {str(e)}")
+            return None
+
+    async def get_customer_by_phone(self, phone: str) -> Optional[Customer]:
+        """Busca cliente pelo telefone normalizado (E.164), com documento como fallback"""
+        return await self.single_flight.do(('customer', phone), lambda: self._fetch_customer_by_phone(phone))
+
+    async def _fetch_customer_by_phone(self, phone: str) -> Optional[Customer]:
+        try:
+            phone_e164 = normalize_phone_e164(phone)
+            result = None
+            if phone_e164:
+                result = await self._fetchrow(PREPARED_STATEMENTS['customer_by_phone'][1], phone_e164)
+            if not result:
+                result = await self._fetchrow(PREPARED_STATEMENTS['customer_by_documento'][1], phone)
+
+            return DatabaseManager._convert_to_customer(result) if result else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar cliente por telefone no banco: {str(e)}")
+            return None
+
+    async def get_customers_by_company(self, empresa: str, limit: int = 1000) -> List[Customer]:
+        """Busca clientes por empresa"""
+        try:
+            rows = await self._fetch(f"""
+                SELECT {CUSTOMER_SELECT} FROM customers
+                WHERE empresa = $1 ORDER BY updated_at DESC LIMIT $2
+            """, empresa, limit)
+            return [DatabaseManager._convert_to_customer(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar clientes por empresa: {str(e)}")
+            return []
+
+    async def get_customers_page(self, limit: int = 50, cursor: Optional[str] = None,
+                                 empresa: Optional[str] = None) -> Tuple[List[Customer], Optional[str]]:
+        """Página de clientes (keyset). Levanta ValueError se o cursor for inválido."""
+        after = decode_cursor(cursor, 2) if cursor else None
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        try:
+            conditions = []
+            params: List[Any] = []
+            if empresa:
+                params.append(empresa)
+                conditions.append(f"empresa = ${len(params)}")
+            if after:
+                params.extend(after)
+                conditions.append(f"(updated_at, protocolo) < (${len(params) - 1}, ${len(params)})")
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            params.append(limit + 1)
+
+            rows = await self._fetch(f"""
+                SELECT {CUSTOMER_SELECT} FROM customers {where}
+                ORDER BY updated_at DESC, protocolo DESC
+                LIMIT ${len(params)}
+            """, *params)
+
+            customers = [DatabaseManager._convert_to_customer(row) for row in rows[:limit]]
+
+            next_cursor = None
+            if len(rows) > limit:
+                last = customers[-1]
+                next_cursor = encode_cursor([last.updated_at, last.protocolo])
+
+            return customers, next_cursor
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao paginar clientes: {str(e)}")
+            return [], None
+
+    async def get_conversations_page(self, limit: int = 50,
+                                     cursor: Optional[str] = None) -> Tuple[List[Conversation], Optional[str]]:
+        """Página de conversas (keyset). Levanta ValueError se o cursor for inválido."""
+        after = decode_cursor(cursor, 2) if cursor else None
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        try:
+            if after:
+                where, params = "WHERE (last_contact, phone) < ($1, $2)", after + [limit + 1]
+            else:
+                where, params = '', [limit + 1]
+
+            rows = await self._fetch(f"""
+                SELECT {CONVERSATION_SELECT} FROM conversations {where}
+                ORDER BY last_contact DESC, phone DESC
+                LIMIT ${len(params)}
+            """, *params)
+
+            conversations = [DatabaseManager._convert_to_conversation(row) for row in rows[:limit]]
+
+            next_cursor = None
+            if len(rows) > limit:
+                last = conversations[-1]
+                next_cursor = encode_cursor([last.last_contact, last.phone])
+
+            return conversations, next_cursor
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao paginar conversas: {str(e)}")
+            return [], None
+
+    async def get_conversation_context(self, phone: str,
+                                       history_limit: int = CONVERSATION_HISTORY_LIMIT) -> Optional[Conversation]:
+        """Busca contexto da conversa por telefone (agregados + últimos turnos)"""
+        return await self.single_flight.do(
+            ('conversation', phone, history_limit), lambda: self._fetch_conversation_context(phone, history_limit)
+        )
+
+    async def _fetch_conversation_context(self, phone: str, history_limit: int) -> Optional[Conversation]:
+        try:
+            if not await self.connect():
+                return None
+
+            tail_limit = max(1, min(history_limit, CONVERSATION_HISTORY_LIMIT))
+            async with self.pool.acquire() as conn:
+                result = await conn.fetchrow(
+                    PREPARED_STATEMENTS['conversation_by_phone'][1], phone, tail_limit
+                )
+                if not result:
+                    return None
+
+                conversation = DatabaseManager._convert_to_conversation(tuple(result)[:-1])
+                if history_limit <= CONVERSATION_HISTORY_LIMIT:
+                    # Cauda JSONB (asyncpg entrega jsonb como texto)
+                    conversation.conversation_history = json.loads(result[-1])
+                    return conversation
+
+                rows = await conn.fetch(
+                    PREPARED_STATEMENTS['conversation_events_recent'][1], phone, history_limit
+                )
+
+            conversation.conversation_history = [
+                DatabaseManager._convert_to_event(row) for row in reversed(rows)
+            ]
+            return conversation
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar contexto no banco: {str(e)}")
+            return None
+
+    async def save_conversation_context(self, context: Conversation) -> bool:
+        """Salva contexto da conversa (novos turnos vão para conversation_events)"""
+        try:
+            result = await self._upsert_conversation_turn(context)
+            if result is None:
+                return False
+
+            if result['inserted']:
+                logger.info(f"✅ Contexto da conversa inserido no banco: {context.phone}")
+            else:
+                logger.info(f"🔄 Contexto da conversa atualizado no banco: {context.phone}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar contexto no banco: {str(e)}")
+            return False
+
+    async def commit_conversation_turn(self, context: Conversation, protocolo: Optional[str] = None,
+                                       payment_promise: bool = False) -> bool:
+        """Grava turno da conversa e contadores do cliente em um único comando"""
+        try:
+            result = await self._upsert_conversation_turn(
+                context, protocolo=protocolo, payment_promises=1 if payment_promise else 0
+            )
+            if result is None:
+                return False
+
+            if protocolo and result['conversation_count'] is None:
+                logger.warning(f"⚠️ Cliente {protocolo} não encontrado para atualizar interação")
+
+            logger.info(f"💾 Turno da conversa gravado no banco: {context.phone}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar turno da conversa: {str(e)}")
+            return False
+
+    async def append_conversation_events(self, phone: str, events: List[Dict]) -> bool:
+        """Anexa turnos de conversa sem tocar no registro de agregados"""
+        try:
+            if not events:
+                return True
+            if not await self.connect():
+                return False
+
+            await self.pool.execute("""
+                INSERT INTO conversation_events (
+                    phone, event_timestamp, customer_message, bot_response,
+                    intent, urgency_level, message_type
+                )
+                SELECT $1, e.event_timestamp::timestamp, e.customer_message, e.bot_response,
+                       e.intent, e.urgency_level, e.message_type
+                FROM unnest($2::text[], $3::text[], $4::text[], $5::text[], $6::float8[], $7::text[])
+                    AS e(event_timestamp, customer_message, bot_response, intent, urgency_level, message_type)
+            """, phone, *_event_arrays(events))
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao anexar eventos da conversa: {str(e)}")
+            return False
+
+    async def _upsert_conversation_turn(self, context: Conversation, protocolo: Optional[str] = None,
+                                        payment_promises: int = 0):
+        """Executa CONVERSATION_TURN_SQL (None se o pool não estiver disponível)"""
+        events = context.conversation_history
+        return await self._fetchrow(
+            CONVERSATION_TURN_SQL,
+            context.phone, context.customer_name, context.debt_amount,
+            context.days_overdue, context.cooperation_level, context.lie_probability,
+            context.urgency_level, context.last_intent, context.last_sentiment,
+            context.payment_promises, context.last_contact, len(events),
+            *_event_arrays(events),
+            protocolo, payment_promises, context.last_contact or datetime.now().isoformat(),
+            recent_history_json(events)
+        )
+
+def _running_loop():
+    """Event loop em execução (None fora de corrotinas)"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+# Instância global
+async_repository = AsyncRepository()
+
+# Funções de conveniência
+async def get_customer_by_phone(phone: str) -> Optional[Customer]:
+    """Buscar cliente por telefone"""
+    return await async_repository.get_customer_by_phone(phone)
+
+async def get_conversation_context(phone: str) -> Optional[Conversation]:
+    """Buscar contexto da conversa"""
+    return await async_repository.get_conversation_context(phone)
+
+async def commit_conversation_turn(context: Conversation, protocolo: Optional[str] = None,
+                                   payment_promise: bool = False) -> bool:
+    """Gravar turno da conversa e contadores do cliente"""
+    return await async_repository.commit_conversation_turn(context, protocolo, payment_promise)
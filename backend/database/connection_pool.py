@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de Conexões PostgreSQL
+Pool thread-safe com tamanho mínimo/máximo, verificação de saúde,
+reconexão com backoff e métricas de espera e saturação
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PoolError(Exception):
+    """Erro do pool de conexões"""
+
+class PoolTimeout(PoolError):
+    """Nenhuma conexão livre dentro do tempo limite"""
+
+class ConnectionPool:
+    """Pool de conexões com checkout bloqueante"""
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 5.0, health_check_interval: float = 30.0,
+                 initial_backoff: float = 0.5, max_backoff: float = 30.0,
+                 on_connect: Optional[Callable[[Any], None]] = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Tamanho de pool inválido: min={min_size}, max={max_size}")
+
+        self.connect = connect
+        # Preparação por conexão (ex.: PREPARE), executada antes do primeiro checkout
+        self.on_connect = on_connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        # Conexões ociosas: (conexão, instante da última devolução)
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+        self.metrics = {
+            'checkouts': 0,
+            'waited_checkouts': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'connect_failures': 0,
+            'health_check_failures': 0,
+            'max_in_use': 0
+        }
+
+        self._fill_min_size()
+
+    @property
+    def available(self) -> bool:
+        """Há conexões abertas ou uma nova tentativa de conexão é permitida"""
+        with self._condition:
+            return not self._closed and (self._size > 0 or time.monotonic() >= self._next_attempt)
+
+    def _fill_min_size(self):
+        """Abre as conexões mínimas (falhas entram em backoff)"""
+        for _ in range(self.min_size):
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except PoolError:
+                with self._condition:
+                    self._size -= 1
+                return
+            with self._condition:
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+
+    def _open(self):
+        """Abre uma conexão respeitando o backoff de reconexão"""
+        now = time.monotonic()
+        if now < self._next_attempt:
+            raise PoolError(f"Reconexão em backoff por mais {self._next_attempt - now:.1f}s")
+
+        try:
+            conn = self.connect()
+            if self.on_connect:
+                try:
+                    self.on_connect(conn)
+                except Exception:
+                    self._discard(conn)
+                    raise
+        except Exception as e:
+            with self._condition:
+                self.metrics['connect_failures'] += 1
+                self._backoff = min(self.max_backoff, self._backoff * 2 or self.initial_backoff)
+                self._next_attempt = time.monotonic() + self._backoff
+            logger.error(f"❌ Erro ao abrir conexão do pool (nova tentativa em {self._backoff:.1f}s): {str(e)}")
+            raise PoolError(str(e)) from e
+
+        with self._condition:
+            self.metrics['connections_created'] += 1
+            self._backoff = 0.0
+            self._next_attempt = 0.0
+        return conn
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Verifica conexão ociosa: fechada ou parada há muito tempo recebe um SELECT 1"""
+        if getattr(conn, 'closed', False):
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            with self._condition:
+                self.metrics['health_check_failures'] += 1
+            logger.warning(f"⚠️ Conexão do pool falhou na verificação de saúde: {str(e)}")
+            return False
+
+    def _discard(self, conn):
+        """Fecha conexão sem devolvê-la ao pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout: float = None):
+        """Retira uma conexão do pool, aguardando até `timeout` segundos"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            idle_since = 0.0
+            create = False
+
+            with self._condition:
+                if self._closed:
+                    raise PoolError("Pool fechado")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics['timeouts'] += 1
+                        raise PoolTimeout(f"Nenhuma conexão livre em {timeout:.1f}s "
+                                          f"({self._in_use}/{self.max_size} em uso)")
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    # Reserva a vaga antes de conectar fora do lock
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    conn = self._open()
+                except PoolError:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            elif not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                with self._condition:
+                    self._size -= 1
+                    self.metrics['connections_discarded'] += 1
+                    self._condition.notify()
+                continue
+
+            with self._condition:
+                wait = time.monotonic() - started
+                self._in_use += 1
+                self.metrics['checkouts'] += 1
+                self.metrics['total_wait_seconds'] += wait
+                self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], wait)
+                self.metrics['max_in_use'] = max(self.metrics['max_in_use'], self._in_use)
+                if waited:
+                    self.metrics['waited_checkouts'] += 1
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Devolve conexão ao pool (ou descarta se quebrada)"""
+        discard = discard or self._closed or bool(getattr(conn, 'closed', False))
+        if discard:
+            self._discard(conn)
+
+        with self._condition:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self.metrics['connections_discarded'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Empresta uma conexão; em erro desfaz a transação e descarta se ela quebrou"""
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas do pool: tempo de espera, saturação e falhas"""
+        with self._condition:
+            checkouts = self.metrics['checkouts']
+            return {
+                **self.metrics,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'saturation': self._in_use / self.max_size,
+                'avg_wait_seconds': self.metrics['total_wait_seconds'] / checkouts if checkouts else 0.0,
+                'backoff_seconds': max(0.0, self._next_attempt - time.monotonic())
+            }
+
+    def closeall(self):
+        """Fecha todas as conexões ociosas; as emprestadas fecham ao serem devolvidas"""
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for conn in idle:
+            self._discard(conn)
@@ -5,13 +5,24 @@ Gerenciador de Banco de Dados PostgreSQL
 Sistema para persistir dados dos clientes e conversas
 """
 
+import io
 import os
 import json
+import time
+import uuid
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 
+from backend.database.connection_pool import ConnectionPool, PoolError
+from backend.database.query_metrics import InstrumentedCursor, QueryMetrics, query_metrics
+from backend.modules.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.modules.pagination import encode_cursor, decode_cursor
+from backend.modules.phone_utils import normalize_phone_e164
+
 # Tentar carregar dotenv
 try:
     from dotenv import load_dotenv
@@ -42,6 +53,169 @@ else:
     DB_USER = os.getenv('PGUSER', 'postgres')
     DB_PASSWORD = os.getenv('PGPASSWORD', '')
 
+# Pool de conexões
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5.0))
+
+# Circuit breaker: falhas de conexão ou operações lentas seguidas abrem o
+# circuito e as chamadas falham na hora (sem esperar timeouts) por DB_BREAKER_RESET_SECONDS
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', 5))
+DB_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('DB_BREAKER_SLOW_CALL_SECONDS', 3.0))
+DB_BREAKER_RESET_SECONDS = float(os.getenv('DB_BREAKER_RESET_SECONDS', 30.0))
+
+# Réplica de leitura (opcional): leituras do painel saem do primário
+DATABASE_READ_URL = os.getenv('DATABASE_READ_URL', '')
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 10.0))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5.0))
+
+# Atraso da réplica em segundos (0 se já reproduziu tudo o que recebeu)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Quantidade de turnos carregados junto com o contexto da conversa
+CONVERSATION_HISTORY_LIMIT = int(os.getenv('CONVERSATION_HISTORY_LIMIT', 50))
+
+# Carga em massa: colunas gravadas (protocolo primeiro) e linhas por lote
+BULK_CUSTOMER_COLUMNS = (
+    'protocolo', 'first_name', 'documento', 'cobrado_fpd', 'dias_fpd',
+    'data_vencimento_fpd', 'contrato', 'regional', 'territorio',
+    'dsc_plano', 'valor_mensalidade', 'empresa', 'phone_e164'
+)
+BULK_UPSERT_CHUNK_SIZE = int(os.getenv('BULK_UPSERT_CHUNK_SIZE', 50000))
+
+# Migrações pendentes aplicadas na inicialização, antes de verificar os índices
+DB_MIGRATE_ON_STARTUP = os.getenv('DB_MIGRATE_ON_STARTUP', 'true').lower() == 'true'
+
+# Leitura em streaming: linhas trazidas por ida ao banco no cursor server-side
+STREAM_ITERSIZE = int(os.getenv('STREAM_ITERSIZE', 2000))
+
+# Paginação keyset: tamanho máximo de página
+MAX_PAGE_SIZE = 500
+
+# Colunas lidas das tabelas, na ordem dos campos das dataclasses
+# (conversão posicional, sem montar um dict por linha)
+CUSTOMER_COLUMNS = (
+    'protocolo', 'first_name', 'documento', 'cobrado_fpd', 'dias_fpd',
+    'data_vencimento_fpd', 'contrato', 'regional', 'territorio', 'dsc_plano',
+    'valor_mensalidade', 'empresa', 'status', 'priority', 'is_customer',
+    'last_contact', 'conversation_count', 'payment_promises', 'last_payment_date',
+    'created_at', 'updated_at', 'phone_e164'
+)
+CUSTOMER_SELECT = ', '.join(CUSTOMER_COLUMNS)
+
+CONVERSATION_COLUMNS = (
+    'phone', 'customer_name', 'debt_amount', 'days_overdue', 'cooperation_level',
+    'lie_probability', 'urgency_level', 'last_intent', 'last_sentiment',
+    'payment_promises', 'last_contact', 'message_count', 'created_at', 'updated_at'
+)
+CONVERSATION_SELECT = ', '.join(CONVERSATION_COLUMNS)
+
+EVENT_COLUMNS = ('event_timestamp', 'customer_message', 'bot_response', 'intent', 'urgency_level', 'message_type')
+
+# Consultas quentes (toda mensagem recebida): preparadas em cada conexão do pool
+PREPARED_STATEMENTS = {
+    'customer_by_protocolo': (
+        'text', f"SELECT {CUSTOMER_SELECT} FROM customers WHERE protocolo = $1"
+    ),
+    # Um telefone pode ter vários contratos: vale o atualizado mais recentemente
+    'customer_by_phone': (
+        'text', f"SELECT {CUSTOMER_SELECT} FROM customers WHERE phone_e164 = $1 "
+        "ORDER BY updated_at DESC, protocolo DESC LIMIT 1"
+    ),
+    'customer_by_documento': (
+        'text', f"SELECT {CUSTOMER_SELECT} FROM customers WHERE documento = $1 LIMIT 1"
+    ),
+    # Agregados + últimos $2 turnos da cauda JSONB (fatia por JSON path)
+    'conversation_by_phone': (
+        'text, integer',
+        f"SELECT {CONVERSATION_SELECT}, jsonb_path_query_array(recent_history, "
+        "'$[last - $k + 1 to last]', jsonb_build_object('k', $2)) "
+        "FROM conversations WHERE phone = $1"
+    ),
+    'conversation_events_recent': (
+        'text, integer',
+        f"SELECT {', '.join(EVENT_COLUMNS)} FROM conversation_events "
+        "WHERE phone = $1 ORDER BY event_timestamp DESC LIMIT $2"
+    )
+}
+
+# Índices exigidos na inicialização (buscas quentes e paginação)
+REQUIRED_INDEXES = {
+    'uq_customers_protocolo': 'customers',
+    'idx_customers_phone_e164_updated_at': 'customers',
+    'idx_customers_updated_at_protocolo': 'customers',
+    'idx_customers_empresa_updated_at_protocolo': 'customers',
+    'uq_conversations_phone': 'conversations',
+    'idx_conversations_last_contact_phone': 'conversations',
+    'idx_conversation_events_phone_timestamp': 'conversation_events'
+}
+
+# Cauda do histórico (conversations.recent_history): anexada no servidor e
+# cortada nos últimos CONVERSATION_HISTORY_LIMIT turnos
+RECENT_HISTORY_APPEND = (
+    "jsonb_path_query_array(conversations.recent_history || EXCLUDED.recent_history, "
+    f"'$[last - {CONVERSATION_HISTORY_LIMIT - 1} to last]')"
+)
+
+# Linha de conversations (turno único e lote do execute_values)
+CONVERSATION_ROW_TEMPLATE = (
+    "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP), %s, %s::jsonb)"
+)
+
+def _is_connection_error(error: Exception) -> bool:
+    """Erro de conexão do psycopg2 (conta como falha no circuit breaker)"""
+    try:
+        from psycopg2 import InterfaceError, OperationalError
+    except ImportError:
+        return False
+    return isinstance(error, (OperationalError, InterfaceError))
+
+def _iso(value) -> Optional[str]:
+    """Data/hora do banco em ISO 8601 (texto é mantido como veio)"""
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def history_entries(events: List[Dict]) -> List[Dict]:
+    """Itens do histórico no formato gravado (mesmas chaves lidas de conversation_events)"""
+    now = datetime.now().isoformat()
+    return [
+        {
+            'timestamp': _iso(event.get('timestamp')) or now,
+            'customer_message': event.get('customer_message'),
+            'bot_response': event.get('bot_response'),
+            'intent': event.get('intent'),
+            'urgency_level': float(event['urgency_level']) if event.get('urgency_level') is not None else None,
+            'message_type': event.get('message_type', 'conversation')
+        }
+        for event in events
+    ]
+
+def recent_history_json(events: List[Dict]) -> str:
+    """Novos turnos em JSON para anexar à cauda (já limitados ao tamanho dela)"""
+    return json.dumps(history_entries(events)[-CONVERSATION_HISTORY_LIMIT:], default=str)
+
+def format_copy_row(values: Iterable[Any]) -> str:
+    """Formata uma linha no formato texto do COPY (tab como separador, \\N para NULL)"""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append('\\N')
+            continue
+        fields.append(
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+        )
+    return '\t'.join(fields) + '\n'
+
 @dataclass
 class Customer:
     """Modelo de dados do cliente para banco (estrutura existente)"""
@@ -66,6 +240,7 @@ class Customer:
     last_payment_date: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    phone: Optional[str] = None  # E.164 (coluna phone_e164)
 
 @dataclass
 class Conversation:
@@ -82,16 +257,42 @@ class Conversation:
     last_sentiment: Optional[str] = None
     payment_promises: int = 0
     last_contact: Optional[str] = None
+    message_count: int = 0
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
 class DatabaseManager:
     """Gerenciador do banco de dados PostgreSQL"""
     
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
-        self.connected = False
+    def __init__(self, dsn: Optional[str] = None, read_dsn: Optional[str] = None,
+                 max_replica_lag: float = DB_REPLICA_MAX_LAG, metrics: Optional[QueryMetrics] = None):
+        self.dsn = dsn or DATABASE_URL
+        self.read_dsn = DATABASE_READ_URL if read_dsn is None else read_dsn
+        self.max_replica_lag = max_replica_lag
+        self.pool = None
+        self.read_pool = None
+        
+        # Latência, linhas e erros por instrução (ver query_metrics.py)
+        self.query_metrics = metrics or query_metrics
+        
+        # Falha rápida com o banco fora do ar ou lento (ver _cursor)
+        self.breaker = CircuitBreaker(
+            'postgres',
+            failure_threshold=DB_BREAKER_FAILURE_THRESHOLD,
+            slow_call_seconds=DB_BREAKER_SLOW_CALL_SECONDS,
+            reset_timeout=DB_BREAKER_RESET_SECONDS
+        )
+        
+        # Recebem as estatísticas de uma carga em massa que inseriu clientes
+        # (ex.: reconstruir o filtro de telefones do CustomerDataManager)
+        self.import_listeners: List[Callable[[Dict[str, Any]], Any]] = []
+        
+        # Roteamento de leituras: atraso medido periodicamente
+        self._replica_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._replica_lag: Optional[float] = None
+        self._replica_checked_at = float('-inf')
+        self.replica_metrics = {'replica_reads': 0, 'primary_fallbacks': 0, 'lag_checks': 0}
         
         # Tentar conectar ao banco
         self._connect()
@@ -100,62 +301,294 @@ class DatabaseManager:
         if self.connected:
             self._create_tables()
     
+    @property
+    def connected(self) -> bool:
+        """Pool criado e com conexões abertas (ou reconexão permitida)"""
+        return self.pool is not None and self.pool.available
+    
+    def _open_connection(self):
+        """Abre uma conexão PostgreSQL (usada pelo pool)"""
+        import psycopg2
+        
+        # Construir string de conexão
+        if self.dsn and self.dsn != 'postgresql://localhost:5432/cobranca':
+            # Railway ou conexão externa
+            return psycopg2.connect(self.dsn)
+        
+        # Conexão local
+        return psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+    
+    def _open_read_connection(self):
+        """Abre uma conexão com a réplica (somente leitura)"""
+        import psycopg2
+        
+        conn = psycopg2.connect(self.read_dsn)
+        conn.set_session(readonly=True)
+        return conn
+    
     def _connect(self):
-        """Conecta ao banco PostgreSQL"""
+        """Cria o pool de conexões PostgreSQL"""
         try:
             # Tentar usar psycopg2 (PostgreSQL)
-            import psycopg2
-            from psycopg2.extras import RealDictCursor
+            import psycopg2  # noqa: F401
             
-            # Construir string de conexão
-            if DATABASE_URL and DATABASE_URL != 'postgresql://localhost:5432/cobranca':
-                # Railway ou conexão externa
-                self.connection = psycopg2.connect(DATABASE_URL)
-            else:
-                # Conexão local
-                self.connection = psycopg2.connect(
-                    host=DB_HOST,
-                    port=DB_PORT,
-                    database=DB_NAME,
-                    user=DB_USER,
-                    password=DB_PASSWORD
-                )
+            self.pool = ConnectionPool(
+                self._open_connection,
+                on_connect=self._prepare_statements,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                checkout_timeout=DB_POOL_TIMEOUT
+            )
             
-            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
-            self.connected = True
+            if self.pool.get_metrics()['size'] > 0:
+                logger.info("🗄️ Conectado ao PostgreSQL com sucesso!")
+            else:
+                logger.warning("⚠️ PostgreSQL indisponível - pool tentará reconectar")
             
-            logger.info("🗄️ Conectado ao PostgreSQL com sucesso!")
+            if self.read_dsn:
+                self.read_pool = ConnectionPool(
+                    self._open_read_connection,
+                    on_connect=self._prepare_statements,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    checkout_timeout=DB_POOL_TIMEOUT
+                )
+                logger.info("📖 Réplica de leitura configurada para consultas do painel")
             
         except ImportError:
             logger.error("❌ psycopg2 não instalado - instale com: pip install psycopg2-binary")
-            self.connected = False
+            self.pool = None
             
         except Exception as e:
             logger.error(f"❌ Erro ao conectar ao PostgreSQL: {str(e)}")
-            self.connected = False
+            self.pool = None
     
-    def _create_tables(self):
-        """Verifica se tabelas existem (não cria novas)"""
+    @contextmanager
+    def _cursor(self, positional: bool = False, read_only: bool = False, expect_slow: bool = False):
+        """
+        Cursor de uma conexão do pool para uma operação
+        
+        Confirma a transação ao final; em erro desfaz e propaga a exceção.
+        Com `positional`, as linhas vêm como tuplas (ordem das colunas do SELECT).
+        Com `read_only`, a conexão pode vir da réplica (ver _checkout).
+        Cada instrução é medida em query_metrics.
+        
+        Passa pelo circuit breaker: com o circuito aberto levanta
+        CircuitOpenError sem tocar no pool. Erros de conexão e operações mais
+        lentas que DB_BREAKER_SLOW_CALL_SECONDS contam como falha (exceto com
+        `expect_slow`, para cargas e recálculos longos por natureza).
+        """
+        from psycopg2 import InterfaceError, OperationalError
+        from psycopg2.extras import RealDictCursor
+        
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("banco de dados indisponível (circuito aberto)")
+        
+        started = time.monotonic()
         try:
-            # Verificar se tabela customers existe
-            self.cursor.execute("""
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'customers'
-            """)
-            
-            result = self.cursor.fetchone()
-            customers_exists = result[0] > 0 if result else False
+            pool, conn = self._checkout(read_only)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        
+        discard = False
+        healthy = True
+        try:
+            cursor = conn.cursor() if positional else conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                yield InstrumentedCursor(cursor, self.query_metrics)
+                conn.commit()
+            finally:
+                cursor.close()
+        except Exception as e:
+            healthy = not isinstance(e, (OperationalError, InterfaceError))
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            pool.putconn(conn, discard=discard)
+            self._record_outcome(pool, healthy, 0.0 if expect_slow else time.monotonic() - started)
+    
+    def _record_outcome(self, pool: ConnectionPool, healthy: bool, elapsed: float):
+        """
+        Resultado da operação no circuito do primário
+        
+        Conexão da réplica não diz nada sobre o primário: erro de conexão só
+        tira a réplica das leituras até a próxima medição de atraso, e a
+        passagem reservada no circuito é devolvida sem resultado.
+        """
+        if pool is not None and pool is self.read_pool:
+            if not healthy:
+                self._replica_failed('erro de conexão na consulta')
+            self.breaker.release()
+        elif healthy:
+            self.breaker.record_success(elapsed)
+        else:
+            self.breaker.record_failure()
+    
+    def _checkout(self, read_only: bool = False) -> Tuple[ConnectionPool, Any]:
+        """
+        Retira uma conexão: escrita sempre do primário; leitura da réplica
+        se ela estiver disponível e com atraso até max_replica_lag
+        """
+        if read_only and self._replica_usable():
+            try:
+                conn = self.read_pool.getconn()
+                self._count_replica('replica_reads')
+                return self.read_pool, conn
+            except PoolError as e:
+                self._replica_failed(str(e))
+        
+        if read_only and self.read_pool is not None:
+            self._count_replica('primary_fallbacks')
+        return self.pool, self.pool.getconn()
+    
+    def _replica_usable(self) -> bool:
+        """Réplica configurada, acessível e dentro do atraso tolerado"""
+        if self.read_pool is None or not self.read_pool.available:
+            return False
+        
+        # Uma thread mede o atraso por intervalo; as demais usam o último valor
+        if (time.monotonic() - self._replica_checked_at >= DB_REPLICA_LAG_CHECK_INTERVAL
+                and self._replica_lock.acquire(blocking=False)):
+            try:
+                self._replica_checked_at = time.monotonic()
+                self._replica_lag = self._measure_replica_lag()
+            finally:
+                self._replica_lock.release()
+        
+        lag = self._replica_lag
+        return lag is not None and lag <= self.max_replica_lag
+    
+    def _replica_failed(self, reason: str):
+        """Réplica fora das leituras até a próxima medição de atraso"""
+        logger.warning(f"⚠️ Réplica indisponível, lendo do primário: {reason}")
+        self._replica_lag = None
+    
+    def _measure_replica_lag(self) -> Optional[float]:
+        """Atraso de replicação em segundos (None se a réplica não responder)"""
+        self._count_replica('lag_checks')
+        try:
+            with self.read_pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(REPLICA_LAG_QUERY)
+                    lag = float(cursor.fetchone()[0])
+                finally:
+                    cursor.close()
+                conn.rollback()
             
-            # Verificar se tabela conversations existe
-            self.cursor.execute("""
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'conversations'
-            """)
+            if lag > self.max_replica_lag:
+                logger.warning(f"⚠️ Réplica atrasada {lag:.1f}s - leituras vão para o primário")
+            return lag
             
-            result = self.cursor.fetchone()
-            conversations_exists = result[0] > 0 if result else False
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao medir atraso da réplica: {str(e)}")
+            return None
+    
+    def _count_replica(self, metric: str):
+        with self._metrics_lock:
+            self.replica_metrics[metric] += 1
+    
+    def _prepare_statements(self, conn):
+        """
+        Prepara as consultas quentes numa conexão recém-aberta do pool
+        
+        Falha não impede o uso da conexão: _execute_prepared prepara de novo sob demanda.
+        """
+        cursor = conn.cursor()
+        try:
+            for name in PREPARED_STATEMENTS:
+                self._prepare(cursor, name)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ Falha ao preparar consultas na conexão: {str(e)}")
+        finally:
+            cursor.close()
+    
+    def _prepare(self, cursor, name: str):
+        """PREPARE de uma consulta registrada em PREPARED_STATEMENTS"""
+        types, query = PREPARED_STATEMENTS[name]
+        cursor.execute(f"PREPARE {name} ({types}) AS {query}")
+    
+    def _execute_prepared(self, cursor, name: str, params: tuple):
+        """
+        EXECUTE de uma consulta preparada
+        
+        Se a conexão não tiver a consulta (SQLSTATE 26000), prepara e repete.
+        O rollback só é seguro porque as consultas preparadas são leituras.
+        """
+        execute = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})"
+        try:
+            cursor.execute(execute, params)
+        except Exception as e:
+            if getattr(e, 'pgcode', None) != '26000':
+                raise
+            cursor.connection.rollback()
+            self._prepare(cursor, name)
+            cursor.execute(execute, params)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Métricas do pool de conexões"""
+        if self.pool is None:
+            return {}
+        return self.pool.get_metrics()
+    
+    def get_query_stats(self, top: Optional[int] = 20, order_by: str = 'total_ms') -> Dict[str, Any]:
+        """Latência (p50/p95/p99), linhas e erros das instruções mais custosas"""
+        return self.query_metrics.get_summary(top, order_by)
+    
+    def reset_query_stats(self):
+        """Zera as métricas das instruções"""
+        self.query_metrics.reset()
+    
+    def get_breaker_stats(self) -> Dict[str, Any]:
+        """Estado e contadores do circuit breaker do banco"""
+        return self.breaker.get_metrics()
+    
+    def get_replica_stats(self) -> Dict[str, Any]:
+        """Métricas da réplica de leitura (vazio sem réplica configurada)"""
+        if self.read_pool is None:
+            return {}
+        return {
+            **self.replica_metrics,
+            'lag_seconds': self._replica_lag,
+            'max_lag_seconds': self.max_replica_lag,
+            'pool': self.read_pool.get_metrics()
+        }
+    
+    def _create_tables(self):
+        """Verifica se tabelas existem (não cria novas)"""
+        try:
+            with self._cursor() as cursor:
+                # Verificar se tabela customers existe
+                cursor.execute("""
+                    SELECT COUNT(*) AS total FROM information_schema.tables 
+                    WHERE table_schema = 'public' 
+                    AND table_name = 'customers'
+                """)
+                
+                result = cursor.fetchone()
+                customers_exists = result['total'] > 0 if result else False
+                
+                # Verificar se tabela conversations existe
+                cursor.execute("""
+                    SELECT COUNT(*) AS total FROM information_schema.tables 
+                    WHERE table_schema = 'public' 
+                    AND table_name = 'conversations'
+                """)
+                
+                result = cursor.fetchone()
+                conversations_exists = result['total'] > 0 if result else False
             
             if customers_exists and conversations_exists:
                 logger.info("✅ Tabelas existentes verificadas com sucesso!")
@@ -164,231 +597,635 @@ class DatabaseManager:
             
         except Exception as e:
             logger.error(f"❌ Erro ao verificar tabelas: {str(e)}")
-            self.connected = False
     
     def save_customer_data(self, customer: Customer) -> bool:
-        """Salva dados do cliente no banco (estrutura existente)"""
+        """Salva dados do cliente no banco (upsert por protocolo em uma ida ao banco)"""
         try:
             if not self.connected:
                 logger.warning("⚠️ Banco não conectado - usando cache apenas")
                 return False
             
-            # Verificar se cliente já existe
-            self.cursor.execute("SELECT id FROM customers WHERE protocolo = %s", (customer.protocolo,))
-            existing = self.cursor.fetchone()
-            
-            if existing:
-                # Atualizar cliente existente
-                self.cursor.execute("""
-                    UPDATE customers SET
-                        first_name = %s, documento = %s, cobrado_fpd = %s, dias_fpd = %s,
-                        data_vencimento_fpd = %s, contrato = %s, regional = %s,
-                        territorio = %s, dsc_plano = %s, valor_mensalidade = %s, empresa = %s,
-                        status = %s, priority = %s, is_customer = %s, last_contact = %s,
-                        conversation_count = %s, payment_promises = %s, last_payment_date = %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE protocolo = %s
-                """, (
-                    customer.first_name, customer.documento, customer.cobrado_fpd, customer.dias_fpd,
-                    customer.data_vencimento_fpd, customer.contrato, customer.regional,
-                    customer.territorio, customer.dsc_plano, customer.valor_mensalidade, customer.empresa,
-                    customer.status, customer.priority, customer.is_customer, customer.last_contact,
-                    customer.conversation_count, customer.payment_promises, customer.last_payment_date,
-                    customer.protocolo
-                ))
-                logger.info(f"🔄 Cliente {customer.first_name} atualizado no banco")
-            else:
-                # Inserir novo cliente
-                self.cursor.execute("""
+            with self._cursor() as cursor:
+                cursor.execute("""
                     INSERT INTO customers (
                         protocolo, first_name, documento, cobrado_fpd, dias_fpd,
                         data_vencimento_fpd, contrato, regional, territorio, dsc_plano, 
                         valor_mensalidade, empresa, status, priority, is_customer, last_contact,
-                        conversation_count, payment_promises, last_payment_date
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        conversation_count, payment_promises, last_payment_date, phone_e164
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (protocolo) DO UPDATE SET
+                        first_name = EXCLUDED.first_name, documento = EXCLUDED.documento,
+                        cobrado_fpd = EXCLUDED.cobrado_fpd, dias_fpd = EXCLUDED.dias_fpd,
+                        data_vencimento_fpd = EXCLUDED.data_vencimento_fpd, contrato = EXCLUDED.contrato,
+                        regional = EXCLUDED.regional, territorio = EXCLUDED.territorio,
+                        dsc_plano = EXCLUDED.dsc_plano, valor_mensalidade = EXCLUDED.valor_mensalidade,
+                        empresa = EXCLUDED.empresa, status = EXCLUDED.status, priority = EXCLUDED.priority,
+                        is_customer = EXCLUDED.is_customer, last_contact = EXCLUDED.last_contact,
+                        conversation_count = EXCLUDED.conversation_count,
+                        payment_promises = EXCLUDED.payment_promises,
+                        last_payment_date = EXCLUDED.last_payment_date,
+                        phone_e164 = COALESCE(EXCLUDED.phone_e164, customers.phone_e164),
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING id, (xmax = 0) AS inserted
                 """, (
                     customer.protocolo, customer.first_name, customer.documento, customer.cobrado_fpd,
                     customer.dias_fpd, customer.data_vencimento_fpd, customer.contrato, customer.regional,
                     customer.territorio, customer.dsc_plano, customer.valor_mensalidade, customer.empresa,
                     customer.status, customer.priority, customer.is_customer, customer.last_contact,
-                    customer.conversation_count, customer.payment_promises, customer.last_payment_date
+                    customer.conversation_count, customer.payment_promises, customer.last_payment_date,
+                    normalize_phone_e164(customer.phone)
                 ))
-                logger.info(f"✅ Cliente {customer.first_name} inserido no banco")
+                result = cursor.fetchone()
             
-            self.connection.commit()
+            if result['inserted']:
+                logger.info(f"✅ Cliente {customer.first_name} inserido no banco")
+            else:
+                logger.info(f"🔄 Cliente {customer.first_name} atualizado no banco")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar cliente no banco: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
     
+    def bulk_upsert_customers(self, customers: Iterable[Any],
+                              chunk_size: int = BULK_UPSERT_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Carga em massa de clientes (Customer ou dict)
+        
+        Cada lote vai por COPY para uma tabela temporária e é mesclado com um
+        único INSERT ... SELECT ... ON CONFLICT. Cada lote é confirmado
+        separadamente. Strings vazias viram NULL.
+        
+        Um lote rejeitado pelo banco (tipo inválido, restrição violada) é
+        desfeito e contado em `failed`, com o erro em `errors`; os demais
+        lotes seguem. Erro de conexão interrompe a carga. Linhas sem
+        protocolo são contadas em `skipped` e protocolos repetidos no mesmo
+        lote em `merged`.
+        """
+        stats = {
+            'success': False,
+            'rows': 0,
+            'inserted': 0,
+            'updated': 0,
+            'chunks': 0,
+            'failed': 0,
+            'skipped': 0,
+            'merged': 0,
+            'errors': [],
+            'elapsed_seconds': 0.0,
+            'rows_per_second': 0.0
+        }
+        started = time.monotonic()
+        
+        try:
+            if not self.connected:
+                logger.warning("⚠️ Banco não conectado - carga em massa cancelada")
+                stats['error'] = 'banco não conectado'
+                return stats
+            
+            columns = ', '.join(BULK_CUSTOMER_COLUMNS)
+            updates = ', '.join(
+                # Telefone ausente na carga não apaga o já gravado
+                f"{column} = COALESCE(EXCLUDED.{column}, customers.{column})" if column == 'phone_e164'
+                else f"{column} = EXCLUDED.{column}"
+                for column in BULK_CUSTOMER_COLUMNS[1:]
+            )
+            
+            with self._cursor(expect_slow=True) as cursor:
+                cursor.execute(f"""
+                    CREATE TEMP TABLE IF NOT EXISTS customers_staging
+                    ON COMMIT DELETE ROWS
+                    AS SELECT {columns} FROM customers WITH NO DATA
+                """)
+                # Confirmada à parte: o rollback de um lote rejeitado não a remove
+                cursor.connection.commit()
+                
+                for number, chunk in enumerate(self._customer_chunks(customers, chunk_size, stats), 1):
+                    try:
+                        buffer = io.StringIO(''.join(format_copy_row(row) for row in chunk))
+                        cursor.copy_expert(f"COPY customers_staging ({columns}) FROM STDIN", buffer)
+                        
+                        cursor.execute(f"""
+                            WITH upserted AS (
+                                INSERT INTO customers ({columns})
+                                SELECT {columns} FROM customers_staging
+                                ON CONFLICT (protocolo) DO UPDATE SET
+                                    {updates}, updated_at = CURRENT_TIMESTAMP
+                                RETURNING (xmax = 0) AS inserted
+                            )
+                            SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE inserted) AS inserted
+                            FROM upserted
+                        """)
+                        result = cursor.fetchone()
+                        
+                        # Confirma o lote (ON COMMIT DELETE ROWS esvazia a tabela temporária)
+                        cursor.connection.commit()
+                        
+                    except Exception as e:
+                        if _is_connection_error(e):
+                            raise
+                        cursor.connection.rollback()
+                        stats['failed'] += len(chunk)
+                        stats['errors'].append(f"lote {number}: {str(e)}")
+                        logger.error(f"❌ Lote {number} rejeitado ({len(chunk)} clientes): {str(e)}")
+                        continue
+                    
+                    stats['chunks'] += 1
+                    stats['rows'] += result['total']
+                    stats['inserted'] += result['inserted']
+                    stats['updated'] += result['total'] - result['inserted']
+                    logger.info(f"📦 Lote {number} carregado: {stats['rows']} clientes")
+            
+            stats['success'] = not stats['failed']
+            
+        except Exception as e:
+            logger.error(f"❌ Erro na carga em massa de clientes: {str(e)}")
+            stats['error'] = str(e)
+        
+        # Lotes já confirmados valem mesmo se um lote seguinte falhou; atualizados
+        # também contam (telefone novo em cliente existente)
+        if stats['rows']:
+            for listener in list(self.import_listeners):
+                try:
+                    listener(stats)
+                except Exception as e:
+                    logger.error(f"❌ Erro no listener da carga em massa: {str(e)}")
+        
+        elapsed = time.monotonic() - started
+        stats['elapsed_seconds'] = elapsed
+        stats['rows_per_second'] = stats['rows'] / elapsed if elapsed > 0 else 0.0
+        logger.info(f"🚀 Carga em massa: {stats['rows']} clientes em {elapsed:.1f}s "
+                    f"({stats['rows_per_second']:.0f} linhas/s)")
+        return stats
+    
+    def _customer_chunks(self, customers: Iterable[Any], chunk_size: int,
+                         stats: Optional[Dict[str, Any]] = None) -> Iterator[List[tuple]]:
+        """
+        Agrupa clientes em lotes de linhas para o COPY
+        
+        Protocolo repetido dentro do lote fica com a última ocorrência
+        (ON CONFLICT não atualiza a mesma linha duas vezes no mesmo comando).
+        Telefones podem se repetir (um telefone, vários contratos). Linhas
+        sem protocolo e protocolos repetidos são contados em `stats`.
+        """
+        chunk: Dict[str, tuple] = {}
+        for customer in customers:
+            data = asdict(customer) if isinstance(customer, Customer) else dict(customer)
+            data['phone_e164'] = normalize_phone_e164(data.get('phone_e164') or data.get('phone'))
+            row = tuple(
+                None if data.get(column) == '' else data.get(column)
+                for column in BULK_CUSTOMER_COLUMNS
+            )
+            if not row[0]:
+                if stats is not None:
+                    stats['skipped'] += 1
+                continue
+            
+            if stats is not None and str(row[0]) in chunk:
+                stats['merged'] += 1
+            chunk[str(row[0])] = row
+            if len(chunk) >= chunk_size:
+                yield list(chunk.values())
+                chunk = {}
+        
+        if chunk:
+            yield list(chunk.values())
+    
     def get_customer_by_protocolo(self, protocolo: str) -> Optional[Customer]:
         """Busca cliente por protocolo"""
         try:
             if not self.connected:
                 return None
             
-            self.cursor.execute("""
-                SELECT * FROM customers WHERE protocolo = %s
-            """, (protocolo,))
+            with self._cursor(positional=True) as cursor:
+                self._execute_prepared(cursor, 'customer_by_protocolo', (protocolo,))
+                result = cursor.fetchone()
             
-            result = self.cursor.fetchone()
-            if result:
-                return self._convert_to_customer(result)
-            
-            return None
+            return self._convert_to_customer(result) if result else None
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar cliente no banco: {str(e)}")
             return None
     
     def get_customer_by_phone(self, phone: str) -> Optional[Customer]:
-        """Busca cliente por telefone (usando documento como fallback)"""
+        """
+        Busca cliente pelo telefone normalizado (E.164), com documento como fallback
+        
+        Com vários contratos no mesmo telefone, retorna o atualizado mais recentemente.
+        """
         try:
             if not self.connected:
                 return None
             
-            # Primeiro tentar buscar por telefone se a coluna existir
-            try:
-                self.cursor.execute("""
-                    SELECT * FROM customers WHERE phone = %s
-                """, (phone,))
-                
-                result = self.cursor.fetchone()
-                if result:
-                    return self._convert_to_customer(result)
-            except Exception:
-                # Se coluna phone não existir, tentar buscar por documento
-                # Assumindo que o telefone pode estar no campo documento
-                self.cursor.execute("""
-                    SELECT * FROM customers WHERE documento = %s
-                """, (phone,))
-                
-                result = self.cursor.fetchone()
-                if result:
-                    return self._convert_to_customer(result)
-            
-            return None
+            return self.find_customer_by_phone(phone)
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar cliente por telefone no banco: {str(e)}")
             return None
     
-    def _convert_to_customer(self, result) -> Customer:
-        """Converte resultado do banco para objeto Customer"""
+    def find_customer_by_phone(self, phone: str) -> Optional[Customer]:
+        """
+        Como get_customer_by_phone, mas levanta a exceção quando a busca falha
+        (banco desconectado, erro na consulta, CircuitOpenError): None
+        significa só que o telefone não está na base
+        """
+        if not self.connected:
+            raise ConnectionError("Banco não conectado")
+        
+        with self._cursor(positional=True) as cursor:
+            phone_e164 = normalize_phone_e164(phone)
+            if phone_e164:
+                self._execute_prepared(cursor, 'customer_by_phone', (phone_e164,))
+                result = cursor.fetchone()
+                if result:
+                    return self._convert_to_customer(result)
+            
+            # Registros antigos podem ter o telefone no campo documento
+            self._execute_prepared(cursor, 'customer_by_documento', (phone,))
+            result = cursor.fetchone()
+        
+        return self._convert_to_customer(result) if result else None
+    
+    @staticmethod
+    def _convert_to_customer(row) -> Customer:
+        """Converte linha (colunas de CUSTOMER_COLUMNS, em ordem) para Customer"""
+        (protocolo, first_name, documento, cobrado_fpd, dias_fpd, data_vencimento_fpd,
+         contrato, regional, territorio, dsc_plano, valor_mensalidade, empresa, status,
+         priority, is_customer, last_contact, conversation_count, payment_promises,
+         last_payment_date, created_at, updated_at, phone_e164) = row
+        
         return Customer(
-            protocolo=result['protocolo'],
-            first_name=result['first_name'] or '',
-            documento=result['documento'] or '',
-            cobrado_fpd=float(result['cobrado_fpd'] or 0),
-            dias_fpd=int(result['dias_fpd'] or 0),
-            data_vencimento_fpd=result['data_vencimento_fpd'].isoformat() if result['data_vencimento_fpd'] else '',
-            contrato=str(result['contrato'] or ''),
-            regional=result['regional'] or '',
-            territorio=result['territorio'] or '',
-            dsc_plano=result['dsc_plano'] or '',
-            valor_mensalidade=float(result['valor_mensalidade'] or 0),
-            empresa=result['empresa'] or '',
-            status=result['status'] or 'active',
-            priority=result['priority'] or 'medium',
-            is_customer=bool(result['is_customer']) if 'is_customer' in result else True,
-            last_contact=result['last_contact'].isoformat() if result['last_contact'] else None,
-            conversation_count=int(result['conversation_count'] or 0) if 'conversation_count' in result else 0,
-            payment_promises=int(result['payment_promises'] or 0) if 'payment_promises' in result else 0,
-            last_payment_date=result['last_payment_date'].isoformat() if result['last_payment_date'] else None,
-            created_at=result['created_at'].isoformat() if result['created_at'] else None,
-            updated_at=result['updated_at'].isoformat() if result['updated_at'] else None
+            protocolo=protocolo,
+            first_name=first_name or '',
+            documento=documento or '',
+            cobrado_fpd=float(cobrado_fpd or 0),
+            dias_fpd=int(dias_fpd or 0),
+            data_vencimento_fpd=_iso(data_vencimento_fpd) or '',
+            contrato=str(contrato or ''),
+            regional=regional or '',
+            territorio=territorio or '',
+            dsc_plano=dsc_plano or '',
+            valor_mensalidade=float(valor_mensalidade or 0),
+            empresa=empresa or '',
+            status=status or 'active',
+            priority=priority or 'medium',
+            is_customer=bool(is_customer) if is_customer is not None else True,
+            last_contact=_iso(last_contact),
+            conversation_count=int(conversation_count or 0),
+            payment_promises=int(payment_promises or 0),
+            last_payment_date=_iso(last_payment_date),
+            created_at=_iso(created_at),
+            updated_at=_iso(updated_at),
+            phone=phone_e164
         )
     
     def save_conversation_context(self, context: Conversation) -> bool:
-        """Salva contexto da conversa no banco"""
+        """
+        Salva contexto da conversa no banco
+        
+        Os itens de `context.conversation_history` são os novos turnos: são
+        anexados em conversation_events. O registro da conversa guarda só agregados.
+        Upsert e eventos vão em um único comando.
+        """
         try:
             if not self.connected:
                 logger.warning("⚠️ Banco não conectado - usando cache apenas")
                 return False
             
-            # Verificar se conversa já existe
-            self.cursor.execute("SELECT id FROM conversations WHERE phone = %s", (context.phone,))
-            existing = self.cursor.fetchone()
-            
-            if existing:
-                # Atualizar conversa existente
-                self.cursor.execute("""
-                    UPDATE conversations SET
-                        customer_name = %s, debt_amount = %s, days_overdue = %s,
-                        conversation_history = %s, cooperation_level = %s, lie_probability = %s,
-                        urgency_level = %s, last_intent = %s, last_sentiment = %s,
-                        payment_promises = %s, last_contact = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE phone = %s
-                """, (
-                    context.customer_name, context.debt_amount, context.days_overdue,
-                    json.dumps(context.conversation_history), context.cooperation_level,
-                    context.lie_probability, context.urgency_level, context.last_intent,
-                    context.last_sentiment, context.payment_promises, context.last_contact,
-                    context.phone
-                ))
-                logger.info(f"🔄 Contexto da conversa atualizado no banco: {context.phone}")
+            with self._cursor() as cursor:
+                result = self._upsert_conversation_turn(cursor, context)
+            
+            if result['inserted']:
+                logger.info(f"✅ Contexto da conversa inserido no banco: {context.phone}")
             else:
-                # Inserir nova conversa
-                self.cursor.execute("""
-                    INSERT INTO conversations (
-                        phone, customer_name, debt_amount, days_overdue, conversation_history,
-                        cooperation_level, lie_probability, urgency_level, last_intent,
-                        last_sentiment, payment_promises, last_contact
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
+                logger.info(f"🔄 Contexto da conversa atualizado no banco: {context.phone}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar contexto no banco: {str(e)}")
+            return False
+    
+    def commit_conversation_turn(self, context: Conversation, protocolo: Optional[str] = None,
+                                 payment_promise: bool = False) -> bool:
+        """
+        Grava um turno de conversa em uma única transação
+        
+        Upsert dos agregados da conversa, eventos do turno e contadores de
+        interação do cliente (conversation_count, payment_promises, last_contact).
+        """
+        try:
+            if not self.connected:
+                logger.warning("⚠️ Banco não conectado - usando cache apenas")
+                return False
+            
+            with self._cursor() as cursor:
+                result = self._upsert_conversation_turn(
+                    cursor, context, protocolo=protocolo, payment_promises=1 if payment_promise else 0
+                )
+            
+            if protocolo and result['conversation_count'] is None:
+                logger.warning(f"⚠️ Cliente {protocolo} não encontrado para atualizar interação")
+            
+            logger.info(f"💾 Turno da conversa gravado no banco: {context.phone}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar turno da conversa: {str(e)}")
+            return False
+    
+    def commit_conversation_turns(self, turns: List[Tuple[Conversation, Optional[str], int, int]]) -> bool:
+        """
+        Grava vários turnos já agrupados por telefone em uma única transação
+        
+        Cada item é (contexto, protocolo, interações, promessas de pagamento):
+        o contexto traz os agregados mais recentes e, em conversation_history,
+        todos os turnos novos do telefone. Usado pelo buffer write-behind.
+        """
+        try:
+            if not turns:
+                return True
+            if not self.connected:
+                logger.warning("⚠️ Banco não conectado - usando cache apenas")
+                return False
+            
+            from psycopg2.extras import execute_values
+            
+            conversation_rows = []
+            event_rows = []
+            customer_updates: Dict[str, List[Any]] = {}
+            for context, protocolo, interactions, payment_promises in turns:
+                events = context.conversation_history
+                conversation_rows.append((
                     context.phone, context.customer_name, context.debt_amount,
-                    context.days_overdue, json.dumps(context.conversation_history),
-                    context.cooperation_level, context.lie_probability, context.urgency_level,
-                    context.last_intent, context.last_sentiment, context.payment_promises,
-                    context.last_contact
+                    context.days_overdue, context.cooperation_level, context.lie_probability,
+                    context.urgency_level, context.last_intent, context.last_sentiment,
+                    context.payment_promises, context.last_contact, len(events),
+                    recent_history_json(events)
                 ))
-                logger.info(f"✅ Contexto da conversa inserido no banco: {context.phone}")
+                event_rows.extend(self._conversation_event_rows(context.phone, events))
+                
+                if protocolo:
+                    # Telefones diferentes do mesmo cliente somam no mesmo UPDATE
+                    update = customer_updates.setdefault(protocolo, [protocolo, 0, 0, None])
+                    update[1] += interactions
+                    update[2] += payment_promises
+                    update[3] = max(filter(None, (update[3], context.last_contact)),
+                                    default=datetime.now().isoformat())
             
-            self.connection.commit()
+            with self._cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO conversations (
+                        phone, customer_name, debt_amount, days_overdue,
+                        cooperation_level, lie_probability, urgency_level, last_intent,
+                        last_sentiment, payment_promises, last_contact, message_count, recent_history
+                    ) VALUES %s
+                    ON CONFLICT (phone) DO UPDATE SET
+                        customer_name = EXCLUDED.customer_name, debt_amount = EXCLUDED.debt_amount,
+                        days_overdue = EXCLUDED.days_overdue, cooperation_level = EXCLUDED.cooperation_level,
+                        lie_probability = EXCLUDED.lie_probability, urgency_level = EXCLUDED.urgency_level,
+                        last_intent = EXCLUDED.last_intent, last_sentiment = EXCLUDED.last_sentiment,
+                        payment_promises = EXCLUDED.payment_promises, last_contact = EXCLUDED.last_contact,
+                        message_count = COALESCE(conversations.message_count, 0) + EXCLUDED.message_count,
+                        recent_history = """ + RECENT_HISTORY_APPEND + """,
+                        updated_at = CURRENT_TIMESTAMP
+                """, conversation_rows,
+                    template=CONVERSATION_ROW_TEMPLATE,
+                    page_size=len(conversation_rows))
+                
+                if event_rows:
+                    execute_values(cursor, """
+                        INSERT INTO conversation_events (
+                            phone, event_timestamp, customer_message, bot_response,
+                            intent, urgency_level, message_type
+                        ) VALUES %s
+                    """, event_rows, page_size=len(event_rows))
+                
+                if customer_updates:
+                    execute_values(cursor, """
+                        UPDATE customers AS c SET
+                            conversation_count = COALESCE(c.conversation_count, 0) + d.interactions,
+                            payment_promises = COALESCE(c.payment_promises, 0) + d.payment_promises,
+                            last_contact = d.last_contact,
+                            updated_at = CURRENT_TIMESTAMP
+                        FROM (VALUES %s) AS d(protocolo, interactions, payment_promises, last_contact)
+                        WHERE c.protocolo = d.protocolo
+                    """, [tuple(update) for update in customer_updates.values()],
+                        template="(%s, %s::integer, %s::integer, %s::timestamp)",
+                        page_size=len(customer_updates))
+            
+            logger.info(f"💾 {len(turns)} conversas gravadas em lote ({len(event_rows)} turnos)")
             return True
             
         except Exception as e:
-            logger.error(f"❌ Erro ao salvar contexto no banco: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
+            logger.error(f"❌ Erro ao gravar lote de turnos: {str(e)}")
+            return False
+    
+    def _upsert_conversation_turn(self, cursor, context: Conversation, protocolo: Optional[str] = None,
+                                  payment_promises: int = 0) -> Dict[str, Any]:
+        """
+        Monta e executa o comando único do turno
+        
+        CTEs de escrita: upsert em conversations, INSERT em conversation_events e,
+        com protocolo, UPDATE dos contadores em customers.
+        """
+        events = context.conversation_history
+        params: List[Any] = [
+            context.phone, context.customer_name, context.debt_amount,
+            context.days_overdue, context.cooperation_level, context.lie_probability,
+            context.urgency_level, context.last_intent, context.last_sentiment,
+            context.payment_promises, context.last_contact, len(events),
+            recent_history_json(events)
+        ]
+        
+        query = """
+            WITH conversation AS (
+                INSERT INTO conversations (
+                    phone, customer_name, debt_amount, days_overdue,
+                    cooperation_level, lie_probability, urgency_level, last_intent,
+                    last_sentiment, payment_promises, last_contact, message_count, recent_history
+                ) VALUES """ + CONVERSATION_ROW_TEMPLATE + """
+                ON CONFLICT (phone) DO UPDATE SET
+                    customer_name = EXCLUDED.customer_name, debt_amount = EXCLUDED.debt_amount,
+                    days_overdue = EXCLUDED.days_overdue, cooperation_level = EXCLUDED.cooperation_level,
+                    lie_probability = EXCLUDED.lie_probability, urgency_level = EXCLUDED.urgency_level,
+                    last_intent = EXCLUDED.last_intent, last_sentiment = EXCLUDED.last_sentiment,
+                    payment_promises = EXCLUDED.payment_promises, last_contact = EXCLUDED.last_contact,
+                    message_count = COALESCE(conversations.message_count, 0) + EXCLUDED.message_count,
+                    recent_history = """ + RECENT_HISTORY_APPEND + """,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING id, (xmax = 0) AS inserted
+            )"""
+        
+        if events:
+            query += """,
+            events AS (
+                INSERT INTO conversation_events (
+                    phone, event_timestamp, customer_message, bot_response,
+                    intent, urgency_level, message_type
+                ) VALUES """ + self._conversation_events_values(cursor, context.phone, events) + """
+            )"""
+        
+        if protocolo:
+            query += """,
+            customer AS (
+                UPDATE customers SET
+                    conversation_count = COALESCE(conversation_count, 0) + 1,
+                    payment_promises = COALESCE(payment_promises, 0) + %s,
+                    last_contact = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE protocolo = %s
+                RETURNING conversation_count
+            )
+            SELECT id, inserted, (SELECT conversation_count FROM customer) AS conversation_count
+            FROM conversation"""
+            params += [payment_promises, context.last_contact or datetime.now().isoformat(), protocolo]
+        else:
+            query += """
+            SELECT id, inserted, NULL AS conversation_count FROM conversation"""
+        
+        cursor.execute(query, params)
+        return cursor.fetchone()
+    
+    def _conversation_event_rows(self, phone: str, events: List[Dict]) -> List[tuple]:
+        """Linhas de conversation_events a partir dos itens do histórico"""
+        return [
+            (
+                phone, entry['timestamp'], entry['customer_message'], entry['bot_response'],
+                entry['intent'], entry['urgency_level'], entry['message_type']
+            )
+            for entry in history_entries(events)
+        ]
+    
+    def _conversation_events_values(self, cursor, phone: str, events: List[Dict]) -> str:
+        """Lista VALUES dos turnos já escapada (mogrify), pronta para compor o comando"""
+        from psycopg2.extensions import encodings
+        
+        encoding = encodings[cursor.connection.encoding]
+        rows = [
+            cursor.mogrify("(%s, %s, %s, %s, %s, %s, %s)", row).decode(encoding)
+            for row in self._conversation_event_rows(phone, events)
+        ]
+        # '%' literal nas mensagens não pode ser lido como placeholder
+        return ', '.join(rows).replace('%', '%%')
+    
+    def _insert_conversation_events(self, cursor, phone: str, events: List[Dict]):
+        """Insere turnos em conversation_events com um único INSERT multi-linha"""
+        if not events:
+            return
+        
+        from psycopg2.extras import execute_values
+        
+        execute_values(cursor, """
+            INSERT INTO conversation_events (
+                phone, event_timestamp, customer_message, bot_response,
+                intent, urgency_level, message_type
+            ) VALUES %s
+        """, self._conversation_event_rows(phone, events))
+    
+    def append_conversation_events(self, phone: str, events: List[Dict]) -> bool:
+        """Anexa turnos de conversa sem tocar no registro de agregados"""
+        try:
+            if not self.connected:
+                return False
+            
+            with self._cursor() as cursor:
+                self._insert_conversation_events(cursor, phone, events)
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao anexar eventos da conversa: {str(e)}")
             return False
     
-    def get_conversation_context(self, phone: str) -> Optional[Conversation]:
-        """Busca contexto da conversa por telefone"""
+    def get_conversation_events(self, phone: str, limit: int = CONVERSATION_HISTORY_LIMIT) -> List[Dict]:
+        """Busca os últimos `limit` turnos (varredura de intervalo em phone, event_timestamp)"""
         try:
             if not self.connected:
-                return None
+                return []
             
-            self.cursor.execute("""
-                SELECT * FROM conversations WHERE phone = %s
-            """, (phone,))
+            with self._cursor() as cursor:
+                return self._fetch_conversation_events(cursor, phone, limit)
             
-            result = self.cursor.fetchone()
-            if result:
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar eventos da conversa: {str(e)}")
+            return []
+    
+    def _fetch_conversation_events(self, cursor, phone: str, limit: int) -> List[Dict]:
+        """Últimos turnos em ordem cronológica usando o cursor da operação atual"""
+        self._execute_prepared(cursor, 'conversation_events_recent', (phone, limit))
+        
+        events = [self._convert_to_event(row) for row in cursor.fetchall()]
+        events.reverse()  # Ordem cronológica
+        return events
+    
+    @staticmethod
+    def _convert_to_event(row) -> Dict:
+        """Converte linha (colunas de EVENT_COLUMNS) para o formato do histórico"""
+        event_timestamp, customer_message, bot_response, intent, urgency_level, message_type = row
+        return {
+            'timestamp': _iso(event_timestamp),
+            'customer_message': customer_message,
+            'bot_response': bot_response,
+            'intent': intent,
+            'urgency_level': float(urgency_level) if urgency_level is not None else None,
+            'message_type': message_type
+        }
+    
+    @staticmethod
+    def _convert_to_conversation(row) -> Conversation:
+        """Converte linha (colunas de CONVERSATION_COLUMNS) para Conversation (sem histórico)"""
+        (phone, customer_name, debt_amount, days_overdue, cooperation_level, lie_probability,
+         urgency_level, last_intent, last_sentiment, payment_promises, last_contact,
+         message_count, created_at, updated_at) = row
+        
+        return Conversation(
+            phone=phone,
+            customer_name=customer_name,
+            debt_amount=float(debt_amount or 0),
+            days_overdue=int(days_overdue or 0),
+            conversation_history=[],
+            cooperation_level=float(cooperation_level or 0.5),
+            lie_probability=float(lie_probability or 0.0),
+            urgency_level=float(urgency_level or 0.5),
+            last_intent=last_intent,
+            last_sentiment=last_sentiment,
+            payment_promises=int(payment_promises or 0),
+            last_contact=_iso(last_contact),
+            message_count=int(message_count or 0),
+            created_at=_iso(created_at),
+            updated_at=_iso(updated_at)
+        )
+    
+    def get_conversation_context(self, phone: str,
+                                 history_limit: int = CONVERSATION_HISTORY_LIMIT) -> Optional[Conversation]:
+        """
+        Busca contexto da conversa por telefone (agregados + últimos turnos)
+        
+        Até CONVERSATION_HISTORY_LIMIT turnos vêm da cauda JSONB na mesma
+        consulta; limites maiores leem conversation_events.
+        """
+        try:
+            if not self.connected:
+                return None
+            
+            tail_limit = max(1, min(history_limit, CONVERSATION_HISTORY_LIMIT))
+            with self._cursor(positional=True) as cursor:
+                self._execute_prepared(cursor, 'conversation_by_phone', (phone, tail_limit))
+                result = cursor.fetchone()
+                if not result:
+                    return None
+                
                 # Converter resultado para Conversation
-                conversation = Conversation(
-                    phone=result['phone'],
-                    customer_name=result['customer_name'],
-                    debt_amount=float(result['debt_amount'] or 0),
-                    days_overdue=int(result['days_overdue'] or 0),
-                    conversation_history=json.loads(result['conversation_history'] or '[]'),
-                    cooperation_level=float(result['cooperation_level'] or 0.5),
-                    lie_probability=float(result['lie_probability'] or 0.0),
-                    urgency_level=float(result['urgency_level'] or 0.5),
-                    last_intent=result['last_intent'],
-                    last_sentiment=result['last_sentiment'],
-                    payment_promises=int(result['payment_promises'] or 0),
-                    last_contact=result['last_contact'].isoformat() if result['last_contact'] else None,
-                    created_at=result['created_at'].isoformat() if result['created_at'] else None,
-                    updated_at=result['updated_at'].isoformat() if result['updated_at'] else None
-                )
+                conversation = self._convert_to_conversation(result[:-1])
+                if history_limit > CONVERSATION_HISTORY_LIMIT:
+                    conversation.conversation_history = self._fetch_conversation_events(
+                        cursor, phone, history_limit
+                    )
+                else:
+                    history = result[-1]
+                    conversation.conversation_history = json.loads(history) if isinstance(history, str) else history
                 return conversation
             
-            return None
-            
         except Exception as e:
             logger.error(f"❌ Erro ao buscar contexto no banco: {str(e)}")
             return None
@@ -399,109 +1236,206 @@ class DatabaseManager:
             if not self.connected:
                 return []
             
-            self.cursor.execute("""
-                SELECT * FROM customers ORDER BY updated_at DESC LIMIT %s
-            """, (limit,))
-            
-            results = self.cursor.fetchall()
-            customers = []
-            
-            for result in results:
-                customer = Customer(
-                    phone=result['phone'],
-                    name=result['name'],
-                    documento=result['documento'] or '',
-                    debt_amount=float(result['debt_amount'] or 0),
-                    days_overdue=int(result['days_overdue'] or 0),
-                    due_date=result['due_date'] or '',
-                    protocolo=result['protocolo'] or '',
-                    contrato=result['contrato'] or '',
-                    regional=result['regional'] or '',
-                    territorio=result['territorio'] or '',
-                    plano=result['plano'] or '',
-                    valor_mensalidade=float(result['valor_mensalidade'] or 0),
-                    company=result['company'] or '',
-                    status=result['status'] or 'active',
-                    priority=result['priority'] or 'medium',
-                    is_customer=bool(result['is_customer']),
-                    last_contact=result['last_contact'].isoformat() if result['last_contact'] else None,
-                    conversation_count=int(result['conversation_count'] or 0),
-                    payment_promises=int(result['payment_promises'] or 0),
-                    last_payment_date=result['last_payment_date'].isoformat() if result['last_payment_date'] else None,
-                    created_at=result['created_at'].isoformat() if result['created_at'] else None,
-                    updated_at=result['updated_at'].isoformat() if result['updated_at'] else None
-                )
-                customers.append(customer)
-            
-            return customers
+            with self._cursor(positional=True, read_only=True, expect_slow=True) as cursor:
+                cursor.execute(f"""
+                    SELECT {CUSTOMER_SELECT} FROM customers ORDER BY updated_at DESC LIMIT %s
+                """, (limit,))
+                
+                return [self._convert_to_customer(result) for result in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar clientes no banco: {str(e)}")
             return []
     
-    def get_customers_by_company(self, empresa: str) -> List[Customer]:
-        """Busca clientes por empresa"""
+    def get_customers_by_company(self, empresa: str, limit: int = 1000) -> List[Customer]:
+        """Busca clientes por empresa (limitado; use iter_customers_by_company para todos)"""
         try:
             if not self.connected:
                 return []
             
-            self.cursor.execute("""
-                SELECT * FROM customers WHERE empresa = %s ORDER BY updated_at DESC
-            """, (empresa,))
-            
-            results = self.cursor.fetchall()
-            customers = []
-            
-            for result in results:
-                customer = Customer(
-                    phone=result['phone'],
-                    name=result['name'],
-                    documento=result['documento'] or '',
-                    debt_amount=float(result['debt_amount'] or 0),
-                    days_overdue=int(result['days_overdue'] or 0),
-                    due_date=result['due_date'] or '',
-                    protocolo=result['protocolo'] or '',
-                    contrato=result['contrato'] or '',
-                    regional=result['regional'] or '',
-                    territorio=result['territorio'] or '',
-                    plano=result['plano'] or '',
-                    valor_mensalidade=float(result['valor_mensalidade'] or 0),
-                    company=result['company'] or '',
-                    status=result['status'] or 'active',
-                    priority=result['priority'] or 'medium',
-                    is_customer=bool(result['is_customer']),
-                    last_contact=result['last_contact'].isoformat() if result['last_contact'] else None,
-                    conversation_count=int(result['conversation_count'] or 0),
-                    payment_promises=int(result['payment_promises'] or 0),
-                    last_payment_date=result['last_payment_date'].isoformat() if result['last_payment_date'] else None,
-                    created_at=result['created_at'].isoformat() if result['created_at'] else None,
-                    updated_at=result['updated_at'].isoformat() if result['updated_at'] else None
-                )
-                customers.append(customer)
-            
-            return customers
+            with self._cursor(positional=True, read_only=True, expect_slow=True) as cursor:
+                cursor.execute(f"""
+                    SELECT {CUSTOMER_SELECT} FROM customers WHERE empresa = %s ORDER BY updated_at DESC LIMIT %s
+                """, (empresa, limit))
+                
+                return [self._convert_to_customer(result) for result in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar clientes por empresa: {str(e)}")
             return []
     
+    def get_customers_page(self, limit: int = 50, cursor: Optional[str] = None,
+                           empresa: Optional[str] = None) -> Tuple[List[Customer], Optional[str]]:
+        """
+        Página de clientes ordenada por (updated_at, protocolo) decrescente
+        
+        Paginação keyset: o cursor guarda a chave da última linha e a próxima
+        página começa com uma busca no índice, então páginas profundas custam
+        o mesmo que a primeira. Levanta ValueError se o cursor for inválido.
+        """
+        after = decode_cursor(cursor, 2) if cursor else None
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        
+        try:
+            if not self.connected:
+                return [], None
+            
+            conditions = []
+            params: List[Any] = []
+            if empresa:
+                conditions.append("empresa = %s")
+                params.append(empresa)
+            if after:
+                conditions.append("(updated_at, protocolo) < (%s, %s)")
+                params.extend(after)
+            
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            params.append(limit + 1)
+            
+            with self._cursor(positional=True, read_only=True) as db_cursor:
+                db_cursor.execute(f"""
+                    SELECT {CUSTOMER_SELECT} FROM customers {where}
+                    ORDER BY updated_at DESC, protocolo DESC
+                    LIMIT %s
+                """, params)
+                rows = db_cursor.fetchall()
+            
+            customers = [self._convert_to_customer(row) for row in rows[:limit]]
+            
+            next_cursor = None
+            if len(rows) > limit:
+                last = customers[-1]
+                next_cursor = encode_cursor([last.updated_at, last.protocolo])
+            
+            return customers, next_cursor
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao paginar clientes: {str(e)}")
+            return [], None
+    
+    def get_conversations_page(self, limit: int = 50,
+                               cursor: Optional[str] = None) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Página de conversas ordenada por (last_contact, phone) decrescente
+        
+        Só agregados; o histórico de cada conversa fica em get_conversation_events.
+        Levanta ValueError se o cursor for inválido.
+        """
+        after = decode_cursor(cursor, 2) if cursor else None
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        
+        try:
+            if not self.connected:
+                return [], None
+            
+            where = "WHERE (last_contact, phone) < (%s, %s)" if after else ''
+            params = (after or []) + [limit + 1]
+            
+            with self._cursor(positional=True, read_only=True) as db_cursor:
+                db_cursor.execute(f"""
+                    SELECT {CONVERSATION_SELECT} FROM conversations {where}
+                    ORDER BY last_contact DESC, phone DESC
+                    LIMIT %s
+                """, params)
+                rows = db_cursor.fetchall()
+            
+            conversations = [self._convert_to_conversation(row) for row in rows[:limit]]
+            
+            next_cursor = None
+            if len(rows) > limit:
+                last = conversations[-1]
+                next_cursor = encode_cursor([last.last_contact, last.phone])
+            
+            return conversations, next_cursor
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao paginar conversas: {str(e)}")
+            return [], None
+    
+    def iter_customers(self, itersize: int = STREAM_ITERSIZE) -> Iterator[Customer]:
+        """
+        Percorre todos os clientes em memória constante
+        
+        Cursor nomeado (server-side) traz `itersize` linhas por ida ao banco.
+        A conexão fica emprestada até o iterador terminar ou ser fechado.
+        """
+        return self._stream_rows(f"SELECT {CUSTOMER_SELECT} FROM customers ORDER BY protocolo", (),
+                                 itersize, self._convert_to_customer)
+    
+    def iter_customers_by_company(self, empresa: str, itersize: int = STREAM_ITERSIZE) -> Iterator[Customer]:
+        """Percorre os clientes de uma empresa em memória constante"""
+        return self._stream_rows(
+            f"SELECT {CUSTOMER_SELECT} FROM customers WHERE empresa = %s ORDER BY protocolo", (empresa,),
+            itersize, self._convert_to_customer
+        )
+    
+    def iter_customer_phones(self, itersize: int = STREAM_ITERSIZE) -> Iterator[Tuple[Optional[str], str]]:
+        """Percorre (phone_e164, documento) de todos os clientes, sem carregar as demais colunas"""
+        return self._stream_rows("SELECT phone_e164, documento FROM customers", (), itersize, tuple)
+    
+    def _stream_rows(self, query: str, params: tuple, itersize: int, convert: Callable[[Any], Any]) -> Iterator[Any]:
+        """
+        Gera linhas convertidas a partir de um cursor server-side
+        
+        Erros no meio da leitura são registrados e propagados, para que uma
+        exportação parcial não pareça completa.
+        """
+        if not self.connected:
+            return
+        
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("banco de dados indisponível (circuito aberto)")
+        started = time.monotonic()
+        try:
+            pool, conn = self._checkout(read_only=True)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        discard = False
+        executed = False
+        try:
+            with conn.cursor(name=f"stream_customers_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, params)
+                # Sucesso só depois da consulta (fecha o circuito em half_open)
+                executed = True
+                self.breaker.record_success(time.monotonic() - started)
+                
+                for result in cursor:
+                    yield convert(result)
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao percorrer clientes no banco: {str(e)}")
+            if _is_connection_error(e):
+                self.breaker.record_failure()
+            elif not executed:
+                # Erro de SQL: o banco respondeu (libera a tentativa do half_open)
+                self.breaker.record_success(time.monotonic() - started)
+            raise
+        
+        finally:
+            # Encerra a transação de leitura (também quando o iterador é abandonado)
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            pool.putconn(conn, discard=discard)
+    
     def delete_customer(self, protocolo: str) -> bool:
         """Remove cliente do banco"""
         try:
             if not self.connected:
                 return False
             
-            self.cursor.execute("DELETE FROM customers WHERE protocolo = %s", (protocolo,))
-            self.cursor.execute("DELETE FROM conversations WHERE customer_protocolo = %s", (protocolo,))
+            with self._cursor() as cursor:
+                cursor.execute("DELETE FROM customers WHERE protocolo = %s", (protocolo,))
+                cursor.execute("DELETE FROM conversations WHERE customer_protocolo = %s", (protocolo,))
             
-            self.connection.commit()
             logger.info(f"🗑️ Cliente {protocolo} removido do banco")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erro ao remover cliente: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
     
     def clear_all_data(self) -> bool:
@@ -510,68 +1444,167 @@ class DatabaseManager:
             if not self.connected:
                 return False
             
-            self.cursor.execute("DELETE FROM conversations")
-            self.cursor.execute("DELETE FROM customers")
+            with self._cursor(expect_slow=True) as cursor:
+                cursor.execute("DELETE FROM conversations")
+                cursor.execute("DELETE FROM customers")
             
-            self.connection.commit()
             logger.warning("🗑️ TODOS OS DADOS FORAM REMOVIDOS!")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erro ao limpar dados: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
     
     def get_database_stats(self) -> Dict[str, Any]:
-        """Retorna estatísticas do banco"""
+        """
+        Retorna estatísticas do banco
+        
+        Lê a linha única de database_stats, mantida por triggers (migração 006).
+        Sem a migração, calcula as agregações sobre as tabelas.
+        """
         try:
             if not self.connected:
                 return {'connected': False}
             
-            # Contar clientes
-            self.cursor.execute("SELECT COUNT(*) as total FROM customers")
-            customers_count = self.cursor.fetchone()['total']
-            
-            # Contar conversas
-            self.cursor.execute("SELECT COUNT(*) as total FROM conversations")
-            conversations_count = self.cursor.fetchone()['total']
-            
-            # Total de dívidas
-            self.cursor.execute("SELECT SUM(cobrado_fpd) as total FROM customers WHERE cobrado_fpd > 0")
-            total_debt = self.cursor.fetchone()['total'] or 0
-            
-            # Clientes com dívida
-            self.cursor.execute("SELECT COUNT(*) as total FROM customers WHERE cobrado_fpd > 0")
-            customers_with_debt = self.cursor.fetchone()['total']
+            with self._cursor(read_only=True) as cursor:
+                stats = self._read_stats_row(cursor)
+                if stats is None:
+                    stats = self._aggregate_stats(cursor)
             
             return {
                 'connected': True,
-                'customers_total': customers_count,
-                'conversations_total': conversations_count,
-                'total_debt': float(total_debt),
-                'customers_with_debt': customers_with_debt,
+                'customers_total': stats['customers_total'],
+                'conversations_total': stats['conversations_total'],
+                'total_debt': float(stats['total_debt'] or 0),
+                'customers_with_debt': stats['customers_with_debt'],
+                'stats_updated_at': _iso(stats.get('updated_at')),
                 'database_url': DATABASE_URL if 'localhost' not in DATABASE_URL else 'Local',
                 'connection_info': {
                     'host': DB_HOST,
                     'port': DB_PORT,
                     'database': DB_NAME,
                     'user': DB_USER
-                }
+                },
+                'pool': self.get_pool_stats(),
+                'replica': self.get_replica_stats()
             }
             
         except Exception as e:
             logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
             return {'connected': False, 'error': str(e)}
     
+    def _read_stats_row(self, cursor) -> Optional[Dict[str, Any]]:
+        """Linha de database_stats, ou None se a tabela não existir"""
+        try:
+            cursor.execute("""
+                SELECT customers_total, conversations_total, customers_with_debt, total_debt, updated_at
+                FROM database_stats WHERE id
+            """)
+            return cursor.fetchone()
+        except Exception as e:
+            cursor.connection.rollback()
+            logger.warning(f"⚠️ database_stats indisponível, calculando agregações: {str(e)}")
+            return None
+    
+    def _aggregate_stats(self, cursor) -> Dict[str, Any]:
+        """Calcula as estatísticas diretamente nas tabelas"""
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM customers) AS customers_total,
+                (SELECT COUNT(*) FROM conversations) AS conversations_total,
+                COUNT(*) AS customers_with_debt,
+                COALESCE(SUM(cobrado_fpd), 0) AS total_debt
+            FROM customers WHERE cobrado_fpd > 0
+        """)
+        return cursor.fetchone()
+    
+    def refresh_database_stats(self) -> bool:
+        """Recalcula database_stats a partir das tabelas (corrige qualquer desvio)"""
+        try:
+            if not self.connected:
+                return False
+            
+            with self._cursor(expect_slow=True) as cursor:
+                cursor.execute("SELECT refresh_database_stats()")
+            
+            logger.info("📊 Estatísticas do banco recalculadas")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao recalcular estatísticas: {str(e)}")
+            return False
+    
+    def get_missing_indexes(self) -> List[str]:
+        """
+        Índices de REQUIRED_INDEXES que não existem no banco
+        
+        Índices de tabelas que ainda não existem não contam: as migrações
+        que os criam ficam pendentes até a tabela aparecer.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT indexname FROM pg_indexes
+                WHERE schemaname = 'public' AND indexname = ANY(%s)
+            """, (list(REQUIRED_INDEXES),))
+            existing = {row['indexname'] for row in cursor.fetchall()}
+            
+            tables = sorted(set(REQUIRED_INDEXES.values()))
+            cursor.execute("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_schema = 'public' AND table_name = ANY(%s)
+            """, (tables,))
+            present = {row['table_name'] for row in cursor.fetchall()}
+        
+        return sorted(
+            name for name, table in REQUIRED_INDEXES.items()
+            if table in present and name not in existing
+        )
+    
+    def run_migrations(self) -> bool:
+        """Aplica as migrações pendentes (backend/database/migrations) com uma conexão do pool"""
+        if not self.connected:
+            logger.warning("⚠️ Banco não conectado - migrações ignoradas")
+            return False
+        
+        try:
+            from backend.database.migration_runner import run_migrations
+            
+            with self.pool.connection() as conn:
+                return run_migrations(conn)
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao executar migrações: {str(e)}")
+            return False
+    
+    def verify_required_indexes(self):
+        """
+        Falha a inicialização se faltar algum índice esperado
+        
+        Sem eles as buscas por telefone e a paginação viram varreduras
+        completas. Levanta RuntimeError indicando as migrações pendentes.
+        """
+        if not self.connected:
+            logger.warning("⚠️ Banco não conectado - verificação de índices ignorada")
+            return
+        
+        missing = self.get_missing_indexes()
+        if missing:
+            raise RuntimeError(
+                f"Índices ausentes no banco: {', '.join(missing)}. "
+                "Execute as migrações (backend/database/init_database.py)."
+            )
+        
+        logger.info("✅ Índices do banco verificados")
+    
     def close(self):
-        """Fecha conexão com o banco"""
+        """Fecha as conexões do pool"""
         try:
-            if self.cursor:
-                self.cursor.close()
-            if self.connection:
-                self.connection.close()
-            self.connected = False
+            if self.pool:
+                self.pool.closeall()
+                self.pool = None
+            if self.read_pool:
+                self.read_pool.closeall()
+                self.read_pool = None
             logger.info("🔌 Conexão com banco fechada")
         except Exception as e:
             logger.error(f"❌ Erro ao fechar conexão: {str(e)}")
@@ -584,6 +1617,10 @@ def save_customer_data(customer: Customer) -> bool:
     """Salvar dados do cliente"""
     return db_manager.save_customer_data(customer)
 
+def bulk_upsert_customers(customers: Iterable[Any], chunk_size: int = BULK_UPSERT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Carga em massa de clientes"""
+    return db_manager.bulk_upsert_customers(customers, chunk_size)
+
 def get_customer_by_protocolo(protocolo: str) -> Optional[Customer]:
     """Buscar cliente por protocolo"""
     return db_manager.get_customer_by_protocolo(protocolo)
@@ -596,13 +1633,35 @@ def get_conversation_context(phone: str) -> Optional[Conversation]:
     """Buscar contexto da conversa"""
     return db_manager.get_conversation_context(phone)
 
+def commit_conversation_turn(context: Conversation, protocolo: Optional[str] = None,
+                             payment_promise: bool = False) -> bool:
+    """Gravar turno da conversa e contadores do cliente em uma transação"""
+    return db_manager.commit_conversation_turn(context, protocolo, payment_promise)
+
 def get_all_customers(limit: int = 1000) -> List[Customer]:
     """Buscar todos os clientes"""
     return db_manager.get_all_customers(limit)
 
-def get_customers_by_company(empresa: str) -> List[Customer]:
+def get_customers_by_company(empresa: str, limit: int = 1000) -> List[Customer]:
     """Buscar clientes por empresa"""
-    return db_manager.get_customers_by_company(empresa)
+    return db_manager.get_customers_by_company(empresa, limit)
+
+def get_customers_page(limit: int = 50, cursor: Optional[str] = None,
+                       empresa: Optional[str] = None) -> Tuple[List[Customer], Optional[str]]:
+    """Página de clientes (keyset)"""
+    return db_manager.get_customers_page(limit, cursor, empresa)
+
+def get_conversations_page(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Conversation], Optional[str]]:
+    """Página de conversas (keyset)"""
+    return db_manager.get_conversations_page(limit, cursor)
+
+def iter_customers(itersize: int = STREAM_ITERSIZE) -> Iterator[Customer]:
+    """Percorrer todos os clientes (streaming)"""
+    return db_manager.iter_customers(itersize)
+
+def iter_customers_by_company(empresa: str, itersize: int = STREAM_ITERSIZE) -> Iterator[Customer]:
+    """Percorrer clientes de uma empresa (streaming)"""
+    return db_manager.iter_customers_by_company(empresa, itersize)
 
 def delete_customer(protocolo: str) -> bool:
     """Remover cliente"""
@@ -616,6 +1675,14 @@ def get_database_stats() -> Dict[str, Any]:
     """Obter estatísticas do banco"""
     return db_manager.get_database_stats()
 
+def refresh_database_stats() -> bool:
+    """Recalcular estatísticas do banco"""
+    return db_manager.refresh_database_stats()
+
+def get_query_stats(top: Optional[int] = 20, order_by: str = 'total_ms') -> Dict[str, Any]:
+    """Obter métricas de latência das instruções SQL"""
+    return db_manager.get_query_stats(top, order_by)
+
 if __name__ == "__main__":
     # Teste do sistema
     print("🧪 TESTANDO DATABASE MANAGER")
@@ -15,6 +15,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from backend.config.settings import Config
+from backend.database.migration_runner import MigrationRunner
 
 def get_database_connection():
     """Estabelece conexão com o banco de dados"""
@@ -49,24 +50,6 @@ def get_redis_connection():
         print(f"❌ Erro ao conectar com Redis: {e}")
         return None
 
-def execute_migration(conn, migration_file):
-    """Executa um arquivo de migração SQL"""
-    try:
-        with open(migration_file, 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        cursor = conn.cursor()
-        cursor.execute(sql_content)
-        conn.commit()
-        cursor.close()
-        
-        print(f"✅ Migração executada com sucesso: {migration_file}")
-        return True
-    except Exception as e:
-        print(f"❌ Erro ao executar migração {migration_file}: {e}")
-        conn.rollback()
-        return False
-
 def initialize_redis_structures(redis_conn):
     """Inicializa estruturas básicas no Redis"""
     try:
@@ -119,7 +102,10 @@ def verify_database_structure(conn):
             'billing_records',
             'system_logs',
             'message_templates',
-            'system_config'
+            'system_config',
+            'conversation_events',
+            'database_stats',
+            'schema_version'
         ]
         
         # Verificar cada tabela
@@ -189,13 +175,13 @@ def main():
     if not redis_conn:
         print("⚠️  Falha ao conectar com Redis. Continuando apenas com PostgreSQL...")
     
-    # 3. Executar migração SQL
-    migration_file = Path(__file__).parent / "migrations" / "001_create_initial_tables.sql"
-    if not migration_file.exists():
-        print(f"❌ Arquivo de migração não encontrado: {migration_file}")
-        return False
+    # 3. Executar migrações SQL pendentes (em ordem, registradas em schema_version)
+    runner = MigrationRunner(pg_conn)
+    runner.ensure_version_table()
+    pending = [f"{migration.version}_{migration.name}" for migration in runner.pending()]
+    print(f"📋 Migrações pendentes: {', '.join(pending) or 'nenhuma'}")
     
-    if not execute_migration(pg_conn, migration_file):
+    if not runner.run():
         print("❌ Falha na migração. Abortando...")
         return False
     
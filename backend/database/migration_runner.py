@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Executor de Migrações Versionadas
+Aplica os arquivos NNN_nome.sql em ordem, uma única vez cada, registrando
+versão e checksum em schema_version
+"""
+
+import re
+import time
+import hashlib
+import logging
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Diretivas no cabeçalho do arquivo:
+#   -- migration: no-transaction   instruções em autocommit, uma a uma
+#                                  (exigido por CREATE INDEX CONCURRENTLY)
+#   -- requires: tabela, tabela.coluna
+#                                  só aplica quando tabelas/colunas existirem;
+#                                  até lá esta e as seguintes ficam pendentes
+NO_TRANSACTION_DIRECTIVE = re.compile(r'^--\s*migration:\s*no-transaction\s*$', re.MULTILINE)
+REQUIRES_DIRECTIVE = re.compile(r'^--\s*requires:\s*(.+)$', re.MULTILINE)
+CONCURRENT_INDEX = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?',
+    re.IGNORECASE
+)
+
+# Advisory lock ('MIGR'): impede que duas instâncias apliquem migrações ao mesmo tempo
+MIGRATION_LOCK_ID = 0x4D494752
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version VARCHAR(20) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        execution_ms INTEGER NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+@dataclass
+class Migration:
+    """Arquivo de migração lido do disco"""
+    version: str
+    name: str
+    sql: str
+    checksum: str
+    transactional: bool = True
+    requires: List[str] = field(default_factory=list)
+
+def parse_migration(filename: str, sql: str) -> Optional[Migration]:
+    """Migração a partir do nome e conteúdo do arquivo (None se o nome não seguir NNN_nome.sql)"""
+    match = MIGRATION_FILE.match(filename)
+    if not match:
+        return None
+
+    requires = []
+    for directive in REQUIRES_DIRECTIVE.findall(sql):
+        requires.extend(name.strip() for name in directive.split(',') if name.strip())
+
+    return Migration(
+        version=match.group(1),
+        name=match.group(2),
+        sql=sql,
+        checksum=hashlib.sha256(sql.encode('utf-8')).hexdigest(),
+        transactional=not NO_TRANSACTION_DIRECTIVE.search(sql),
+        requires=requires
+    )
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Migrações do diretório em ordem de versão; versões repetidas são erro"""
+    migrations = []
+    for path in sorted(directory.glob('*.sql')):
+        migration = parse_migration(path.name, path.read_text(encoding='utf-8'))
+        if migration is None:
+            logger.warning(f"⚠️ Arquivo ignorado (nome fora do padrão NNN_nome.sql): {path.name}")
+            continue
+        migrations.append(migration)
+
+    migrations.sort(key=lambda migration: int(migration.version))
+    versions = [migration.version for migration in migrations]
+    duplicated = sorted({version for version in versions if versions.count(version) > 1})
+    if duplicated:
+        raise ValueError(f"Versões de migração repetidas: {duplicated}")
+    return migrations
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Divide o SQL em instruções pelos `;` de nível superior
+
+    Ignora `;` dentro de strings, identificadores entre aspas, blocos
+    $tag$...$tag$ e comentários.
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = length if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif char in ("'", '"'):
+            end = i + 1
+            while end < length:
+                if sql[end] == char:
+                    if end + 1 < length and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif char == '$' and re.match(r'\$\w*\$', sql[i:]):
+            tag = re.match(r'\$\w*\$', sql[i:]).group(0)
+            end = sql.find(tag, i + len(tag))
+            end = length if end == -1 else end + len(tag)
+            current.append(sql[i:end])
+            i = end
+        elif char == ';':
+            statements.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append(''.join(current))
+
+    # Descartar trechos só com espaços e comentários
+    return [
+        statement.strip() for statement in statements
+        if re.sub(r'--[^\n]*|/\*.*?\*/', '', statement, flags=re.DOTALL).strip()
+    ]
+
+class MigrationRunner:
+    """
+    Aplica as migrações pendentes em uma conexão psycopg2
+
+    Migrações comuns rodam em uma transação junto com o registro em
+    schema_version (tudo ou nada). As marcadas com no-transaction rodam em
+    autocommit, instrução por instrução: índices CONCURRENTLY não bloqueiam
+    escritas, mas não existem dentro de transação nem em tabelas particionadas.
+    """
+
+    def __init__(self, conn, directory: Path = MIGRATIONS_DIR):
+        self.conn = conn
+        self.directory = directory
+
+    def ensure_version_table(self):
+        with self.conn.cursor() as cursor:
+            cursor.execute(SCHEMA_VERSION_TABLE)
+        self.conn.commit()
+
+    def applied_versions(self) -> Dict[str, str]:
+        """Versões já aplicadas e seus checksums"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT version, checksum FROM schema_version")
+            rows = cursor.fetchall()
+        self.conn.commit()
+        return {version: checksum.strip() for version, checksum in rows}
+
+    def pending(self) -> List[Migration]:
+        """Migrações ainda não aplicadas (avisa se uma aplicada mudou no disco)"""
+        applied = self.applied_versions()
+        pending = []
+        for migration in load_migrations(self.directory):
+            checksum = applied.get(migration.version)
+            if checksum is None:
+                pending.append(migration)
+            elif checksum != migration.checksum:
+                logger.warning(
+                    f"⚠️ Migração {migration.version}_{migration.name} alterada depois de aplicada "
+                    f"(não será reexecutada; crie uma nova migração)"
+                )
+        return pending
+
+    def run(self) -> bool:
+        """Aplica as pendentes em ordem; para na primeira falha ou requisito ausente"""
+        try:
+            self.ensure_version_table()
+            self._set_autocommit(True)
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            self._set_autocommit(False)
+
+            try:
+                pending = self.pending()
+                if not pending:
+                    logger.info("✅ Banco já está na versão mais recente")
+                    return True
+
+                for position, migration in enumerate(pending):
+                    if self._missing_requirements(migration):
+                        # Versões são aplicadas em ordem: as seguintes esperam esta
+                        logger.warning(f"⚠️ {len(pending) - position} migrações pendentes até lá")
+                        return True
+                    if not self.apply(migration):
+                        return False
+                return True
+
+            finally:
+                self._set_autocommit(True)
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                self._set_autocommit(False)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao executar migrações: {str(e)}")
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            return False
+
+    def apply(self, migration: Migration) -> bool:
+        """Aplica uma migração e registra a versão"""
+        label = f"{migration.version}_{migration.name}"
+        started = time.monotonic()
+        try:
+            if migration.transactional:
+                with self.conn.cursor() as cursor:
+                    cursor.execute(migration.sql)
+                    self._record(cursor, migration, started)
+                self.conn.commit()
+            else:
+                self._apply_without_transaction(migration, started)
+
+            logger.info(f"✅ Migração aplicada: {label} ({(time.monotonic() - started) * 1000:.0f} ms)")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro na migração {label}: {str(e)}")
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            return False
+
+    def _apply_without_transaction(self, migration: Migration, started: float):
+        self._set_autocommit(True)
+        try:
+            with self.conn.cursor() as cursor:
+                for statement in split_statements(migration.sql):
+                    self._drop_invalid_index(cursor, statement)
+                    cursor.execute(statement)
+                self._record(cursor, migration, started)
+        finally:
+            self._set_autocommit(False)
+
+    def _drop_invalid_index(self, cursor, statement: str):
+        """
+        Remove o índice deixado inválido por um CONCURRENTLY interrompido
+
+        Sem isso o IF NOT EXISTS da nova tentativa pularia o índice inválido.
+        """
+        match = CONCURRENT_INDEX.search(statement)
+        if not match:
+            return
+
+        cursor.execute("""
+            SELECT NOT i.indisvalid FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace
+        """, (match.group(1),))
+        row = cursor.fetchone()
+        if row and row[0]:
+            logger.warning(f"⚠️ Índice inválido {match.group(1)} removido antes de recriar")
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{match.group(1)}"')
+
+    def _missing_requirements(self, migration: Migration) -> List[str]:
+        """
+        Tabelas/colunas exigidas que ainda não existem
+
+        A migração fica pendente (tentada de novo na próxima execução) junto
+        com as seguintes, para que as versões nunca sejam aplicadas fora de ordem.
+        """
+        if not migration.requires:
+            return []
+
+        missing = []
+        with self.conn.cursor() as cursor:
+            for requirement in migration.requires:
+                table, _, column = requirement.partition('.')
+                cursor.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = 'public' AND table_name = %s
+                          AND (%s = '' OR column_name = %s)
+                    )
+                """, (table, column, column))
+                if not cursor.fetchone()[0]:
+                    missing.append(requirement)
+        self.conn.commit()
+
+        if missing:
+            logger.warning(
+                f"⚠️ Migração {migration.version}_{migration.name} adiada: ausentes {missing}"
+            )
+        return missing
+
+    def _record(self, cursor, migration: Migration, started: float):
+        cursor.execute("""
+            INSERT INTO schema_version (version, name, checksum, execution_ms)
+            VALUES (%s, %s, %s, %s)
+        """, (migration.version, migration.name, migration.checksum,
+              int((time.monotonic() - started) * 1000)))
+
+    def _set_autocommit(self, enabled: bool):
+        if self.conn.autocommit != enabled:
+            self.conn.autocommit = enabled
+
+def run_migrations(conn, directory: Path = MIGRATIONS_DIR) -> bool:
+    """Aplicar as migrações pendentes"""
+    return MigrationRunner(conn, directory).run()
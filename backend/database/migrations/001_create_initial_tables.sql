@@ -22,8 +22,8 @@ CREATE TABLE IF NOT EXISTS conversation_contexts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_conversation_contexts_phone ON conversation_contexts(phone);
-CREATE INDEX idx_conversation_contexts_last_activity ON conversation_contexts(last_activity);
+CREATE INDEX IF NOT EXISTS idx_conversation_contexts_phone ON conversation_contexts(phone);
+CREATE INDEX IF NOT EXISTS idx_conversation_contexts_last_activity ON conversation_contexts(last_activity);
 
 -- ========================================
 -- TABELAS DE APRENDIZADO E QUALIDADE
@@ -45,8 +45,8 @@ CREATE TABLE IF NOT EXISTS response_quality_scores (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_response_quality_phone ON response_quality_scores(phone);
-CREATE INDEX idx_response_quality_intent ON response_quality_scores(intent);
+CREATE INDEX IF NOT EXISTS idx_response_quality_phone ON response_quality_scores(phone);
+CREATE INDEX IF NOT EXISTS idx_response_quality_intent ON response_quality_scores(intent);
 
 CREATE TABLE IF NOT EXISTS template_performance (
     id SERIAL PRIMARY KEY,
@@ -61,8 +61,8 @@ CREATE TABLE IF NOT EXISTS template_performance (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_template_performance_intent ON template_performance(intent);
-CREATE INDEX idx_template_performance_success_rate ON template_performance(success_rate);
+CREATE INDEX IF NOT EXISTS idx_template_performance_intent ON template_performance(intent);
+CREATE INDEX IF NOT EXISTS idx_template_performance_success_rate ON template_performance(success_rate);
 
 -- ========================================
 -- TABELAS DE CAMPANHAS E DISPAROS
@@ -85,8 +85,8 @@ CREATE TABLE IF NOT EXISTS campaigns (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_campaigns_status ON campaigns(status);
-CREATE INDEX idx_campaigns_created_at ON campaigns(created_at);
+CREATE INDEX IF NOT EXISTS idx_campaigns_status ON campaigns(status);
+CREATE INDEX IF NOT EXISTS idx_campaigns_created_at ON campaigns(created_at);
 
 CREATE TABLE IF NOT EXISTS campaign_contacts (
     id SERIAL PRIMARY KEY,
@@ -104,9 +104,9 @@ CREATE TABLE IF NOT EXISTS campaign_contacts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_campaign_contacts_campaign_id ON campaign_contacts(campaign_id);
-CREATE INDEX idx_campaign_contacts_phone ON campaign_contacts(phone);
-CREATE INDEX idx_campaign_contacts_status ON campaign_contacts(status);
+CREATE INDEX IF NOT EXISTS idx_campaign_contacts_campaign_id ON campaign_contacts(campaign_id);
+CREATE INDEX IF NOT EXISTS idx_campaign_contacts_phone ON campaign_contacts(phone);
+CREATE INDEX IF NOT EXISTS idx_campaign_contacts_status ON campaign_contacts(status);
 
 -- ========================================
 -- TABELAS DE CLIENTES E COBRANÇAS
@@ -126,9 +126,9 @@ CREATE TABLE IF NOT EXISTS clients (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_clients_phone ON clients(phone);
-CREATE INDEX idx_clients_status ON clients(status);
-CREATE INDEX idx_clients_city ON clients(city);
+CREATE INDEX IF NOT EXISTS idx_clients_phone ON clients(phone);
+CREATE INDEX IF NOT EXISTS idx_clients_status ON clients(status);
+CREATE INDEX IF NOT EXISTS idx_clients_city ON clients(city);
 
 CREATE TABLE IF NOT EXISTS billing_records (
     id SERIAL PRIMARY KEY,
@@ -147,9 +147,9 @@ CREATE TABLE IF NOT EXISTS billing_records (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_billing_records_client_id ON billing_records(client_id);
-CREATE INDEX idx_billing_records_status ON billing_records(status);
-CREATE INDEX idx_billing_records_due_date ON billing_records(due_date);
+CREATE INDEX IF NOT EXISTS idx_billing_records_client_id ON billing_records(client_id);
+CREATE INDEX IF NOT EXISTS idx_billing_records_status ON billing_records(status);
+CREATE INDEX IF NOT EXISTS idx_billing_records_due_date ON billing_records(due_date);
 
 -- ========================================
 -- TABELAS DE LOGS E MONITORAMENTO
@@ -167,9 +167,9 @@ CREATE TABLE IF NOT EXISTS system_logs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_system_logs_category ON system_logs(category);
-CREATE INDEX idx_system_logs_level ON system_logs(level);
-CREATE INDEX idx_system_logs_created_at ON system_logs(created_at);
+CREATE INDEX IF NOT EXISTS idx_system_logs_category ON system_logs(category);
+CREATE INDEX IF NOT EXISTS idx_system_logs_level ON system_logs(level);
+CREATE INDEX IF NOT EXISTS idx_system_logs_created_at ON system_logs(created_at);
 
 -- ========================================
 -- TABELAS DE CONFIGURAÇÕES E TEMPLATES
@@ -187,8 +187,8 @@ CREATE TABLE IF NOT EXISTS message_templates (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_message_templates_intent ON message_templates(intent);
-CREATE INDEX idx_message_templates_active ON message_templates(is_active);
+CREATE INDEX IF NOT EXISTS idx_message_templates_intent ON message_templates(intent);
+CREATE INDEX IF NOT EXISTS idx_message_templates_active ON message_templates(is_active);
 
 CREATE TABLE IF NOT EXISTS system_config (
     id SERIAL PRIMARY KEY,
@@ -201,7 +201,7 @@ CREATE TABLE IF NOT EXISTS system_config (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_system_config_key ON system_config(config_key);
+CREATE INDEX IF NOT EXISTS idx_system_config_key ON system_config(config_key);
 
 -- ========================================
 -- INSERIR CONFIGURAÇÕES INICIAIS
@@ -244,13 +244,21 @@ END;
 $$ language 'plpgsql';
 
 -- Aplicar trigger em todas as tabelas com updated_at
+DROP TRIGGER IF EXISTS update_conversation_contexts_updated_at ON conversation_contexts;
 CREATE TRIGGER update_conversation_contexts_updated_at BEFORE UPDATE ON conversation_contexts FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_template_performance_updated_at ON template_performance;
 CREATE TRIGGER update_template_performance_updated_at BEFORE UPDATE ON template_performance FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_campaigns_updated_at ON campaigns;
 CREATE TRIGGER update_campaigns_updated_at BEFORE UPDATE ON campaigns FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_campaign_contacts_updated_at ON campaign_contacts;
 CREATE TRIGGER update_campaign_contacts_updated_at BEFORE UPDATE ON campaign_contacts FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_clients_updated_at ON clients;
 CREATE TRIGGER update_clients_updated_at BEFORE UPDATE ON clients FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_billing_records_updated_at ON billing_records;
 CREATE TRIGGER update_billing_records_updated_at BEFORE UPDATE ON billing_records FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_message_templates_updated_at ON message_templates;
 CREATE TRIGGER update_message_templates_updated_at BEFORE UPDATE ON message_templates FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_system_config_updated_at ON system_config;
 CREATE TRIGGER update_system_config_updated_at BEFORE UPDATE ON system_config FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 -- ========================================
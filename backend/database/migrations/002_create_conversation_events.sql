@@ -0,0 +1,67 @@
+-- 🚀 MIGRAÇÃO 002 - EVENTOS DE CONVERSA (APPEND-ONLY)
+-- Uma linha por turno de conversa, em vez de regravar o histórico inteiro
+-- como JSON a cada mensagem. O registro em conversations guarda só agregados.
+-- requires: conversations
+
+-- ========================================
+-- TABELA DE EVENTOS DE CONVERSA
+-- ========================================
+
+CREATE TABLE IF NOT EXISTS conversation_events (
+    id BIGSERIAL PRIMARY KEY,
+    phone VARCHAR(20) NOT NULL,
+    event_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    customer_message TEXT,
+    bot_response TEXT,
+    intent VARCHAR(50),
+    urgency_level DECIMAL(3,2),
+    message_type VARCHAR(50) DEFAULT 'conversation',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Últimos N turnos de um telefone = uma varredura de intervalo neste índice
+CREATE INDEX IF NOT EXISTS idx_conversation_events_phone_timestamp
+    ON conversation_events(phone, event_timestamp DESC);
+
+-- ========================================
+-- AGREGADOS NO REGISTRO DA CONVERSA
+-- ========================================
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS message_count INTEGER DEFAULT 0;
+
+-- ========================================
+-- MIGRAR HISTÓRICO EXISTENTE (JSON) PARA EVENTOS
+-- ========================================
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'conversations'
+        AND column_name = 'conversation_history'
+    ) THEN
+        -- Só migra conversas que ainda não têm eventos (idempotente)
+        INSERT INTO conversation_events (
+            phone, event_timestamp, customer_message, bot_response, intent, urgency_level, message_type
+        )
+        SELECT
+            c.phone,
+            COALESCE((e.value->>'timestamp')::TIMESTAMP, c.updated_at, CURRENT_TIMESTAMP),
+            e.value->>'customer_message',
+            e.value->>'bot_response',
+            e.value->>'intent',
+            (e.value->>'urgency_level')::DECIMAL(3,2),
+            COALESCE(e.value->>'message_type', 'conversation')
+        FROM conversations c
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(NULLIF(c.conversation_history::TEXT, ''), '[]')::JSONB) AS e(value)
+        WHERE NOT EXISTS (SELECT 1 FROM conversation_events ce WHERE ce.phone = c.phone);
+
+        UPDATE conversations c SET message_count = (
+            SELECT COUNT(*) FROM conversation_events ce WHERE ce.phone = c.phone
+        );
+    END IF;
+END $$;
+
+COMMENT ON TABLE conversation_events IS 'Turnos de conversa (append-only)';
+
+SELECT 'Migration 002 completed successfully!' as status;
@@ -0,0 +1,37 @@
+-- 🚀 MIGRAÇÃO 003 - CHAVES ÚNICAS PARA UPSERT
+-- INSERT ... ON CONFLICT precisa de um índice único na chave de conflito:
+-- customers.protocolo e conversations.phone
+-- requires: customers, conversations
+
+-- Duplicatas antigas não são apagadas aqui: qual registro vale (dívida,
+-- histórico) é decisão do operador. A migração falha e informa quantas chaves;
+-- depois de resolver, o próximo start aplica de novo
+DO $$
+DECLARE
+    duplicated_customers INTEGER;
+    duplicated_conversations INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO duplicated_customers FROM (
+        SELECT protocolo FROM customers WHERE protocolo IS NOT NULL
+        GROUP BY protocolo HAVING COUNT(*) > 1
+    ) duplicated;
+    SELECT COUNT(*) INTO duplicated_conversations FROM (
+        SELECT phone FROM conversations WHERE phone IS NOT NULL
+        GROUP BY phone HAVING COUNT(*) > 1
+    ) duplicated;
+
+    IF duplicated_customers > 0 OR duplicated_conversations > 0 THEN
+        RAISE EXCEPTION 'Migração 003: % protocolos repetidos em customers e % telefones repetidos em conversations',
+            duplicated_customers, duplicated_conversations
+            USING HINT = 'Consulte SELECT protocolo FROM customers GROUP BY protocolo HAVING COUNT(*) > 1 '
+                         || '(e o mesmo para conversations.phone), mantenha um registro por chave e reinicie';
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_customers_protocolo ON customers(protocolo);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_conversations_phone ON conversations(phone);
+
+ALTER TABLE conversations ALTER COLUMN message_count SET DEFAULT 0;
+UPDATE conversations SET message_count = 0 WHERE message_count IS NULL;
+
+SELECT 'Migration 003 completed successfully!' as status;
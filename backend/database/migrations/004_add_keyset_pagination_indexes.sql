@@ -0,0 +1,27 @@
+-- 🚀 MIGRAÇÃO 004 - ÍNDICES PARA PAGINAÇÃO KEYSET
+-- Listagens paginadas por (updated_at, protocolo) e (last_contact, phone):
+-- a página seguinte começa com uma busca no índice, sem OFFSET.
+-- As colunas de ordenação não podem ser NULL para a comparação de tuplas.
+-- requires: customers, conversations
+
+UPDATE customers SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+WHERE updated_at IS NULL;
+
+ALTER TABLE customers ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE customers ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_customers_updated_at_protocolo
+    ON customers(updated_at DESC, protocolo DESC);
+CREATE INDEX IF NOT EXISTS idx_customers_empresa_updated_at_protocolo
+    ON customers(empresa, updated_at DESC, protocolo DESC);
+
+UPDATE conversations SET last_contact = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+WHERE last_contact IS NULL;
+
+ALTER TABLE conversations ALTER COLUMN last_contact SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE conversations ALTER COLUMN last_contact SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_last_contact_phone
+    ON conversations(last_contact DESC, phone DESC);
+
+SELECT 'Migration 004 completed successfully!' as status;
@@ -0,0 +1,40 @@
+-- 🚀 MIGRAÇÃO 005 - TELEFONE CANÔNICO (E.164) DOS CLIENTES
+-- Mensagens chegam identificadas pelo telefone: customers.phone_e164 guarda o
+-- número normalizado (gravado pela aplicação). Clientes são identificados pelo
+-- protocolo e um telefone pode ter vários contratos, então o índice não é
+-- único: a busca por telefone pega o contrato atualizado mais recentemente.
+-- Filtros por empresa usam idx_customers_empresa_updated_at_protocolo (004),
+-- cuja primeira coluna é empresa; um índice só em empresa seria redundante.
+-- requires: customers
+
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS phone_e164 VARCHAR(16);
+
+DO $$
+BEGIN
+    -- Preencher a partir da coluna phone legada, se existir
+    -- (mesma regra de backend/modules/phone_utils.py)
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'customers' AND column_name = 'phone'
+    ) THEN
+        UPDATE customers c SET phone_e164 = n.e164
+        FROM (
+            SELECT id,
+                   CASE
+                       WHEN length(d) IN (10, 11) THEN '+55' || d
+                       WHEN length(d) BETWEEN 11 AND 15 THEN '+' || d
+                   END AS e164
+            FROM (
+                SELECT id, ltrim(regexp_replace(split_part(phone, '@', 1), '\D', '', 'g'), '0') AS d
+                FROM customers
+                WHERE phone_e164 IS NULL AND phone IS NOT NULL
+            ) digits
+        ) n
+        WHERE c.id = n.id AND n.e164 IS NOT NULL;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_customers_phone_e164_updated_at
+    ON customers(phone_e164, updated_at DESC, protocolo DESC);
+
+SELECT 'Migration 005 completed successfully!' as status;
@@ -0,0 +1,151 @@
+-- 🚀 MIGRAÇÃO 006 - ESTATÍSTICAS MANTIDAS INCREMENTALMENTE
+-- O painel consulta as estatísticas com frequência; em vez de COUNT/SUM sobre
+-- customers e conversations a cada chamada, uma linha única em database_stats
+-- é mantida por triggers de instrução (tabelas de transição: um UPDATE por
+-- instrução, não por linha). refresh_database_stats() recalcula do zero.
+-- requires: customers, conversations
+
+CREATE TABLE IF NOT EXISTS database_stats (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    customers_total BIGINT NOT NULL DEFAULT 0,
+    conversations_total BIGINT NOT NULL DEFAULT 0,
+    customers_with_debt BIGINT NOT NULL DEFAULT 0,
+    total_debt NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION refresh_database_stats() RETURNS VOID AS $$
+BEGIN
+    INSERT INTO database_stats (id, customers_total, conversations_total, customers_with_debt, total_debt, updated_at)
+    SELECT TRUE,
+           (SELECT COUNT(*) FROM customers),
+           (SELECT COUNT(*) FROM conversations),
+           (SELECT COUNT(*) FROM customers WHERE cobrado_fpd > 0),
+           (SELECT COALESCE(SUM(cobrado_fpd), 0) FROM customers WHERE cobrado_fpd > 0),
+           CURRENT_TIMESTAMP
+    ON CONFLICT (id) DO UPDATE SET
+        customers_total = EXCLUDED.customers_total,
+        conversations_total = EXCLUDED.conversations_total,
+        customers_with_debt = EXCLUDED.customers_with_debt,
+        total_debt = EXCLUDED.total_debt,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Aplica um delta; deltas nulos não tocam a linha (evita disputa de lock
+-- nos UPDATEs frequentes que não mudam contagens nem dívida)
+CREATE OR REPLACE FUNCTION apply_database_stats_delta(
+    d_customers BIGINT, d_conversations BIGINT, d_with_debt BIGINT, d_debt NUMERIC
+) RETURNS VOID AS $$
+BEGIN
+    IF d_customers = 0 AND d_conversations = 0 AND d_with_debt = 0 AND d_debt = 0 THEN
+        RETURN;
+    END IF;
+
+    UPDATE database_stats SET
+        customers_total = customers_total + d_customers,
+        conversations_total = conversations_total + d_conversations,
+        customers_with_debt = customers_with_debt + d_with_debt,
+        total_debt = total_debt + d_debt,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION customers_stats_insert() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_database_stats_delta(
+        (SELECT COUNT(*) FROM new_rows), 0,
+        (SELECT COUNT(*) FROM new_rows WHERE cobrado_fpd > 0),
+        (SELECT COALESCE(SUM(cobrado_fpd), 0) FROM new_rows WHERE cobrado_fpd > 0)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION customers_stats_update() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_database_stats_delta(
+        0, 0,
+        (SELECT COUNT(*) FROM new_rows WHERE cobrado_fpd > 0)
+            - (SELECT COUNT(*) FROM old_rows WHERE cobrado_fpd > 0),
+        (SELECT COALESCE(SUM(cobrado_fpd), 0) FROM new_rows WHERE cobrado_fpd > 0)
+            - (SELECT COALESCE(SUM(cobrado_fpd), 0) FROM old_rows WHERE cobrado_fpd > 0)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION customers_stats_delete() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_database_stats_delta(
+        -(SELECT COUNT(*) FROM old_rows), 0,
+        -(SELECT COUNT(*) FROM old_rows WHERE cobrado_fpd > 0),
+        -(SELECT COALESCE(SUM(cobrado_fpd), 0) FROM old_rows WHERE cobrado_fpd > 0)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION conversations_stats_insert() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_database_stats_delta(0, (SELECT COUNT(*) FROM new_rows), 0, 0);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION conversations_stats_delete() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_database_stats_delta(0, -(SELECT COUNT(*) FROM old_rows), 0, 0);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION database_stats_truncate() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_database_stats();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    -- Tabelas de transição exigem um trigger por evento
+    DROP TRIGGER IF EXISTS trg_customers_stats_insert ON customers;
+    CREATE TRIGGER trg_customers_stats_insert AFTER INSERT ON customers
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE customers_stats_insert();
+
+    DROP TRIGGER IF EXISTS trg_customers_stats_update ON customers;
+    CREATE TRIGGER trg_customers_stats_update AFTER UPDATE ON customers
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE customers_stats_update();
+
+    DROP TRIGGER IF EXISTS trg_customers_stats_delete ON customers;
+    CREATE TRIGGER trg_customers_stats_delete AFTER DELETE ON customers
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE customers_stats_delete();
+
+    DROP TRIGGER IF EXISTS trg_customers_stats_truncate ON customers;
+    CREATE TRIGGER trg_customers_stats_truncate AFTER TRUNCATE ON customers
+        FOR EACH STATEMENT EXECUTE PROCEDURE database_stats_truncate();
+
+    DROP TRIGGER IF EXISTS trg_conversations_stats_insert ON conversations;
+    CREATE TRIGGER trg_conversations_stats_insert AFTER INSERT ON conversations
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE conversations_stats_insert();
+
+    DROP TRIGGER IF EXISTS trg_conversations_stats_delete ON conversations;
+    CREATE TRIGGER trg_conversations_stats_delete AFTER DELETE ON conversations
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE conversations_stats_delete();
+
+    DROP TRIGGER IF EXISTS trg_conversations_stats_truncate ON conversations;
+    CREATE TRIGGER trg_conversations_stats_truncate AFTER TRUNCATE ON conversations
+        FOR EACH STATEMENT EXECUTE PROCEDURE database_stats_truncate();
+
+    -- Ponto de partida com os valores atuais
+    PERFORM refresh_database_stats();
+END $$;
+
+SELECT 'Migration 006 completed successfully!' as status;
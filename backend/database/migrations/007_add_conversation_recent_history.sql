@@ -0,0 +1,36 @@
+-- 🚀 MIGRAÇÃO 007 - CAUDA RECENTE DO HISTÓRICO EM JSONB
+-- conversation_events continua sendo o histórico completo. conversations.recent_history
+-- guarda só os últimos turnos (CONVERSATION_HISTORY_LIMIT, padrão 50): cada turno
+-- é anexado no servidor (recent_history || novos, cortado por JSON path) e o
+-- contexto da conversa é lido em uma consulta, sem percorrer os eventos.
+-- Requer PostgreSQL 12+ (jsonb_path_query_array).
+-- requires: conversations, conversation_events
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS recent_history JSONB NOT NULL DEFAULT '[]'::JSONB;
+
+DO $$
+BEGIN
+    -- Preencher com os últimos 50 eventos de cada conversa (só as ainda vazias)
+    UPDATE conversations c SET recent_history = tail.history
+    FROM (
+        SELECT e.phone,
+               jsonb_agg(jsonb_build_object(
+                   'timestamp', e.event_timestamp,
+                   'customer_message', e.customer_message,
+                   'bot_response', e.bot_response,
+                   'intent', e.intent,
+                   'urgency_level', e.urgency_level,
+                   'message_type', e.message_type
+               ) ORDER BY e.event_timestamp, e.id) AS history
+        FROM (
+            SELECT ce.*, row_number() OVER (PARTITION BY ce.phone ORDER BY ce.event_timestamp DESC, ce.id DESC) AS position
+            FROM conversation_events ce
+        ) e
+        WHERE e.position <= 50
+        GROUP BY e.phone
+    ) tail
+    WHERE c.phone = tail.phone AND c.recent_history = '[]'::JSONB;
+END $$;
+
+SELECT 'Migration 007 completed successfully!' as status;
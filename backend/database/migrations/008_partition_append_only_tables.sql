@@ -0,0 +1,105 @@
+-- 🚀 MIGRAÇÃO 008 - PARTICIONAMENTO MENSAL DAS TABELAS APPEND-ONLY
+-- system_logs, response_quality_scores e conversation_events só recebem INSERTs
+-- e crescem sem limite. Passam a ser particionadas por mês (RANGE na coluna de
+-- data): consultas com intervalo de datas leem só as partições do período e a
+-- retenção remove partições inteiras (DROP TABLE) em vez de DELETE.
+-- Partições futuras e retenção: backend/database/partition_manager.py.
+-- campaign_contacts fica como está: suas linhas são atualizadas (status) e
+-- vivem enquanto a campanha existir, não por idade.
+
+-- Cria a partição do mês de `month` (nome: <tabela>_AAAA_MM) se ainda não existir
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month DATE) RETURNS TEXT AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month)::DATE;
+    partition_name TEXT := parent || '_' || to_char(start_date, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, parent, start_date, (start_date + INTERVAL '1 month')::DATE
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Converte uma tabela comum em particionada por mês, copiando os dados.
+-- A chave primária passa a incluir a coluna de partição (exigência do
+-- PostgreSQL); os índices secundários são recriados pela migração.
+CREATE OR REPLACE FUNCTION partition_table_by_month(parent TEXT, key_column TEXT, months_ahead INTEGER)
+RETURNS BOOLEAN AS $$
+DECLARE
+    legacy TEXT := parent || '_legacy';
+    pk_name TEXT;
+    id_sequence TEXT;
+    first_month DATE;
+    month DATE;
+BEGIN
+    IF to_regclass(parent) IS NULL
+       OR (SELECT relkind FROM pg_class WHERE oid = to_regclass(parent)) = 'p' THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('UPDATE %I SET %I = CURRENT_TIMESTAMP WHERE %I IS NULL', parent, key_column, key_column);
+
+    -- Liberar os nomes da tabela e da chave primária para a nova tabela
+    SELECT conname INTO pk_name FROM pg_constraint
+    WHERE conrelid = to_regclass(parent) AND contype = 'p';
+    IF pk_name IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', parent, pk_name);
+    END IF;
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, legacy);
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+        parent, legacy, key_column
+    );
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', parent, key_column);
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+
+    -- Partições do mês mais antigo com dados até months_ahead meses à frente
+    EXECUTE format('SELECT date_trunc(''month'', MIN(%I))::DATE FROM %I', key_column, legacy) INTO first_month;
+    month := LEAST(COALESCE(first_month, CURRENT_DATE), CURRENT_DATE);
+    month := date_trunc('month', month)::DATE;
+    WHILE month <= (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::DATE LOOP
+        PERFORM create_monthly_partition(parent, month);
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', parent, legacy);
+    EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, %I)', parent, key_column);
+
+    -- A sequência do id pertence à tabela antiga: transferir antes do DROP
+    id_sequence := pg_get_serial_sequence(legacy, 'id');
+    IF id_sequence IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', id_sequence, parent);
+    END IF;
+    EXECUTE format('DROP TABLE %I', legacy);
+
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF partition_table_by_month('system_logs', 'created_at', 3) THEN
+        CREATE INDEX IF NOT EXISTS idx_system_logs_category ON system_logs(category);
+        CREATE INDEX IF NOT EXISTS idx_system_logs_level ON system_logs(level);
+        CREATE INDEX IF NOT EXISTS idx_system_logs_created_at ON system_logs(created_at);
+        COMMENT ON TABLE system_logs IS 'Logs do sistema (particionada por mês)';
+    END IF;
+
+    IF partition_table_by_month('response_quality_scores', 'created_at', 3) THEN
+        CREATE INDEX IF NOT EXISTS idx_response_quality_phone ON response_quality_scores(phone);
+        CREATE INDEX IF NOT EXISTS idx_response_quality_intent ON response_quality_scores(intent);
+        COMMENT ON TABLE response_quality_scores IS 'Scores de qualidade das respostas da IA (particionada por mês)';
+    END IF;
+
+    -- Últimos N turnos de um telefone: Append ordenado pelas partições, da mais
+    -- recente para a mais antiga, parando ao completar o LIMIT
+    IF partition_table_by_month('conversation_events', 'event_timestamp', 3) THEN
+        CREATE INDEX IF NOT EXISTS idx_conversation_events_phone_timestamp
+            ON conversation_events(phone, event_timestamp DESC);
+        COMMENT ON TABLE conversation_events IS 'Turnos de conversa (append-only, particionada por mês)';
+    END IF;
+END $$;
+
+SELECT 'Migration 008 completed successfully!' as status;
@@ -0,0 +1,9 @@
+-- 🚀 MIGRAÇÃO 009 - ÍNDICE DE CONVERSAS POR PROTOCOLO (SEM BLOQUEAR ESCRITAS)
+-- migration: no-transaction
+-- requires: conversations.customer_protocolo
+-- delete_customer remove as conversas por customer_protocolo; sem índice, cada
+-- remoção varre conversations inteira. CONCURRENTLY constrói o índice com a
+-- tabela recebendo escritas; só roda fora de transação (ver migration_runner.py).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_customer_protocolo
+    ON conversations(customer_protocolo);
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerenciador de Partições Mensais
+Cria partições futuras e aplica a retenção das tabelas append-only
+particionadas por mês (migração 008), removendo partições inteiras
+"""
+
+import os
+import re
+import logging
+from datetime import date
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from backend.database.database_manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Meses à frente com partição já criada (folga para reinícios espaçados)
+PARTITION_PREMAKE_MONTHS = int(os.getenv('PARTITION_PREMAKE_MONTHS', 3))
+
+@dataclass
+class PartitionedTable:
+    """Tabela particionada por mês e quantos meses completos manter"""
+    name: str
+    column: str
+    retention_months: int
+
+PARTITIONED_TABLES = {
+    'system_logs': PartitionedTable(
+        'system_logs', 'created_at', int(os.getenv('SYSTEM_LOGS_RETENTION_MONTHS', 6))
+    ),
+    'response_quality_scores': PartitionedTable(
+        'response_quality_scores', 'created_at', int(os.getenv('QUALITY_SCORES_RETENTION_MONTHS', 12))
+    ),
+    'conversation_events': PartitionedTable(
+        'conversation_events', 'event_timestamp', int(os.getenv('CONVERSATION_EVENTS_RETENTION_MONTHS', 24))
+    )
+}
+
+def month_start(value: date) -> date:
+    """Primeiro dia do mês de `value`"""
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    """Primeiro dia do mês `months` meses depois (ou antes, se negativo)"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    """Nome da partição mensal (mesma regra de create_monthly_partition)"""
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """Mês de uma partição pelo nome; None para a DEFAULT ou nomes desconhecidos"""
+    match = re.fullmatch(re.escape(table) + r'_(\d{4})_(\d{2})', name)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, 1)
+
+def expired_partitions(table: str, names: List[str], retention_months: int,
+                       today: Optional[date] = None) -> List[str]:
+    """
+    Partições inteiramente anteriores à janela de retenção
+
+    Mantém o mês corrente e os `retention_months` meses completos anteriores.
+    """
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    expired = []
+    for name in names:
+        month = partition_month(table, name)
+        if month is not None and month < cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+class PartitionManager:
+    """Manutenção das partições mensais: criação antecipada e retenção"""
+
+    def __init__(self, db=None, tables: Optional[Dict[str, PartitionedTable]] = None):
+        self.db = db or db_manager
+        self.tables = tables if tables is not None else PARTITIONED_TABLES
+
+    def _partitioned(self) -> List[PartitionedTable]:
+        """Tabelas do registro que já estão particionadas (migração 008 aplicada)"""
+        with self.db._cursor() as cursor:
+            cursor.execute("""
+                SELECT relname FROM pg_class
+                WHERE relkind = 'p' AND relnamespace = 'public'::regnamespace AND relname = ANY(%s)
+            """, (list(self.tables),))
+            names = {row['relname'] for row in cursor.fetchall()}
+        return [table for name, table in self.tables.items() if name in names]
+
+    def list_partitions(self, table: str) -> List[str]:
+        """Partições de uma tabela, em ordem de nome (= ordem cronológica)"""
+        with self.db._cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                ORDER BY c.relname
+            """, (table,))
+            return [row['relname'] for row in cursor.fetchall()]
+
+    def ensure_future_partitions(self, months_ahead: int = PARTITION_PREMAKE_MONTHS,
+                                 today: Optional[date] = None) -> Dict[str, List[str]]:
+        """Cria (se faltarem) as partições do mês corrente até `months_ahead` meses à frente"""
+        try:
+            if not self.db.connected:
+                return {}
+
+            current = month_start(today or date.today())
+            created = {}
+            for table in self._partitioned():
+                existing = set(self.list_partitions(table.name))
+                missing = [
+                    add_months(current, offset) for offset in range(months_ahead + 1)
+                    if partition_name(table.name, add_months(current, offset)) not in existing
+                ]
+                if not missing:
+                    continue
+
+                with self.db._cursor() as cursor:
+                    for month in missing:
+                        cursor.execute("SELECT create_monthly_partition(%s, %s)", (table.name, month))
+                created[table.name] = [partition_name(table.name, month) for month in missing]
+                logger.info(f"🗓️ {table.name}: partições criadas {created[table.name]}")
+
+            return created
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar partições futuras: {str(e)}")
+            return {}
+
+    def drop_expired_partitions(self, today: Optional[date] = None) -> List[str]:
+        """Remove as partições fora da retenção (DROP TABLE, sem DELETE nem VACUUM)"""
+        dropped = []
+        try:
+            if not self.db.connected:
+                return []
+
+            for table in self._partitioned():
+                expired = expired_partitions(
+                    table.name, self.list_partitions(table.name), table.retention_months, today
+                )
+                # Uma transação por partição: o lock exclusivo na tabela mãe é curto
+                for name in expired:
+                    with self.db._cursor() as cursor:
+                        cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
+                    dropped.append(name)
+                    logger.info(f"🗑️ {table.name}: partição expirada removida {name}")
+
+            return dropped
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao remover partições expiradas: {str(e)}")
+            return dropped
+
+    def check_default_partitions(self) -> Dict[str, bool]:
+        """
+        Avisa quando a partição DEFAULT recebeu linhas
+
+        Acontece se faltar a partição do mês; enquanto houver linhas do mês na
+        DEFAULT, a partição dele não pode ser criada.
+        """
+        occupied = {}
+        try:
+            if not self.db.connected:
+                return {}
+
+            for table in self._partitioned():
+                with self.db._cursor(positional=True) as cursor:
+                    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{table.name}_default")')
+                    occupied[table.name] = cursor.fetchone()[0]
+                if occupied[table.name]:
+                    logger.warning(
+                        f"⚠️ {table.name}_default tem linhas: mova-as para as partições mensais"
+                    )
+            return occupied
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao verificar partições DEFAULT: {str(e)}")
+            return occupied
+
+    def run_maintenance(self, today: Optional[date] = None) -> Dict[str, object]:
+        """Criação antecipada, retenção e verificação da DEFAULT, nessa ordem"""
+        return {
+            'created': self.ensure_future_partitions(today=today),
+            'dropped': self.drop_expired_partitions(today=today),
+            'default_with_rows': [name for name, has_rows in self.check_default_partitions().items() if has_rows]
+        }
+
+    def get_partition_stats(self) -> Dict[str, List[Dict]]:
+        """Partições de cada tabela com linhas estimadas e tamanho em disco"""
+        try:
+            if not self.db.connected:
+                return {}
+
+            stats = {}
+            for table in self._partitioned():
+                with self.db._cursor() as cursor:
+                    cursor.execute("""
+                        SELECT c.relname AS name,
+                               GREATEST(c.reltuples, 0)::BIGINT AS estimated_rows,
+                               pg_total_relation_size(c.oid) AS size_bytes
+                        FROM pg_inherits i
+                        JOIN pg_class c ON c.oid = i.inhrelid
+                        WHERE i.inhparent = to_regclass(%s)
+                        ORDER BY c.relname
+                    """, (table.name,))
+                    stats[table.name] = [dict(row) for row in cursor.fetchall()]
+            return stats
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter estatísticas das partições: {str(e)}")
+            return {}
+
+# Instância global do gerenciador
+partition_manager = PartitionManager()
+
+# Funções de conveniência
+def run_partition_maintenance() -> Dict[str, object]:
+    """Criar partições futuras e remover as expiradas"""
+    return partition_manager.run_maintenance()
+
+def get_partition_stats() -> Dict[str, List[Dict]]:
+    """Obter partições e tamanhos das tabelas particionadas"""
+    return partition_manager.get_partition_stats()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas de Consultas SQL
+Latência por impressão digital da instrução (histograma), linhas, erros
+e log das consultas lentas com os parâmetros ocultados
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Consultas acima deste tempo vão para o log (0 desativa)
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 500))
+# Limite de impressões digitais distintas; as excedentes são somadas em OTHER_FINGERPRINT
+DB_QUERY_METRICS_MAX_STATEMENTS = int(os.getenv('DB_QUERY_METRICS_MAX_STATEMENTS', 500))
+
+OTHER_FINGERPRINT = '<outras>'
+MAX_FINGERPRINT_LENGTH = 1000
+MAX_LOGGED_PARAMS = 20
+
+# Limites superiores dos baldes do histograma, em segundos (o último é +inf)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_NULL_LITERAL = re.compile(r"(?<!IS )(?<!NOT )\bNULL\b", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%(?:\(\w+\))?s")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+# Linha de VALUES com até um nível de parênteses dentro (COALESCE(?, ...), casts)
+_VALUES_ROW = r"\((?:[^()]|\([^()]*\))*\)"
+_VALUES_ROWS = re.compile(rf"({_VALUES_ROW})(?:\s*,\s*{_VALUES_ROW})+")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(query: Any) -> str:
+    """
+    Forma normalizada da instrução, sem os valores
+
+    Literais e parâmetros (%s) viram `?`, listas de parâmetros viram um só e
+    linhas repetidas de VALUES viram uma; instruções que só diferem nos
+    valores se agrupam.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    text = _WHITESPACE.sub(' ', str(query)).strip()
+    text = _STRING_LITERAL.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _NULL_LITERAL.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _PLACEHOLDER_LIST.sub('?', text)
+    text = _VALUES_ROWS.sub(r'\1, ...', text)
+    return text[:MAX_FINGERPRINT_LENGTH]
+
+def redact_params(params: Any) -> Any:
+    """Parâmetros para o log: só o tipo de cada valor, nunca o conteúdo"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        redacted = [f"<{type(value).__name__}>" for value in params[:MAX_LOGGED_PARAMS]]
+        if len(params) > MAX_LOGGED_PARAMS:
+            redacted.append(f"... +{len(params) - MAX_LOGGED_PARAMS}")
+        return redacted
+    return f"<{type(params).__name__}>"
+
+class StatementStats:
+    """Contadores e histograma de latência de uma impressão digital"""
+
+    __slots__ = ('calls', 'errors', 'rows', 'total_seconds', 'max_seconds', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, seconds: float, rows: int, error: bool):
+        self.calls += 1
+        self.rows += max(rows, 0)
+        if error:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimativa pelo limite superior do balde (o máximo no último)"""
+        if not self.calls:
+            return 0.0
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[index], self.max_seconds)
+                break
+        return self.max_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'avg_ms': round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p95_ms': round(self.percentile(0.95) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+            'histogram': {
+                **{f"le_{bound * 1000:g}ms": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                'le_inf': self.buckets[-1]
+            }
+        }
+
+class QueryMetrics:
+    """Registro das métricas por impressão digital (seguro entre threads)"""
+
+    def __init__(self, slow_query_ms: float = DB_SLOW_QUERY_MS,
+                 max_statements: int = DB_QUERY_METRICS_MAX_STATEMENTS):
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self._statements: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+
+    def record(self, query: Any, params: Any, seconds: float, rows: int = 0, error: bool = False):
+        """Registra uma execução e loga se passar do limite de consulta lenta"""
+        key = fingerprint(query)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER_FINGERPRINT
+                stats = self._statements.setdefault(key, StatementStats())
+            stats.record(seconds, rows, error)
+            slow = self.slow_query_ms > 0 and seconds * 1000 >= self.slow_query_ms
+            if slow:
+                self.slow_queries += 1
+
+        if slow:
+            logger.warning(
+                f"🐢 Consulta lenta ({seconds * 1000:.1f} ms, {max(rows, 0)} linhas"
+                f"{', com erro' if error else ''}): {key} | params={redact_params(params)}"
+            )
+
+    def get_summary(self, top: Optional[int] = 20, order_by: str = 'total_ms') -> Dict[str, Any]:
+        """Instruções ordenadas por `order_by` (total_ms, avg_ms, p95_ms, calls, errors...)"""
+        with self._lock:
+            statements = [
+                {'fingerprint': key, **stats.summary()} for key, stats in self._statements.items()
+            ]
+            slow_queries = self.slow_queries
+
+        statements.sort(key=lambda item: item.get(order_by, 0), reverse=True)
+        return {
+            'statements_tracked': len(statements),
+            'total_calls': sum(item['calls'] for item in statements),
+            'total_errors': sum(item['errors'] for item in statements),
+            'slow_queries': slow_queries,
+            'slow_query_ms': self.slow_query_ms,
+            'statements': statements[:top] if top else statements
+        }
+
+    def reset(self):
+        """Zera as métricas (ex.: antes de medir uma janela específica)"""
+        with self._lock:
+            self._statements.clear()
+            self.slow_queries = 0
+
+class InstrumentedCursor:
+    """
+    Cursor que mede cada execute/executemany/copy_expert
+
+    Os demais atributos (fetch*, mogrify, connection, description...) são do
+    cursor original, inclusive quando usado por psycopg2.extras.execute_values.
+    """
+
+    def __init__(self, cursor, metrics: QueryMetrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _measure(self, method, query, params, *args):
+        started = time.perf_counter()
+        try:
+            result = method(query, *args)
+        except Exception:
+            self._metrics.record(query, params, time.perf_counter() - started, error=True)
+            raise
+        rows = getattr(self._cursor, 'rowcount', 0)
+        self._metrics.record(query, params, time.perf_counter() - started,
+                             rows=rows if isinstance(rows, int) else 0)
+        return result
+
+    def execute(self, query, params=None):
+        return self._measure(self._cursor.execute, query, params, params)
+
+    def executemany(self, query, params_list):
+        return self._measure(self._cursor.executemany, query, params_list, params_list)
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        return self._measure(lambda query: self._cursor.copy_expert(query, file, *args, **kwargs), sql, None)
+
+# Registro global das consultas do DatabaseManager
+query_metrics = QueryMetrics()
@@ -16,6 +16,7 @@ import re
 
 from backend.modules.logger_system import LogManager, LogCategory
 from backend.modules.validation_engine import JSONProcessor, ValidationResult
+from backend.modules.template_compiler import TemplateRenderer
 
 logger = LogManager.get_logger('billing_dispatcher')
 
@@ -78,6 +79,7 @@ class MessageTemplateManager:
     
     def __init__(self):
         self.templates: Dict[str, MessageTemplate] = {}
+        self.renderer = TemplateRenderer()
         self._load_default_templates()
     
     def _load_default_templates(self):
@@ -158,6 +160,10 @@ Entre em contato IMEDIATAMENTE! 📞""",
             priority=4
         )
         
+        # Compilar templates uma única vez
+        for template_id, template in self.templates.items():
+            self.renderer.register(template_id, template.content)
+        
         logger.info(LogCategory.BILLING, f"Templates carregados: {len(self.templates)}")
     
     def get_template(self, template_id: str) -> Optional[MessageTemplate]:
@@ -166,17 +172,9 @@ Entre em contato IMEDIATAMENTE! 📞""",
     
     def render_template(self, template_id: str, variables: Dict[str, Any]) -> Optional[str]:
         """Renderizar template com variáveis"""
-        template = self.get_template(template_id)
-        if not template:
-            return None
-        
         try:
-            content = template.content
-            for var, value in variables.items():
-                placeholder = '{' + var + '}'
-                content = content.replace(placeholder, str(value))
-            
-            return content
+            # Variáveis ausentes mantêm o placeholder original (resolvido na compilação)
+            return self.renderer.render(template_id, variables)
         except Exception as e:
             logger.error(LogCategory.BILLING, f"Erro ao renderizar template {template_id}: {e}")
             return None
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filtro de Bloom
+Conjunto probabilístico compacto: "não está" é sempre correto, "está" pode
+ser falso positivo com a taxa configurada
+"""
+
+import math
+import hashlib
+from typing import Any, Dict, Iterable
+
+class BloomFilter:
+    """
+    Filtro de Bloom dimensionado para `capacity` itens com taxa de falso
+    positivo `error_rate`
+
+    As k posições vêm de um único hash BLAKE2b (hashing duplo
+    h1 + i * h2). Acima da capacidade a taxa de falso positivo cresce, mas
+    nunca há falso negativo.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate deve estar entre 0 e 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get_metrics(self) -> Dict[str, Any]:
+        # Taxa esperada com os itens atuais: (1 - e^(-k n / m))^k
+        expected = (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+        return {
+            'items': self.count,
+            'capacity': self.capacity,
+            'size_bytes': len(self._bits),
+            'num_hashes': self.num_hashes,
+            'expected_false_positive_rate': round(expected, 6)
+        }
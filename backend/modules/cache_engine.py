@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache LRU com Expiração
+Cache em memória limitado por número de itens, com expiração por item
+baseada em relógio monotônico
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar('V')
+
+_MISSING = object()
+
+class LRUTTLCache(Generic[V]):
+    """
+    Cache LRU com TTL, get/put em O(1)
+
+    - Cheio, remove o item usado há mais tempo (eviction)
+    - Cada item expira `ttl` segundos depois da última gravação; o item
+      vencido é removido quando acessado (expiração preguiçosa)
+    - `purge_expired` remove os vencidos em O(vencidos): a ordem de
+      gravação é mantida à parte e, com TTL único, é a ordem de vencimento
+
+    Leituras com `allow_stale=True` devolvem o item vencido sem removê-lo
+    (usado em modo degradado, quando o cache é a única fonte).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        if max_entries <= 0:
+            raise ValueError("max_entries deve ser positivo")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # chave -> (valor, vence_em), na ordem de uso (mais recente no fim)
+        self._data: 'OrderedDict[Hashable, Tuple[V, float]]' = OrderedDict()
+        # chave -> vence_em, na ordem de gravação (vence primeiro no início)
+        self._expiry: 'OrderedDict[Hashable, float]' = OrderedDict()
+
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def get(self, key: Hashable, default: Any = None, allow_stale: bool = False) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.metrics['misses'] += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= self._clock() and not allow_stale:
+                self._remove(key)
+                self.metrics['expirations'] += 1
+                self.metrics['misses'] += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.metrics['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: V):
+        """Grava o item (renovando a expiração) e remove o LRU se passar do limite"""
+        with self._lock:
+            expires_at = self._clock() + self.ttl
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._expiry[key] = expires_at
+            self._expiry.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                oldest, _ = self._data.popitem(last=False)
+                del self._expiry[oldest]
+                self.metrics['evictions'] += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[V]:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, _ = self._remove(key)
+            return value
+
+    def purge_expired(self) -> int:
+        """Remove os itens vencidos; retorna quantos"""
+        with self._lock:
+            now = self._clock()
+            purged = 0
+            while self._expiry:
+                key, expires_at = next(iter(self._expiry.items()))
+                if expires_at > now:
+                    break
+                self._remove(key)
+                purged += 1
+            self.metrics['expirations'] += purged
+            return purged
+
+    def _remove(self, key: Hashable) -> Tuple[V, float]:
+        del self._expiry[key]
+        return self._data.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+
+    def __setitem__(self, key: Hashable, value: V):
+        self.put(key, value)
+
+    def __getitem__(self, key: Hashable) -> V:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Presente e não vencido (não conta como acesso nem altera a ordem)"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > self._clock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.metrics['hits'] + self.metrics['misses']
+            return {
+                **self.metrics,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hit_rate': round(self.metrics['hits'] / lookups, 4) if lookups else 0.0
+            }
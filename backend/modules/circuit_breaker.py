@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Circuit Breaker
+Interrompe as chamadas a uma dependência depois de falhas ou lentidões
+seguidas e volta a testá-la após um intervalo
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem tentar a dependência (circuito aberto)"""
+    pass
+
+class CircuitBreaker:
+    """
+    Circuito com três estados
+
+    - closed: chamadas passam; `failure_threshold` falhas ou chamadas mais
+      lentas que `slow_call_seconds` seguidas abrem o circuito
+    - open: chamadas recusadas por `reset_timeout` segundos
+    - half_open: uma chamada de teste por vez; sucesso fecha, falha reabre
+
+    `listeners` recebem (estado_anterior, novo_estado) fora do lock.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_seconds: float = 2.0,
+                 reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.listeners: List[Callable[[str, str], Any]] = []
+
+        self.metrics = {
+            'successes': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'rejected': 0,
+            'times_opened': 0
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def is_open(self) -> bool:
+        """Recusando chamadas agora (sem consumir a tentativa do half_open)"""
+        return self.state == OPEN
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Reserva a passagem de uma chamada (registre o resultado depois)"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.metrics['rejected'] += 1
+            return False
+
+    def record_success(self, elapsed: float = 0.0):
+        """Chamada concluída; acima de slow_call_seconds conta como falha de latência"""
+        if self.slow_call_seconds and elapsed >= self.slow_call_seconds:
+            with self._lock:
+                self.metrics['slow_calls'] += 1
+            logger.warning(f"🐢 {self.name}: chamada lenta ({elapsed:.2f}s)")
+            self._register_failure()
+            return
+
+        with self._lock:
+            self.metrics['successes'] += 1
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            previous = self._current_state()
+            # Chamada iniciada antes da abertura não fecha o circuito
+            if previous != OPEN:
+                self._state = CLOSED
+        if previous == HALF_OPEN:
+            logger.info(f"✅ {self.name}: circuito fechado")
+            self._notify(previous, CLOSED)
+
+    def release(self):
+        """Chamada sem resultado para este circuito: só devolve a tentativa do half_open"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Chamada falhou (erro de conexão, timeout...)"""
+        with self._lock:
+            self.metrics['failures'] += 1
+        self._register_failure()
+
+    def _register_failure(self):
+        with self._lock:
+            previous = self._current_state()
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            failures = self._consecutive_failures
+            opens = previous == HALF_OPEN or (previous == CLOSED and failures >= self.failure_threshold)
+            if opens:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self.metrics['times_opened'] += 1
+
+        if opens:
+            logger.error(
+                f"🔌 {self.name}: circuito aberto após {failures} falhas "
+                f"(nova tentativa em {self.reset_timeout:.0f}s)"
+            )
+            self._notify(previous, OPEN)
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Executa `fn` pelo circuito; levanta CircuitOpenError se estiver aberto"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name}: circuito aberto")
+
+        started = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(self._clock() - started)
+        return result
+
+    def _notify(self, previous: str, state: str):
+        for listener in list(self.listeners):
+            try:
+                listener(previous, state)
+            except Exception as e:
+                logger.error(f"❌ {self.name}: erro no listener do circuito: {str(e)}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.metrics,
+                'state': self._current_state(),
+                'consecutive_failures': self._consecutive_failures
+            }
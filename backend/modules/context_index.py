@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de Contextos Ativos
+Mantém os contextos de conversa ordenados por última atividade e por telefone,
+permitindo listagem paginada sem materializar todos os contextos
+"""
+
+import os
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from backend.modules.pagination import encode_cursor, decode_cursor
+
+# Chave de ordenação: (-timestamp, telefone) -> mais recente primeiro, desempate por telefone
+ActivityKey = Tuple[float, str]
+
+# Máximo de telefones lidos por página com filtro de prefixo (prefixo curto
+# como '55' casa com quase todo o índice)
+CONTEXT_PREFIX_SCAN_LIMIT = int(os.getenv('CONTEXT_PREFIX_SCAN_LIMIT', 5000))
+
+class ActiveContextIndex:
+    """Índice ordenado por última atividade com índice de prefixo de telefone"""
+
+    def __init__(self, prefix_scan_limit: int = CONTEXT_PREFIX_SCAN_LIMIT):
+        self.prefix_scan_limit = max(1, prefix_scan_limit)
+        self._lock = threading.Lock()
+        self._by_activity: List[ActivityKey] = []
+        self._phones: List[str] = []
+        self._keys: Dict[str, ActivityKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def touch(self, phone: str, timestamp: float):
+        """Registra atividade de um telefone (insere ou reposiciona no índice)"""
+        key = (-timestamp, phone)
+        with self._lock:
+            old_key = self._keys.get(phone)
+            if old_key == key:
+                return
+
+            if old_key is None:
+                insort(self._phones, phone)
+            else:
+                self._remove_activity_key(old_key)
+
+            insort(self._by_activity, key)
+            self._keys[phone] = key
+
+    def remove(self, phone: str) -> bool:
+        """Remove um telefone do índice"""
+        with self._lock:
+            key = self._keys.pop(phone, None)
+            if key is None:
+                return False
+
+            self._remove_activity_key(key)
+            position = bisect_left(self._phones, phone)
+            del self._phones[position]
+            return True
+
+    def last_activity(self, phone: str) -> Optional[float]:
+        """Retorna o timestamp da última atividade do telefone"""
+        key = self._keys.get(phone)
+        return -key[0] if key else None
+
+    def page(self, limit: int, cursor: Optional[str] = None,
+             phone_prefix: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Retorna uma página de telefones, do mais recente ao mais antigo
+
+        O cursor é opaco e aponta para a última linha lida na página anterior.
+        Sem filtro, a página custa O(log n + k). Com prefixo casando com até
+        prefix_scan_limit telefones (m), custa O(log n + m log k); prefixo mais
+        comum percorre a ordem de atividade lendo no máximo prefix_scan_limit
+        telefones, e a página pode vir incompleta com cursor para continuar.
+        """
+        after = self._decode(cursor) if cursor else None
+        last_read = None
+
+        with self._lock:
+            if phone_prefix:
+                keys, last_read = self._prefix_page(phone_prefix, after, limit)
+            else:
+                start = bisect_right(self._by_activity, after) if after else 0
+                keys = self._by_activity[start:start + limit + 1]
+
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        if has_more and keys:
+            next_cursor = self._encode(keys[-1])
+        else:
+            next_cursor = self._encode(last_read) if last_read else None
+
+        return [phone for _, phone in keys], next_cursor
+
+    def _prefix_page(self, prefix: str, after: Optional[ActivityKey],
+                     limit: int) -> Tuple[List[ActivityKey], Optional[ActivityKey]]:
+        """
+        Até limit + 1 chaves com o prefixo e a última chave lida, se a leitura
+        parou no prefix_scan_limit antes do fim do índice
+        """
+        start = bisect_left(self._phones, prefix)
+        matches = bisect_left(self._phones, prefix + '\U0010ffff', start) - start
+        if matches <= self.prefix_scan_limit:
+            return heapq.nsmallest(limit + 1, self._prefix_candidates(prefix, after)), None
+
+        position = bisect_right(self._by_activity, after) if after else 0
+        end = min(len(self._by_activity), position + self.prefix_scan_limit)
+        keys = []
+        for index in range(position, end):
+            key = self._by_activity[index]
+            if key[1].startswith(prefix):
+                keys.append(key)
+                if len(keys) > limit:
+                    return keys, None
+        return keys, self._by_activity[end - 1] if end < len(self._by_activity) else None
+
+    def _prefix_candidates(self, prefix: str, after: Optional[ActivityKey]):
+        """Chaves de atividade dos telefones que começam com o prefixo"""
+        start = bisect_left(self._phones, prefix)
+        for position in range(start, len(self._phones)):
+            phone = self._phones[position]
+            if not phone.startswith(prefix):
+                break
+            key = self._keys[phone]
+            if after is None or key > after:
+                yield key
+
+    def _remove_activity_key(self, key: ActivityKey):
+        position = bisect_left(self._by_activity, key)
+        del self._by_activity[position]
+
+    @staticmethod
+    def _encode(key: ActivityKey) -> str:
+        return encode_cursor([-key[0], key[1]])
+
+    @staticmethod
+    def _decode(cursor: str) -> ActivityKey:
+        timestamp, phone = decode_cursor(cursor, 2)
+        return (-float(timestamp), str(phone))
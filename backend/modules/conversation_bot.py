@@ -25,6 +25,11 @@ import random
 from pathlib import Path
 import asyncio
 import statistics
+import threading
+
+from backend.modules.context_index import ActiveContextIndex
+from backend.modules.template_compiler import TemplateRenderer
+from backend.modules.learning_event_queue import LearningEventQueue
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -48,6 +53,17 @@ except ImportError as e:
     logger.warning(f"⚠️ Módulos de aprendizado não disponíveis: {e}")
     LEARNING_MODULES_AVAILABLE = False
 
+# Importar dados persistentes dos clientes
+try:
+    from backend.modules.customer_data_manager import (
+        ConversationContext as PersistentConversationContext,
+        get_customer_data, commit_conversation_turn
+    )
+    CUSTOMER_DATA_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"⚠️ Dados persistentes de clientes não disponíveis: {e}")
+    CUSTOMER_DATA_AVAILABLE = False
+
 class IntentType(Enum):
     """Intenções do cliente em conversas de cobrança"""
     PAGAMENTO_CONFIRMADO = "pagamento_confirmado"
@@ -1060,6 +1076,17 @@ class ResponseGenerator:
     def __init__(self):
         self.response_templates = self._load_response_templates()
         self.personalization_data = self._load_personalization_data()
+        
+        # Templates compilados uma única vez (ID = "<tipo>:<índice>")
+        self.renderer = TemplateRenderer()
+        for response_type, templates in self.response_templates.items():
+            for index, template in enumerate(templates):
+                self.renderer.register(self._template_id(response_type, index), template)
+    
+    @staticmethod
+    def _template_id(response_type: ResponseType, index: int) -> str:
+        """ID do template compilado"""
+        return f"{response_type.value}:{index}"
     
     def _load_response_templates(self) -> Dict[ResponseType, List[str]]:
         """Templates de resposta por tipo - COBRANÇA EDUCADA MAS EFICAZ"""
@@ -1150,16 +1177,17 @@ class ResponseGenerator:
         # Escolhe template baseado na confiança da análise
         if analysis.confidence > 0.8:
             # Alta confiança - usa template mais específico
-            template = templates[0] if len(templates) > 0 else templates[0]
+            index = 0
         elif analysis.confidence > 0.5:
             # Confiança média - template balanceado  
-            template = templates[1] if len(templates) > 1 else templates[0]
+            index = 1 if len(templates) > 1 else 0
         else:
             # Baixa confiança - template mais genérico
-            template = templates[-1] if len(templates) > 0 else templates[0]
+            index = len(templates) - 1
         
         # Personaliza a mensagem
-        message = self._personalize_message(template, context, analysis)
+        template_id = self._template_id(analysis.recommended_response, index)
+        message = self._personalize_message(template_id, context, analysis)
         
         # Calcula próximo contato baseado na urgência
         next_contact_hours = self._calculate_next_contact(analysis.urgency_level, context)
@@ -1179,15 +1207,15 @@ class ResponseGenerator:
             context_update=context_update
         )
     
-    def _personalize_message(self, template: str, context: ConversationContext, 
+    def _personalize_message(self, template_id: str, context: ConversationContext, 
                            analysis: AnalysisResult) -> str:
-        """Personaliza mensagem com dados do cliente"""
-        return template.format(
-            name=context.customer_name,
-            amount=f"{context.debt_amount:.2f}",
-            days=context.days_overdue,
-            company=self.personalization_data['company_name']
-        )
+        """Personaliza mensagem com dados do cliente (template pré-compilado + cache)"""
+        return self.renderer.render(template_id, {
+            'name': context.customer_name,
+            'amount': f"{context.debt_amount:.2f}",
+            'days': context.days_overdue,
+            'company': self.personalization_data['company_name']
+        })
     
     def _calculate_next_contact(self, urgency_level: float, context: ConversationContext) -> int:
         """Calcula quando fazer próximo contato"""
@@ -1237,6 +1265,88 @@ class ResponseGenerator:
         
         return updates
 
+class ConversationStatistics:
+    """Contadores incrementais das conversas ativas - consulta em tempo constante"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_contexts = 0
+        self.total_interactions = 0
+        self.cooperation_sum = 0.0
+        self.intent_distribution: Dict[str, int] = {}
+        self.sentiment_distribution: Dict[str, int] = {}
+        # Última intenção/sentimento por telefone (para mover a contagem na distribuição)
+        self._last_intent: Dict[str, str] = {}
+        self._last_sentiment: Dict[str, str] = {}
+    
+    def context_added(self, context: ConversationContext):
+        """Registra um novo contexto ativo"""
+        with self._lock:
+            self.total_contexts += 1
+            self.total_interactions += len(context.conversation_history)
+            self.cooperation_sum += context.cooperation_level
+    
+    def context_removed(self, context: ConversationContext):
+        """Remove os valores de um contexto descartado dos contadores"""
+        with self._lock:
+            phone = context.customer_phone
+            self.total_contexts -= 1
+            self.total_interactions -= len(context.conversation_history)
+            self.cooperation_sum -= context.cooperation_level
+            self._move(self.intent_distribution, self._last_intent.pop(phone, None), None)
+            self._move(self.sentiment_distribution, self._last_sentiment.pop(phone, None), None)
+            
+            # Evita acúmulo de erro de ponto flutuante quando não há conversas
+            if self.total_contexts == 0:
+                self.cooperation_sum = 0.0
+    
+    def history_changed(self, delta: int):
+        """Ajusta o total de interações após alteração do histórico"""
+        if delta:
+            with self._lock:
+                self.total_interactions += delta
+    
+    def context_updated(self, phone: str, old_cooperation: float, new_cooperation: float,
+                        updates: Dict[str, Any]):
+        """Aplica as atualizações de um contexto aos contadores"""
+        with self._lock:
+            self.cooperation_sum += new_cooperation - old_cooperation
+            
+            if 'last_intent' in updates:
+                old_intent = self._last_intent.get(phone)
+                self._last_intent[phone] = updates['last_intent']
+                self._move(self.intent_distribution, old_intent, updates['last_intent'])
+            
+            if 'last_sentiment' in updates:
+                old_sentiment = self._last_sentiment.get(phone)
+                self._last_sentiment[phone] = updates['last_sentiment']
+                self._move(self.sentiment_distribution, old_sentiment, updates['last_sentiment'])
+    
+    @staticmethod
+    def _move(distribution: Dict[str, int], old_key: Optional[str], new_key: Optional[str]):
+        """Move uma contagem de uma chave para outra na distribuição"""
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            distribution[old_key] -= 1
+            if distribution[old_key] <= 0:
+                del distribution[old_key]
+        if new_key is not None:
+            distribution[new_key] = distribution.get(new_key, 0) + 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna as estatísticas atuais sem percorrer os contextos"""
+        with self._lock:
+            total = self.total_contexts
+            return {
+                'total_active_conversations': total,
+                'intent_distribution': dict(self.intent_distribution),
+                'sentiment_distribution': dict(self.sentiment_distribution),
+                'total_interactions': self.total_interactions,
+                'average_interactions': self.total_interactions / total if total else 0,
+                'average_cooperation': self.cooperation_sum / total if total else 0
+            }
+
 class ConversationBot:
     """IA SUPREMA ULTRA INTELIGENTE de Cobrança - Sistema Principal com Aprendizado"""
     
@@ -1244,17 +1354,26 @@ class ConversationBot:
         self.nlp_processor = AdvancedNLPProcessor()
         self.response_generator = ResponseGenerator()
         self.active_contexts: Dict[str, ConversationContext] = {}
+        self.statistics = ConversationStatistics()
+        self.context_index = ActiveContextIndex()
+        # Thread da fila de aprendizado escreve; insights da API leem
+        self._learning_lock = threading.Lock()
         
         # INTEGRAÇÃO COM MÓDULOS DE APRENDIZADO
         if LEARNING_MODULES_AVAILABLE:
             self.quality_analyzer = ResponseQualityAnalyzer()
             self.learning_engine = TemplateLearningEngine()
             self.campaign_optimizer = CampaignOptimizer()
+            
+            # Aprendizado roda fora do caminho da resposta, em lotes
+            self.learning_queue = LearningEventQueue(self._process_learning_events)
+            self.learning_queue.register_shutdown_flush()
             logger.info("🧠 MÓDULOS DE APRENDIZADO INTEGRADOS!")
         else:
             self.quality_analyzer = None
             self.learning_engine = None
             self.campaign_optimizer = None
+            self.learning_queue = None
             logger.warning("⚠️ Módulos de aprendizado não disponíveis")
         
         logger.info("🧠 CLAUDIA SUPREMA ULTRA INTELIGENTE ATIVADA!")
@@ -1283,24 +1402,15 @@ class ConversationBot:
         response = self.response_generator.generate_response(analysis, context)
         
         # ===== SISTEMA DE APRENDIZADO =====
-        if self.quality_analyzer and self.learning_engine:
-            # Analisa qualidade da resposta
-            quality_scores = self.quality_analyzer.analyze_response_quality({
+        # Publica evento; análise de qualidade e aprendizado rodam na thread de fundo
+        if self.learning_queue:
+            self.learning_queue.publish({
+                'type': 'response',
                 'text': response.message,
                 'intent': analysis.intent.value,
-                'sentiment': analysis.sentiment.value
+                'sentiment': analysis.sentiment.value,
+                'template_id': response.response_type.value
             })
-            
-            # Aprende com a resposta para melhorar futuras
-            self.learning_engine.learn_from_response({
-                'intent': analysis.intent.value,
-                'template_id': response.response_type.value,
-                'response': response.message,
-                'client_reaction': 'pending',  # Será atualizado quando cliente responder
-                'quality_scores': quality_scores
-            })
-            
-            logger.info(LogCategory.CONVERSATION, f"🎓 Qualidade: {quality_scores.get('overall', 0):.2f}")
         
         # ATUALIZA CONTEXTO
         self._update_context(phone, response.context_update)
@@ -1377,7 +1487,7 @@ class ConversationBot:
     def _get_or_create_context(self, phone: str, customer_data: Dict[str, Any]) -> ConversationContext:
         """Carrega ou cria contexto da conversa"""
         if phone not in self.active_contexts:
-            self.active_contexts[phone] = ConversationContext(
+            context = ConversationContext(
                 customer_phone=phone,
                 customer_name=customer_data.get('name', 'Cliente'),
                 debt_amount=float(customer_data.get('debt_amount', 0)),
@@ -1386,6 +1496,9 @@ class ConversationBot:
                 payment_promises=int(customer_data.get('payment_promises', 0)),
                 conversation_history=[]
             )
+            self.active_contexts[phone] = context
+            self.statistics.context_added(context)
+            self.context_index.touch(phone, datetime.now().timestamp())
             logger.info(f"📋 Novo contexto criado para {phone}")
         
         return self.active_contexts[phone]
@@ -1394,27 +1507,74 @@ class ConversationBot:
         """Atualiza contexto com novos dados"""
         if phone in self.active_contexts:
             context = self.active_contexts[phone]
+            old_cooperation = context.cooperation_level
             for key, value in updates.items():
                 if hasattr(context, key):
                     setattr(context, key, value)
+            
+            self.statistics.context_updated(phone, old_cooperation, context.cooperation_level, updates)
                     
             logger.info(f"📊 Contexto atualizado para {phone}")
     
     def _add_to_history(self, phone: str, customer_message: str, bot_response: str):
         """Adiciona interação ao histórico"""
         if phone in self.active_contexts:
+            now = datetime.now()
             interaction = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'customer_message': customer_message,
                 'bot_response': bot_response,
                 'message_type': 'conversation'
             }
-            self.active_contexts[phone].conversation_history.append(interaction)
+            history = self.active_contexts[phone].conversation_history
+            previous_length = len(history)
+            history.append(interaction)
             
             # Mantém apenas últimas 50 interações
-            if len(self.active_contexts[phone].conversation_history) > 50:
-                self.active_contexts[phone].conversation_history = \
-                    self.active_contexts[phone].conversation_history[-50:]
+            if len(history) > 50:
+                del history[:-50]
+            
+            self.statistics.history_changed(len(history) - previous_length)
+            
+            # Atualiza índice de última atividade
+            self.active_contexts[phone].last_response_time = now
+            self.context_index.touch(phone, now.timestamp())
+    
+    def _process_learning_events(self, events: List[Dict[str, Any]]):
+        """Processa um lote de eventos de aprendizado (thread de fundo)"""
+        for event in events:
+            # Lock por evento: leituras da API não esperam o lote inteiro
+            with self._learning_lock:
+                self._learn_from_event(event)
+        
+        logger.debug(f"🎓 Lote de aprendizado processado: {len(events)} eventos")
+    
+    def _learn_from_event(self, event: Dict[str, Any]):
+        """Aplica um evento de aprendizado (chamado com _learning_lock)"""
+        if event['type'] == 'response':
+            # Analisa qualidade da resposta
+            quality_scores = self.quality_analyzer.analyze_response_quality({
+                'text': event['text'],
+                'intent': event['intent'],
+                'sentiment': event['sentiment']
+            })
+            
+            # Aprende com a resposta para melhorar futuras
+            self.learning_engine.learn_from_response({
+                'intent': event['intent'],
+                'template_id': event['template_id'],
+                'response': event['text'],
+                'client_reaction': 'pending',  # Será atualizado quando cliente responder
+                'quality_scores': quality_scores
+            })
+        elif event['type'] == 'reaction':
+            self.learning_engine.learn_from_response({
+                'intent': 'unknown',  # Seria necessário armazenar o intent da última resposta
+                'template_id': 'unknown',
+                'response': event['response'],
+                'client_reaction': event['reaction'],
+                'quality_scores': {}
+            })
     
     def get_context(self, phone: str) -> Optional[ConversationContext]:
         """Retorna contexto da conversa"""
@@ -1424,10 +1584,23 @@ class ConversationBot:
         """Retorna todas as conversas ativas"""
         return self.active_contexts.copy()
     
+    def list_active_contexts(self, limit: int = 50, cursor: Optional[str] = None,
+                             phone_prefix: Optional[str] = None) -> Tuple[List[ConversationContext], Optional[str]]:
+        """
+        Lista contextos ativos do mais recente ao mais antigo, paginados por cursor
+        
+        Levanta ValueError se o cursor for inválido
+        """
+        phones, next_cursor = self.context_index.page(limit, cursor, phone_prefix)
+        contexts = [self.active_contexts[phone] for phone in phones if phone in self.active_contexts]
+        return contexts, next_cursor
+    
     def clear_context(self, phone: str) -> bool:
         """Limpa contexto de uma conversa"""
-        if phone in self.active_contexts:
-            del self.active_contexts[phone]
+        context = self.active_contexts.pop(phone, None)
+        if context is not None:
+            self.statistics.context_removed(context)
+            self.context_index.remove(phone)
             logger.info(f"🗑️ Contexto limpo para {phone}")
             return True
         return False
@@ -1440,14 +1613,19 @@ class ConversationBot:
             'learning_available': LEARNING_MODULES_AVAILABLE,
             'quality_insights': {},
             'template_performance': {},
-            'campaign_insights': {}
+            'campaign_insights': {},
+            'learning_queue': {}
         }
         
-        if self.quality_analyzer:
-            insights['quality_insights'] = self.quality_analyzer.get_quality_insights()
+        if self.learning_queue:
+            insights['learning_queue'] = self.learning_queue.get_metrics()
         
-        if self.learning_engine:
-            insights['template_performance'] = self.learning_engine.get_template_performance_summary()
+        with self._learning_lock:
+            if self.quality_analyzer:
+                insights['quality_insights'] = self.quality_analyzer.get_quality_insights()
+            
+            if self.learning_engine:
+                insights['template_performance'] = self.learning_engine.get_template_performance_summary()
         
         if self.campaign_optimizer:
             insights['campaign_insights'] = self.campaign_optimizer.get_campaign_insights()
@@ -1459,14 +1637,16 @@ class ConversationBot:
         if not self.learning_engine:
             return {'error': 'Sistema de aprendizado não disponível'}
         
-        return self.learning_engine.optimize_template_for_intent(intent)
+        with self._learning_lock:
+            return self.learning_engine.optimize_template_for_intent(intent)
     
     def get_best_templates(self, intent: str) -> List[Dict[str, Any]]:
         """Obtém melhores templates para uma intenção"""
         if not self.learning_engine:
             return []
         
-        return self.learning_engine.get_best_templates(intent)
+        with self._learning_lock:
+            return self.learning_engine.get_best_templates(intent)
     
     def update_client_reaction(self, phone: str, reaction: str):
         """Atualiza reação do cliente para aprendizado"""
@@ -1477,13 +1657,11 @@ class ConversationBot:
         if context and context.conversation_history:
             last_interaction = context.conversation_history[-1]
             
-            # Atualiza sistema de aprendizado com a reação
-            self.learning_engine.learn_from_response({
-                'intent': 'unknown',  # Seria necessário armazenar o intent da última resposta
-                'template_id': 'unknown',
+            # Atualiza sistema de aprendizado com a reação (processado em segundo plano)
+            self.learning_queue.publish({
+                'type': 'reaction',
                 'response': last_interaction.get('bot_response', ''),
-                'client_reaction': reaction,
-                'quality_scores': {}
+                'reaction': reaction
             })
             
             logger.info(f"🎓 Reação do cliente {phone} atualizada: {reaction}")
@@ -1496,27 +1674,8 @@ class ConversationBot:
         return self.campaign_optimizer.analyze_campaign_performance(campaign_data)
     
     def get_conversation_statistics(self) -> Dict[str, Any]:
-        """Obtém estatísticas das conversas ativas"""
-        stats = {
-            'total_active_conversations': len(self.active_contexts),
-            'intent_distribution': {},
-            'sentiment_distribution': {},
-            'cooperation_levels': [],
-            'average_interactions': 0
-        }
-        
-        if not self.active_contexts:
-            return stats
-        
-        total_interactions = 0
-        for context in self.active_contexts.values():
-            total_interactions += len(context.conversation_history)
-            stats['cooperation_levels'].append(context.cooperation_level)
-        
-        stats['average_interactions'] = total_interactions / len(self.active_contexts)
-        stats['average_cooperation'] = sum(stats['cooperation_levels']) / len(stats['cooperation_levels'])
-        
-        return stats
+        """Obtém estatísticas das conversas ativas (contadores incrementais, O(1))"""
+        return self.statistics.snapshot()
 
 # Instância global da IA
 conversation_bot = ConversationBot()
@@ -1557,15 +1716,19 @@ def process_customer_message(phone: str, message: str, customer_data: Optional[D
                     }
                     logger.info(f"🗄️ CLIENTE ENCONTRADO no sistema persistente: {stored_customer.name}")
                 else:
-                    # 👤 NÃO É CLIENTE CADASTRADO - RESPONDER COMO PESSOA COMUM
+                    # 👤 NÃO É CLIENTE CADASTRADO - RESPOSTA GERAL, SEM GRAVAR NO BANCO
                     logger.info(f"👤 Pessoa não cadastrada como cliente: {phone}")
-                    customer_data = {
-                        'name': 'Pessoa',
-                        'phone': phone,
-                        'is_customer': False,
-                        'debt_amount': 0.0,
-                        'days_overdue': 0,
-                        'status': 'non_customer'
+                    response = conversation_bot.generate_general_response(phone, message)
+                    return {
+                        'success': True,
+                        'response': response.message,
+                        'response_type': response.response_type.value,
+                        'urgency_level': response.urgency_level,
+                        'next_contact_hours': response.next_contact_hours,
+                        'escalate': response.escalate,
+                        'context_updates': response.context_update,
+                        'customer_data_persistent': CUSTOMER_DATA_AVAILABLE,
+                        'customer_found': False
                     }
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao buscar dados persistentes: {str(e)}")
@@ -1584,7 +1747,7 @@ def process_customer_message(phone: str, message: str, customer_data: Optional[D
         if CUSTOMER_DATA_AVAILABLE:
             try:
                 # Criar contexto persistente
-                context = ConversationContext(
+                context = PersistentConversationContext(
                     phone=phone,
                     customer_name=customer_data.get('name', 'Cliente'),
                     debt_amount=customer_data.get('debt_amount', 0),
@@ -1602,16 +1765,13 @@ def process_customer_message(phone: str, message: str, customer_data: Optional[D
                     last_contact=datetime.now().isoformat()
                 )
                 
-                # Salvar contexto persistente
-                save_conversation_context(phone, context)
-                logger.info(f"💾 Contexto da conversa salvo (persistente): {phone}")
-                
-                # Atualizar interação do cliente
-                update_customer_interaction(phone, {
+                # Gravar contexto, turno e interação do cliente (uma transação)
+                commit_conversation_turn(phone, context, {
                     'intent': response.response_type.value,
                     'urgency_level': response.urgency_level,
                     'response_type': response.response_type.value
                 })
+                logger.info(f"💾 Contexto da conversa salvo (persistente): {phone}")
                 
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao salvar contexto persistente: {str(e)}")
@@ -5,15 +5,64 @@ Gerenciador de Dados dos Clientes com Persistência SQL
 Sistema para armazenar e recuperar dados dos clientes de forma persistente
 """
 
+import os
 import json
+import time
+import atexit
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Any
+from dataclasses import dataclass, asdict, fields, replace
+
+from backend.modules.bloom_filter import BloomFilter
+from backend.modules.cache_engine import LRUTTLCache
+from backend.modules.circuit_breaker import CLOSED
+from backend.modules.phone_utils import normalize_phone_e164
+from backend.modules.redis_cache import create_redis_cache
+from backend.modules.single_flight import SingleFlight
+from backend.modules.write_behind import WriteBehindBuffer
+from backend.modules.write_spool import WriteSpool
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
+# Caches em memória: LRU limitado por itens, expiração por item
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 24 * 3600))
+CUSTOMER_CACHE_MAX_ENTRIES = int(os.getenv('CUSTOMER_CACHE_MAX_ENTRIES', 50000))
+CONVERSATION_CACHE_MAX_ENTRIES = int(os.getenv('CONVERSATION_CACHE_MAX_ENTRIES', 20000))
+
+# Cache negativo: telefones que não são clientes não voltam ao banco por
+# NEGATIVE_CACHE_TTL_SECONDS (curto: um cadastro feito em outro worker aparece logo)
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv('NEGATIVE_CACHE_TTL_SECONDS', 120))
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv('NEGATIVE_CACHE_MAX_ENTRIES', 100000))
+
+# Filtro de Bloom com os telefones de todos os clientes (opcional): telefone
+# fora do filtro não é cliente, sem consulta ao banco. Reconstruído a cada
+# PHONE_FILTER_REFRESH_SECONDS e após cargas em massa (bulk_upsert_customers).
+# Filtro mais velho que NEGATIVE_CACHE_TTL_SECONDS pode não ter cadastros de
+# outros workers: a recusa é confirmada no banco (mesma validade do cache negativo)
+PHONE_FILTER_ENABLED = os.getenv('PHONE_FILTER_ENABLED', 'false').lower() == 'true'
+PHONE_FILTER_ERROR_RATE = float(os.getenv('PHONE_FILTER_ERROR_RATE', 0.001))
+PHONE_FILTER_REFRESH_SECONDS = float(os.getenv('PHONE_FILTER_REFRESH_SECONDS', 900))
+
+# Write-behind das conversas: turnos do mesmo telefone são juntados e
+# gravados em lote a cada WRITE_BEHIND_FLUSH_MS ou WRITE_BEHIND_MAX_BATCH telefones
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+WRITE_BEHIND_FLUSH_MS = int(os.getenv('WRITE_BEHIND_FLUSH_MS', 200))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', 500))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 10000))
+
+# Modo degradado: com o circuito do banco aberto, leituras só do cache e
+# escritas no spool local, reaplicado em ordem quando o circuito fecha
+WRITE_SPOOL_PATH = os.getenv('WRITE_SPOOL_PATH', os.path.join('data', 'write_spool.jsonl'))
+WRITE_SPOOL_MAX_ENTRIES = int(os.getenv('WRITE_SPOOL_MAX_ENTRIES', 100000))
+SPOOL_REPLAY_INTERVAL = float(os.getenv('SPOOL_REPLAY_INTERVAL', 5.0))
+SPOOL_MAX_REPLAY_ATTEMPTS = int(os.getenv('SPOOL_MAX_REPLAY_ATTEMPTS', 3))
+
+# Aquecimento do cache L2: clientes gravados no Redis por pipeline
+CACHE_WARM_CHUNK = int(os.getenv('CACHE_WARM_CHUNK', 1000))
+
 @dataclass
 class CustomerData:
     """Dados completos do cliente para cobrança"""
@@ -58,15 +107,52 @@ class ConversationContext:
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
+@dataclass
+class PendingTurn:
+    """Escrita pendente de uma conversa no buffer write-behind"""
+    context: ConversationContext
+    protocolo: Optional[str] = None
+    interactions: int = 0
+    payment_promises: int = 0
+
+def merge_pending_turns(pending: PendingTurn, new: PendingTurn) -> PendingTurn:
+    """Junta duas escritas do mesmo telefone: agregados da mais nova, turnos e contadores somados"""
+    history = pending.context.conversation_history + new.context.conversation_history
+    return PendingTurn(
+        context=replace(new.context, conversation_history=history,
+                        created_at=pending.context.created_at or new.context.created_at),
+        protocolo=new.protocolo or pending.protocolo,
+        interactions=pending.interactions + new.interactions,
+        payment_promises=pending.payment_promises + new.payment_promises
+    )
+
 class CustomerDataManager:
     """Gerenciador inteligente de dados dos clientes com cache + persistência"""
     
     def __init__(self):
-        self.memory_cache: Dict[str, CustomerData] = {}
-        self.conversation_cache: Dict[str, ConversationContext] = {}
-        self.cache_ttl = timedelta(hours=24)  # Cache válido por 24h
+        self.memory_cache: LRUTTLCache[CustomerData] = LRUTTLCache(CUSTOMER_CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+        self.conversation_cache: LRUTTLCache[ConversationContext] = LRUTTLCache(
+            CONVERSATION_CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+        )
         self.last_cache_cleanup = datetime.now()
         
+        # Telefones sabidamente fora da base de clientes
+        self.negative_cache: LRUTTLCache[bool] = LRUTTLCache(NEGATIVE_CACHE_MAX_ENTRIES, NEGATIVE_CACHE_TTL_SECONDS)
+        self.phone_filter: Optional[BloomFilter] = None
+        self._filter_lock = threading.Lock()
+        self._filter_thread: Optional[threading.Thread] = None
+        self._filter_rebuild_pending = False
+        self._filter_built_at = float('-inf')
+        self._filter_added_during_build: Optional[List[str]] = None
+        # Buscas simultâneas do mesmo telefone esperam uma única ida ao L2/banco
+        self.single_flight = SingleFlight()
+        self.lookup_metrics = {
+            'negative_cache_hits': 0,
+            'phone_filter_rejections': 0,
+            'phone_filter_stale_checks': 0,
+            'database_lookups': 0
+        }
+        
         # Importar gerenciador de banco se disponível
         try:
             from backend.database.database_manager import db_manager
@@ -77,6 +163,41 @@ class CustomerDataManager:
             self.db_manager = None
             self.database_available = False
             logger.warning("⚠️ Banco de dados não disponível - usando apenas cache")
+        
+        # Buffer write-behind (gravado também no desligamento do processo)
+        self.write_buffer: Optional[WriteBehindBuffer] = None
+        if self.database_available and WRITE_BEHIND_ENABLED:
+            self.write_buffer = WriteBehindBuffer(
+                self._flush_pending_turns,
+                merge_pending_turns,
+                flush_interval=WRITE_BEHIND_FLUSH_MS / 1000,
+                max_batch=WRITE_BEHIND_MAX_BATCH,
+                max_pending=WRITE_BEHIND_MAX_PENDING,
+                name='conversation-write-behind',
+                overflow=self._spool_turns
+            )
+            atexit.register(self.write_buffer.close)
+        
+        # Cache L2 no Redis, compartilhado pelos workers (None sem REDIS_URL)
+        self.l2_cache = create_redis_cache()
+        
+        # Spool das escritas feitas com o circuito do banco aberto
+        self.spool = WriteSpool(WRITE_SPOOL_PATH, WRITE_SPOOL_MAX_ENTRIES)
+        self._replay_lock = threading.Lock()
+        self._replay_thread: Optional[threading.Thread] = None
+        self._last_replay_at = float('-inf')
+        self._head_failures = 0
+        breaker = getattr(self.db_manager, 'breaker', None)
+        if breaker is not None:
+            breaker.listeners.append(self._on_breaker_change)
+        import_listeners = getattr(self.db_manager, 'import_listeners', None)
+        if import_listeners is not None:
+            import_listeners.append(self._on_customers_imported)
+        if self.database_available and self.spool.pending:
+            logger.warning(f"📥 {self.spool.pending} escritas no spool de uma execução anterior")
+            self._schedule_replay()
+        if self.database_available and PHONE_FILTER_ENABLED:
+            self._schedule_filter_rebuild()
     
     def save_customer_data(self, customer_data: Dict[str, Any]) -> bool:
         """
@@ -107,20 +228,26 @@ class CustomerDataManager:
                 updated_at=datetime.now().isoformat()
             )
             
-            # ✅ SALVAR NO BANCO SQL (PERSISTENTE)
+            # ✅ SALVAR NO BANCO SQL (PERSISTENTE; no spool em modo degradado)
             if self.database_available and self.db_manager:
                 try:
-                    # Salvar na tabela de clientes
-                    success = self.db_manager.save_customer_data(customer)
-                    if success:
+                    if self._spool_first():
+                        self.spool.append('customer', asdict(customer))
+                        logger.info(f"📥 Cliente {customer.name} no spool (banco indisponível)")
+                    elif self.db_manager.save_customer_data(self._to_db_customer(customer)):
                         logger.info(f"💾 Cliente {customer.name} salvo no banco SQL")
+                    elif self._circuit_not_closed():
+                        self.spool.append('customer', asdict(customer))
                     else:
                         logger.warning(f"⚠️ Falha ao salvar cliente {customer.name} no banco")
                 except Exception as e:
                     logger.error(f"❌ Erro ao salvar no banco: {str(e)}")
             
-            # ✅ SALVAR NO CACHE (RÁPIDO)
+            # ✅ SALVAR NO CACHE (RÁPIDO) E NO CACHE L2 DOS OUTROS WORKERS
             self.memory_cache[customer.phone] = customer
+            self._mark_known_phone(customer.phone)
+            if self.l2_cache:
+                self.l2_cache.set(self._l2_key(customer.phone), asdict(customer))
             logger.info(f"📱 Cliente {customer.name} salvo no cache: {customer.phone}")
             
             return True
@@ -136,49 +263,62 @@ class CustomerDataManager:
         Busca dados do cliente primeiro no cache, depois no banco
         """
         try:
-            # 1. 🚀 TENTAR CACHE (RÁPIDO)
-            if phone in self.memory_cache:
-                customer = self.memory_cache[phone]
+            # 1. 🚀 TENTAR CACHE (RÁPIDO; itens vencidos valem em modo degradado)
+            customer = self.memory_cache.get(phone, allow_stale=self._degraded())
+            if customer:
                 logger.info(f"⚡ Cliente {customer.name} encontrado no cache: {phone}")
                 return customer
             
-            # 2. 🗄️ BUSCAR NO BANCO (PERSISTENTE)
-            if self.database_available and self.db_manager:
+            # 2. 🔀 UMA SÓ BUSCA POR TELEFONE (chamadas simultâneas aguardam a mesma)
+            return self.single_flight.do(('customer', phone), lambda: self._load_customer_data(phone))
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar dados do cliente: {str(e)}")
+            return None
+    
+    def _load_customer_data(self, phone: str) -> Optional[CustomerData]:
+        """Busca no cache L2 e no banco (executada uma vez por telefone por vez)"""
+        try:
+            # Carregado por uma busca que terminou entre o miss e esta
+            customer = self.memory_cache.get(phone)
+            if customer:
+                return customer
+            
+            # 3. 🧊 TENTAR CACHE L2 (REDIS, COMPARTILHADO ENTRE WORKERS)
+            if self.l2_cache:
+                customer = self._customer_from_l2(self.l2_cache.get(self._l2_key(phone)))
+                if customer:
+                    self.memory_cache[phone] = customer
+                    logger.info(f"🧊 Cliente {customer.name} encontrado no cache L2: {phone}")
+                    return customer
+            
+            # 4. 🚫 NÃO É CLIENTE (CACHE NEGATIVO / FILTRO DE TELEFONES)
+            if self._known_non_customer(phone):
+                logger.info(f"🚫 Telefone fora da base de clientes (sem consulta ao banco): {phone}")
+                return None
+            
+            # 5. 🗄️ BUSCAR NO BANCO (PERSISTENTE; só cache em modo degradado)
+            if self.database_available and self.db_manager and not self._degraded():
                 try:
                     # Buscar por telefone
-                    customer = self.db_manager.get_customer_by_phone(phone)
+                    self.lookup_metrics['database_lookups'] += 1
+                    customer = self.db_manager.find_customer_by_phone(phone)
                     if customer:
-                        # Converter para CustomerData
-                        customer_data = CustomerData(
-                            phone=customer.phone,
-                            name=customer.name,
-                            documento=customer.documento,
-                            debt_amount=customer.debt_amount,
-                            days_overdue=customer.days_overdue,
-                            due_date=customer.due_date,
-                            protocolo=customer.protocolo,
-                            contrato=customer.contrato,
-                            regional=customer.regional,
-                            territorio=customer.territorio,
-                            plano=customer.plano,
-                            valor_mensalidade=customer.valor_mensalidade,
-                            company=customer.company,
-                            status=customer.status,
-                            priority=customer.priority,
-                            is_customer=customer.is_customer,
-                            created_at=customer.created_at,
-                            updated_at=customer.updated_at
-                        )
+                        customer_data = self._from_db_customer(customer, phone)
                         
-                        # Salvar no cache para próximas consultas
+                        # Salvar nos caches para próximas consultas
                         self.memory_cache[phone] = customer_data
+                        if self.l2_cache:
+                            self.l2_cache.set(self._l2_key(phone), asdict(customer_data))
                         logger.info(f"🗄️ Cliente {customer_data.name} carregado do banco: {phone}")
                         return customer_data
                     
+                    self._mark_non_customer(phone)
+                    
                 except Exception as e:
                     logger.error(f"❌ Erro ao buscar no banco: {str(e)}")
             
-            # 3. ❌ CLIENTE NÃO ENCONTRADO
+            # 6. ❌ CLIENTE NÃO ENCONTRADO
             logger.warning(f"⚠️ Cliente não encontrado: {phone}")
             return None
             
@@ -186,6 +326,283 @@ class CustomerDataManager:
             logger.error(f"❌ Erro ao buscar dados do cliente: {str(e)}")
             return None
     
+    def get_customers_data(self, phones: List[str]) -> Dict[str, CustomerData]:
+        """
+        🔍 BUSCAR VÁRIOS CLIENTES (CACHE + CACHE L2 + BANCO)
+        
+        Os que faltam no cache em memória são buscados no Redis de uma vez
+        (pipeline); só os que faltam nos dois vão ao banco
+        """
+        found: Dict[str, CustomerData] = {}
+        try:
+            missing = []
+            allow_stale = self._degraded()
+            for phone in dict.fromkeys(phones):
+                customer = self.memory_cache.get(phone, allow_stale=allow_stale)
+                if customer:
+                    found[phone] = customer
+                else:
+                    missing.append(phone)
+            
+            if missing and self.l2_cache:
+                cached = self.l2_cache.get_many([self._l2_key(phone) for phone in missing])
+                for phone in missing:
+                    customer = self._customer_from_l2(cached.get(self._l2_key(phone)))
+                    if customer:
+                        self.memory_cache[phone] = customer
+                        found[phone] = customer
+                missing = [phone for phone in missing if phone not in found]
+            
+            missing = [phone for phone in missing if not self._known_non_customer(phone)]
+            if missing and self.database_available and self.db_manager and not self._degraded():
+                loaded = []
+                for phone in missing:
+                    try:
+                        self.lookup_metrics['database_lookups'] += 1
+                        customer = self.db_manager.find_customer_by_phone(phone)
+                    except Exception as e:
+                        logger.error(f"❌ Erro ao buscar no banco: {str(e)}")
+                        break
+                    if customer:
+                        customer_data = self._from_db_customer(customer, phone)
+                        self.memory_cache[phone] = customer_data
+                        found[phone] = customer_data
+                        loaded.append((self._l2_key(phone), asdict(customer_data)))
+                    else:
+                        self._mark_non_customer(phone)
+                if loaded and self.l2_cache:
+                    self.l2_cache.set_many(loaded)
+            
+            return found
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar dados dos clientes: {str(e)}")
+            return found
+    
+    def warm_customer_cache(self, empresa: Optional[str] = None, ttl: Optional[int] = None) -> int:
+        """
+        🔥 AQUECER O CACHE L2
+        
+        Percorre os clientes do banco (todos ou de uma empresa) e grava no
+        Redis em pipelines de CACHE_WARM_CHUNK, para que uma campanha encontre
+        os clientes no cache em todos os workers. Retorna quantos foram gravados.
+        """
+        if not self.l2_cache or not self.database_available or not self.db_manager:
+            return 0
+        
+        warmed = 0
+        chunk = []
+        try:
+            customers = (self.db_manager.iter_customers_by_company(empresa) if empresa
+                         else self.db_manager.iter_customers())
+            for customer in customers:
+                if not customer.phone:
+                    continue
+                customer_data = self._from_db_customer(customer, customer.phone)
+                chunk.append((self._l2_key(customer.phone), asdict(customer_data)))
+                if len(chunk) >= CACHE_WARM_CHUNK:
+                    warmed += self.l2_cache.set_many(chunk, ttl)
+                    chunk = []
+            if chunk:
+                warmed += self.l2_cache.set_many(chunk, ttl)
+            
+            logger.info(f"🔥 Cache L2 aquecido: {warmed} clientes" + (f" ({empresa})" if empresa else ""))
+            return warmed
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao aquecer cache L2: {str(e)}")
+            return warmed
+    
+    def _known_non_customer(self, phone: str) -> bool:
+        """Telefone no cache negativo ou fora do filtro de Bloom (resposta certa, sem banco)"""
+        if phone in self.negative_cache:
+            self.lookup_metrics['negative_cache_hits'] += 1
+            return True
+        
+        phone_filter = self.phone_filter
+        if phone_filter is None:
+            return False
+        filter_age = time.monotonic() - self._filter_built_at
+        if filter_age > PHONE_FILTER_REFRESH_SECONDS:
+            self._schedule_filter_rebuild()
+        
+        # Mesmas chaves da busca no banco: telefone E.164 e o documento (registros antigos)
+        phone_e164 = normalize_phone_e164(phone)
+        if (phone_e164 and phone_e164 in phone_filter) or phone in phone_filter:
+            return False
+        if filter_age > NEGATIVE_CACHE_TTL_SECONDS:
+            # Cadastros de outros workers desde a construção não estão no filtro: confirma no banco
+            self.lookup_metrics['phone_filter_stale_checks'] += 1
+            return False
+        self.lookup_metrics['phone_filter_rejections'] += 1
+        return True
+    
+    def _mark_non_customer(self, phone: str):
+        # Sem cache negativo com o circuito aberto ou em teste: o None pode ter sido recusa do banco
+        if not self._circuit_not_closed():
+            self.negative_cache[phone] = True
+    
+    def _mark_known_phone(self, phone: str):
+        """Cliente gravado neste processo: sai do cache negativo e entra no filtro"""
+        self.negative_cache.pop(phone)
+        key = normalize_phone_e164(phone) or phone
+        with self._filter_lock:
+            if self.phone_filter is not None:
+                self.phone_filter.add(key)
+            if self._filter_added_during_build is not None:
+                self._filter_added_during_build.append(key)
+    
+    def _on_customers_imported(self, stats: Dict[str, Any]):
+        """
+        Carga em massa gravou clientes: telefones novos ou alterados saem do
+        cache negativo e entram no filtro; os clientes em cache são descartados
+        """
+        logger.info(f"🧮 {stats.get('rows', 0)} clientes importados ({stats.get('inserted', 0)} novos)")
+        # A chave do cache é o telefone como chegou na mensagem, não o da carga:
+        # descarta todos os clientes (voltam do banco na próxima busca)
+        self.memory_cache.clear()
+        if self.l2_cache:
+            removed = self.l2_cache.delete_prefix(self._l2_key(''))
+            logger.info(f"🧹 {removed} clientes removidos do cache L2")
+        if self.phone_filter is not None or PHONE_FILTER_ENABLED:
+            # A reconstrução também limpa o cache negativo
+            self._schedule_filter_rebuild()
+        else:
+            self.negative_cache.clear()
+    
+    def _schedule_filter_rebuild(self):
+        """Reconstrói o filtro de telefones em segundo plano"""
+        with self._filter_lock:
+            if self._filter_thread is not None:
+                # Reconstrução em andamento pode já ter lido a tabela: repete ao terminar
+                self._filter_rebuild_pending = True
+                return
+            self._filter_thread = threading.Thread(
+                target=self._run_filter_rebuilds, name='phone-filter-rebuild', daemon=True
+            )
+            self._filter_thread.start()
+    
+    def _run_filter_rebuilds(self):
+        """Reconstrói o filtro até não haver pedido pendente"""
+        while True:
+            self.rebuild_phone_filter()
+            with self._filter_lock:
+                if not self._filter_rebuild_pending:
+                    self._filter_thread = None
+                    return
+                self._filter_rebuild_pending = False
+    
+    def rebuild_phone_filter(self) -> bool:
+        """
+        🧮 RECONSTRUIR FILTRO DE TELEFONES
+        
+        Lê telefone e documento de todos os clientes do banco e troca o filtro
+        de Bloom atual pelo novo (chamar depois de importar clientes)
+        """
+        if not self.database_available or not self.db_manager:
+            return False
+        
+        with self._filter_lock:
+            self._filter_added_during_build = []
+        try:
+            keys = []
+            for phone_e164, documento in self.db_manager.iter_customer_phones():
+                if phone_e164:
+                    keys.append(phone_e164)
+                if documento:
+                    keys.append(documento)
+            
+            phone_filter = BloomFilter(max(1000, int(len(keys) * 1.2)), PHONE_FILTER_ERROR_RATE)
+            phone_filter.update(keys)
+            with self._filter_lock:
+                # Clientes gravados durante a leitura podem não estar no resultado
+                phone_filter.update(self._filter_added_during_build)
+                self.phone_filter = phone_filter
+                self._filter_built_at = time.monotonic()
+            
+            # Cache negativo anterior pode conter telefones importados agora
+            self.negative_cache.clear()
+            logger.info(f"🧮 Filtro de telefones reconstruído: {len(keys)} chaves")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao reconstruir filtro de telefones: {str(e)}")
+            # Tenta de novo só no próximo intervalo
+            self._filter_built_at = time.monotonic()
+            return False
+        
+        finally:
+            with self._filter_lock:
+                self._filter_added_during_build = None
+    
+    def _l2_key(self, phone: str) -> str:
+        return f"customer:{phone}"
+    
+    def _customer_from_l2(self, payload: Optional[Dict[str, Any]]) -> Optional[CustomerData]:
+        """CustomerData a partir do valor do Redis (ignora campos desconhecidos)"""
+        if not payload:
+            return None
+        known = {field.name for field in fields(CustomerData)}
+        try:
+            return CustomerData(**{key: value for key, value in payload.items() if key in known})
+        except TypeError as e:
+            logger.warning(f"⚠️ Cliente inválido no cache L2: {str(e)}")
+            return None
+    
+    def _to_db_customer(self, customer: CustomerData):
+        """Converte CustomerData para o Customer do banco (telefone normalizado no banco)"""
+        from backend.database.database_manager import Customer
+        
+        return Customer(
+            protocolo=customer.protocolo,
+            first_name=customer.name,
+            documento=customer.documento,
+            cobrado_fpd=customer.debt_amount,
+            dias_fpd=customer.days_overdue,
+            data_vencimento_fpd=customer.due_date,
+            contrato=customer.contrato,
+            regional=customer.regional,
+            territorio=customer.territorio,
+            dsc_plano=customer.plano,
+            valor_mensalidade=customer.valor_mensalidade,
+            empresa=customer.company,
+            status=customer.status,
+            priority=customer.priority,
+            is_customer=customer.is_customer,
+            last_contact=customer.last_contact,
+            conversation_count=customer.conversation_count,
+            payment_promises=customer.payment_promises,
+            last_payment_date=customer.last_payment_date,
+            phone=customer.phone or None
+        )
+    
+    def _from_db_customer(self, customer, phone: str) -> CustomerData:
+        """Converte o Customer do banco para CustomerData"""
+        return CustomerData(
+            phone=customer.phone or phone,
+            name=customer.first_name,
+            documento=customer.documento,
+            debt_amount=customer.cobrado_fpd,
+            days_overdue=customer.dias_fpd,
+            due_date=customer.data_vencimento_fpd,
+            protocolo=customer.protocolo,
+            contrato=customer.contrato,
+            regional=customer.regional,
+            territorio=customer.territorio,
+            plano=customer.dsc_plano,
+            valor_mensalidade=customer.valor_mensalidade,
+            company=customer.empresa,
+            status=customer.status,
+            priority=customer.priority,
+            is_customer=customer.is_customer,
+            last_contact=customer.last_contact,
+            conversation_count=customer.conversation_count,
+            payment_promises=customer.payment_promises,
+            last_payment_date=customer.last_payment_date,
+            created_at=customer.created_at,
+            updated_at=customer.updated_at
+        )
+    
     def save_conversation_context(self, phone: str, context: ConversationContext) -> bool:
         """
         💾 SALVAR CONTEXTO DA CONVERSA (PERSISTENTE)
@@ -198,10 +615,14 @@ class CustomerDataManager:
             if not context.created_at:
                 context.created_at = context.updated_at
             
-            # ✅ SALVAR NO BANCO SQL
-            if self.database_available and self.db_manager:
+            # ✅ SALVAR NO BANCO SQL (em lote, via write-behind)
+            if self.write_buffer:
+                self.write_buffer.submit(phone, PendingTurn(context))
+            elif self.database_available and self.db_manager:
                 try:
-                    success = self.db_manager.save_conversation_context(context)
+                    success = self._persist_turn(
+                        PendingTurn(context), lambda: self.db_manager.save_conversation_context(context)
+                    )
                     if success:
                         logger.info(f"💾 Contexto da conversa salvo no banco: {phone}")
                     else:
@@ -226,14 +647,28 @@ class CustomerDataManager:
         Busca contexto da conversa para continuidade
         """
         try:
-            # 1. 🚀 TENTAR CACHE
-            if phone in self.conversation_cache:
-                context = self.conversation_cache[phone]
+            # 1. 🚀 TENTAR CACHE (itens vencidos valem em modo degradado)
+            context = self.conversation_cache.get(phone, allow_stale=self._degraded())
+            if context:
                 logger.info(f"⚡ Contexto da conversa encontrado no cache: {phone}")
                 return context
             
-            # 2. 🗄️ BUSCAR NO BANCO
-            if self.database_available and self.db_manager:
+            # 2. 🔀 UMA SÓ BUSCA POR TELEFONE (chamadas simultâneas aguardam a mesma)
+            return self.single_flight.do(('conversation', phone), lambda: self._load_conversation_context(phone))
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar contexto da conversa: {str(e)}")
+            return None
+    
+    def _load_conversation_context(self, phone: str) -> Optional[ConversationContext]:
+        """Busca o contexto no banco (executada uma vez por telefone por vez)"""
+        try:
+            context = self.conversation_cache.get(phone)
+            if context:
+                return context
+            
+            # 3. 🗄️ BUSCAR NO BANCO (só cache em modo degradado)
+            if self.database_available and self.db_manager and not self._degraded():
                 try:
                     context = self.db_manager.get_conversation_context(phone)
                     if context:
@@ -263,7 +698,7 @@ class CustomerDataManager:
                 except Exception as e:
                     logger.error(f"❌ Erro ao buscar contexto no banco: {str(e)}")
             
-            # 3. ❌ CONTEXTO NÃO ENCONTRADO
+            # 4. ❌ CONTEXTO NÃO ENCONTRADO
             logger.warning(f"⚠️ Contexto da conversa não encontrado: {phone}")
             return None
             
@@ -306,39 +741,230 @@ class CustomerDataManager:
             logger.error(f"❌ Erro ao atualizar interação do cliente: {str(e)}")
             return False
     
+    def commit_conversation_turn(self, phone: str, context: ConversationContext,
+                                 interaction_data: Dict[str, Any]) -> bool:
+        """
+        💾 GRAVAR TURNO DA CONVERSA
+        
+        Contexto, eventos do turno e contadores de interação do cliente.
+        Com write-behind, turnos seguidos do mesmo telefone são juntados e
+        gravados em lote; sem ele, vão ao banco em uma única transação.
+        """
+        try:
+            # Atualizar timestamps
+            context.updated_at = datetime.now().isoformat()
+            if not context.created_at:
+                context.created_at = context.updated_at
+            
+            customer = self.get_customer_data(phone)
+            payment_promise = interaction_data.get('intent') == 'pagamento_confirmado'
+            protocolo = customer.protocolo if customer and customer.protocolo else None
+            
+            # ✅ GRAVAR NO BANCO SQL (em lote, via write-behind)
+            if self.write_buffer:
+                self.write_buffer.submit(phone, PendingTurn(
+                    context, protocolo, interactions=1, payment_promises=1 if payment_promise else 0
+                ))
+            elif self.database_available and self.db_manager:
+                try:
+                    success = self._persist_turn(
+                        PendingTurn(context, protocolo, interactions=1,
+                                    payment_promises=1 if payment_promise else 0),
+                        lambda: self.db_manager.commit_conversation_turn(
+                            context,
+                            protocolo=protocolo,
+                            payment_promise=payment_promise
+                        )
+                    )
+                    if not success:
+                        logger.warning(f"⚠️ Falha ao gravar turno da conversa no banco: {phone}")
+                except Exception as e:
+                    logger.error(f"❌ Erro ao gravar turno no banco: {str(e)}")
+            
+            # ✅ ATUALIZAR CACHE
+            self.conversation_cache[phone] = context
+            if customer:
+                customer.conversation_count += 1
+                customer.last_contact = datetime.now().isoformat()
+                customer.updated_at = customer.last_contact
+                if payment_promise:
+                    customer.payment_promises += 1
+                # Outros workers leem o cliente do L2: grava os contadores novos
+                if self.l2_cache:
+                    self.l2_cache.set(self._l2_key(phone), asdict(customer))
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar turno da conversa: {str(e)}")
+            return False
+    
+    def _flush_pending_turns(self, turns: List[PendingTurn]) -> bool:
+        """Grava um lote do buffer write-behind (uma transação no banco ou o spool)"""
+        if not self.db_manager:
+            return False
+        if self._spool_first():
+            return self._spool_turns(turns)
+        if self._commit_turns(turns):
+            return True
+        return self._circuit_not_closed() and self._spool_turns(turns)
+    
+    def _commit_turns(self, turns: List[PendingTurn]) -> bool:
+        return self.db_manager.commit_conversation_turns([
+            (turn.context, turn.protocolo, turn.interactions, turn.payment_promises)
+            for turn in turns
+        ])
+    
+    def _persist_turn(self, turn: PendingTurn, write: Callable[[], bool]) -> bool:
+        """Grava um turno sem write-behind: no banco ou, em modo degradado, no spool"""
+        if self._spool_first():
+            return self._spool_turns([turn])
+        if write():
+            return True
+        return self._circuit_not_closed() and self._spool_turns([turn])
+    
+    # ========================================
+    # MODO DEGRADADO (CIRCUITO DO BANCO ABERTO)
+    # ========================================
+    
+    def _degraded(self) -> bool:
+        """Circuito do banco aberto: leituras só do cache, escritas no spool"""
+        breaker = getattr(self.db_manager, 'breaker', None)
+        return breaker is not None and breaker.is_open
+    
+    def _circuit_not_closed(self) -> bool:
+        """
+        Circuito aberto ou em teste (half_open): no half_open só a chamada de
+        teste passa e as concorrentes são recusadas (o DatabaseManager devolve
+        False/None), então uma escrita que falhou vai para o spool
+        """
+        breaker = getattr(self.db_manager, 'breaker', None)
+        return breaker is not None and breaker.state != CLOSED
+    
+    def _spool_first(self) -> bool:
+        """
+        Escrita vai para o spool com o circuito aberto ou enquanto houver
+        escritas antigas nele (preserva a ordem até a reaplicação terminar)
+        """
+        if self._degraded():
+            return True
+        if self.spool.pending:
+            self._schedule_replay()
+            return True
+        return False
+    
+    def _spool_turns(self, turns: List[PendingTurn]) -> bool:
+        return all([
+            self.spool.append('turn', {
+                'context': asdict(turn.context),
+                'protocolo': turn.protocolo,
+                'interactions': turn.interactions,
+                'payment_promises': turn.payment_promises
+            })
+            for turn in turns
+        ])
+    
+    def _on_breaker_change(self, previous: str, state: str):
+        if state == CLOSED and self.spool.pending:
+            logger.info(f"🔁 Banco de volta: reaplicando {self.spool.pending} escritas do spool")
+            self._schedule_replay(force=True)
+    
+    def _schedule_replay(self, force: bool = False):
+        """Reaplica o spool em segundo plano (no máximo a cada SPOOL_REPLAY_INTERVAL)"""
+        with self._replay_lock:
+            if self._replay_thread is not None and self._replay_thread.is_alive():
+                return
+            if not force and time.monotonic() - self._last_replay_at < SPOOL_REPLAY_INTERVAL:
+                return
+            self._last_replay_at = time.monotonic()
+            self._replay_thread = threading.Thread(
+                target=self.replay_spool, name='write-spool-replay', daemon=True
+            )
+            self._replay_thread.start()
+    
+    def replay_spool(self) -> int:
+        """Reaplica o spool no banco até esvaziar, falhar ou o circuito abrir"""
+        total = 0
+        while self.spool.pending and not self._degraded():
+            applied = self.spool.drain(self._apply_spooled)
+            if not applied:
+                break
+            total += applied
+        return total
+    
+    def _apply_spooled(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Grava as entradas em ordem (turnos seguidos em lotes); retorna quantas
+        
+        Com o circuito aberto para e mantém o resto. Com o banco respondendo,
+        uma escrita que falha SPOOL_MAX_REPLAY_ATTEMPTS vezes é descartada
+        (como as falhas fora do modo degradado) para não travar a fila.
+        """
+        applied = 0
+        while applied < len(entries):
+            kind = entries[applied].get('kind')
+            end = applied + 1
+            try:
+                if kind == 'turn':
+                    while (end < len(entries) and entries[end].get('kind') == 'turn'
+                           and end - applied < WRITE_BEHIND_MAX_BATCH):
+                        end += 1
+                    success = self._commit_turns([
+                        self._turn_from_payload(entry['payload']) for entry in entries[applied:end]
+                    ])
+                elif kind == 'customer':
+                    customer = CustomerData(**entries[applied]['payload'])
+                    success = self.db_manager.save_customer_data(self._to_db_customer(customer))
+                else:
+                    logger.warning(f"⚠️ Escrita desconhecida no spool ignorada: {kind}")
+                    success = True
+            except Exception as e:
+                logger.error(f"❌ Erro ao reaplicar escrita {kind} do spool: {str(e)}")
+                success = False
+            
+            if not success:
+                if self._circuit_not_closed():
+                    break
+                self._head_failures += 1
+                if self._head_failures < SPOOL_MAX_REPLAY_ATTEMPTS:
+                    break
+                logger.error(
+                    f"❌ {end - applied} escritas {kind} do spool descartadas após "
+                    f"{self._head_failures} tentativas"
+                )
+            
+            self._head_failures = 0
+            applied = end
+        return applied
+    
+    def _turn_from_payload(self, payload: Dict[str, Any]) -> PendingTurn:
+        return PendingTurn(
+            context=ConversationContext(**payload['context']),
+            protocolo=payload.get('protocolo'),
+            interactions=payload.get('interactions', 0),
+            payment_promises=payload.get('payment_promises', 0)
+        )
+    
+    def flush_pending_writes(self) -> bool:
+        """Grava imediatamente as conversas pendentes no buffer"""
+        if not self.write_buffer:
+            return True
+        return self.write_buffer.flush()
+    
     def cleanup_expired_cache(self) -> int:
         """
         🧹 LIMPAR CACHE EXPIRADO
         
-        Remove itens do cache que expiraram
+        Remove itens do cache que expiraram (os vencidos também saem ao
+        serem acessados; esta limpeza só libera memória dos não acessados)
         """
         try:
+            # Em modo degradado o cache é a única fonte dos dados
+            if self._degraded():
+                return 0
+            
             now = datetime.now()
-            expired_count = 0
-            
-            # Limpar cache de clientes
-            expired_phones = []
-            for phone, customer in self.memory_cache.items():
-                if customer.updated_at:
-                    updated = datetime.fromisoformat(customer.updated_at)
-                    if now - updated > self.cache_ttl:
-                        expired_phones.append(phone)
-            
-            for phone in expired_phones:
-                del self.memory_cache[phone]
-                expired_count += 1
-            
-            # Limpar cache de conversas
-            expired_conversations = []
-            for phone, context in self.conversation_cache.items():
-                if context.updated_at:
-                    updated = datetime.fromisoformat(context.updated_at)
-                    if now - updated > self.cache_ttl:
-                        expired_conversations.append(phone)
-            
-            for phone in expired_conversations:
-                del self.conversation_cache[phone]
-                expired_count += 1
+            expired_count = self.memory_cache.purge_expired() + self.conversation_cache.purge_expired()
             
             if expired_count > 0:
                 logger.info(f"🧹 Cache limpo: {expired_count} itens expirados removidos")
@@ -361,12 +987,24 @@ class CustomerDataManager:
             if datetime.now() - self.last_cache_cleanup > timedelta(hours=1):
                 self.cleanup_expired_cache()
             
+            breaker = getattr(self.db_manager, 'breaker', None)
             return {
                 'customers_in_cache': len(self.memory_cache),
                 'conversations_in_cache': len(self.conversation_cache),
-                'cache_ttl_hours': self.cache_ttl.total_seconds() / 3600,
+                'cache_ttl_hours': CACHE_TTL_SECONDS / 3600,
+                'customer_cache': self.memory_cache.get_metrics(),
+                'negative_cache': self.negative_cache.get_metrics(),
+                'phone_filter': self.phone_filter.get_metrics() if self.phone_filter else None,
+                'lookups': dict(self.lookup_metrics),
+                'single_flight': self.single_flight.get_metrics(),
+                'conversation_cache': self.conversation_cache.get_metrics(),
                 'last_cleanup': self.last_cache_cleanup.isoformat(),
-                'database_available': self.database_available
+                'database_available': self.database_available,
+                'write_behind': self.write_buffer.get_metrics() if self.write_buffer else None,
+                'degraded_mode': self._degraded(),
+                'database_breaker': breaker.get_metrics() if breaker is not None else None,
+                'write_spool': self.spool.get_metrics(),
+                'l2_cache': self.l2_cache.get_metrics() if self.l2_cache else None
             }
             
         except Exception as e:
@@ -385,6 +1023,7 @@ class CustomerDataManager:
             
             self.memory_cache.clear()
             self.conversation_cache.clear()
+            self.negative_cache.clear()
             
             logger.info(f"🗑️ Cache limpo: {customer_count} clientes e {conversation_count} conversas removidos")
             return True
@@ -405,6 +1044,18 @@ def get_customer_data(phone: str) -> Optional[CustomerData]:
     """Buscar dados do cliente"""
     return customer_data_manager.get_customer_data(phone)
 
+def get_customers_data(phones: List[str]) -> Dict[str, CustomerData]:
+    """Buscar dados de vários clientes"""
+    return customer_data_manager.get_customers_data(phones)
+
+def warm_customer_cache(empresa: Optional[str] = None, ttl: Optional[int] = None) -> int:
+    """Aquecer o cache L2 com os clientes do banco"""
+    return customer_data_manager.warm_customer_cache(empresa, ttl)
+
+def rebuild_phone_filter() -> bool:
+    """Reconstruir o filtro de telefones dos clientes"""
+    return customer_data_manager.rebuild_phone_filter()
+
 def save_conversation_context(phone: str, context: ConversationContext) -> bool:
     """Salvar contexto da conversa"""
     return customer_data_manager.save_conversation_context(phone, context)
@@ -417,6 +1068,15 @@ def update_customer_interaction(phone: str, interaction_data: Dict[str, Any]) ->
     """Atualizar interação do cliente"""
     return customer_data_manager.update_customer_interaction(phone, interaction_data)
 
+def commit_conversation_turn(phone: str, context: ConversationContext,
+                             interaction_data: Dict[str, Any]) -> bool:
+    """Gravar turno da conversa e interação do cliente"""
+    return customer_data_manager.commit_conversation_turn(phone, context, interaction_data)
+
+def flush_pending_writes() -> bool:
+    """Gravar conversas pendentes no buffer write-behind"""
+    return customer_data_manager.flush_pending_writes()
+
 if __name__ == "__main__":
     # Teste do sistema
     print("🧪 TESTANDO CUSTOMER DATA MANAGER")
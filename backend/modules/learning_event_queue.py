@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de Eventos de Aprendizado
+Fila limitada em memória, drenada em lotes por uma thread de fundo,
+para tirar a análise de qualidade e o aprendizado do caminho da resposta
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+class LearningEventQueue:
+    """Fila limitada de eventos processados em lotes por uma thread de fundo"""
+
+    def __init__(self, handler: Callable[[List[Dict[str, Any]]], None],
+                 max_size: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 0.5, drop_policy: str = DROP_OLDEST):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política de descarte inválida: {drop_policy}")
+
+        self.handler = handler
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+
+        self._events: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._worker = None
+        self._stopping = False
+        self._shutdown_registered = False
+
+        self.metrics = {
+            'published': 0,
+            'processed': 0,
+            'dropped': 0,
+            'failed_batches': 0,
+            'batches': 0,
+            'max_depth': 0,
+            'last_lag_seconds': 0.0,
+            'max_lag_seconds': 0.0,
+            'total_lag_seconds': 0.0
+        }
+
+    def publish(self, event: Dict[str, Any]) -> bool:
+        """
+        Publica um evento sem bloquear
+
+        Retorna False se o evento foi descartado (fila cheia com política drop_newest)
+        """
+        with self._condition:
+            self._ensure_worker()
+
+            if len(self._events) >= self.max_size:
+                self.metrics['dropped'] += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._events.popleft()
+
+            self._events.append((time.monotonic(), event))
+            self.metrics['published'] += 1
+            self.metrics['max_depth'] = max(self.metrics['max_depth'], len(self._events))
+            self._condition.notify_all()
+
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Aguarda até a fila esvaziar e o lote em andamento terminar"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while self._events or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Drena a fila e encerra a thread de fundo"""
+        if self._shutdown_registered:
+            # Fila parada não fica presa ao atexit (nem o handler e seus dados)
+            atexit.unregister(self.stop)
+            self._shutdown_registered = False
+        self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas da fila: profundidade, descartes e atraso (lag)"""
+        with self._condition:
+            processed = self.metrics['processed']
+            oldest_age = time.monotonic() - self._events[0][0] if self._events else 0.0
+            return {
+                **self.metrics,
+                'depth': len(self._events),
+                'max_size': self.max_size,
+                'drop_policy': self.drop_policy,
+                'oldest_event_age_seconds': oldest_age,
+                'avg_lag_seconds': self.metrics['total_lag_seconds'] / processed if processed else 0.0
+            }
+
+    def _ensure_worker(self):
+        """Inicia a thread de fundo no primeiro evento (chamado com o lock)"""
+        if self._worker is None or not self._worker.is_alive():
+            self._stopping = False
+            self._worker = threading.Thread(target=self._run, name='learning-event-queue', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        """Loop da thread de fundo"""
+        while True:
+            with self._condition:
+                if not self._events and not self._stopping:
+                    self._condition.wait(self.flush_interval)
+                if not self._events:
+                    if self._stopping:
+                        return
+                    continue
+
+                batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                self._in_flight = len(batch)
+
+            now = time.monotonic()
+            failed = False
+            try:
+                self.handler([event for _, event in batch])
+            except Exception as e:
+                failed = True
+                logger.error(f"❌ Erro ao processar lote de aprendizado: {str(e)}")
+
+            with self._condition:
+                if failed:
+                    self.metrics['failed_batches'] += 1
+                lag = now - batch[0][0]
+                self.metrics['batches'] += 1
+                self.metrics['processed'] += len(batch)
+                self.metrics['last_lag_seconds'] = lag
+                self.metrics['max_lag_seconds'] = max(self.metrics['max_lag_seconds'], lag)
+                self.metrics['total_lag_seconds'] += sum(now - enqueued for enqueued, _ in batch)
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def register_shutdown_flush(self):
+        """Drena a fila no encerramento do processo (uma vez por fila, até o stop)"""
+        if not self._shutdown_registered:
+            atexit.register(self.stop)
+            self._shutdown_registered = True
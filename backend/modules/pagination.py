@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Utilitários de Paginação por Cursor
+Cursores opacos para paginação keyset (seek) nas listagens da API
+"""
+
+import base64
+import json
+from typing import Any, List
+
+def encode_cursor(values: List[Any]) -> str:
+    """Codifica os valores da última linha da página em um cursor opaco"""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decodifica um cursor opaco
+
+    Levanta ValueError se o cursor for inválido ou não tiver `size` valores
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor inválido: formato inesperado")
+
+    return values
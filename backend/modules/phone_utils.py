@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalização de Telefones
+Formato canônico E.164 usado como chave de busca dos clientes
+"""
+
+import re
+from typing import Optional
+
+DEFAULT_COUNTRY_CODE = '55'
+
+def normalize_phone_e164(phone: Optional[str], country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """
+    Normaliza um telefone para E.164 (ex.: '+5511999998888')
+
+    Aceita máscaras, IDs do WhatsApp ('5511999998888@c.us') e prefixo de
+    tronco ('0'). Números nacionais (10 ou 11 dígitos) recebem o código do
+    país. Retorna None se não for possível formar um número válido.
+    """
+    if not phone:
+        return None
+
+    raw = str(phone).split('@', 1)[0].strip()
+    has_plus = raw.startswith('+')
+    digits = re.sub(r'\D', '', raw)
+
+    if not has_plus:
+        digits = digits.lstrip('0')
+        if len(digits) in (10, 11):
+            digits = country_code + digits
+
+    # E.164: até 15 dígitos; abaixo de 11 não há DDI + número completo
+    if not 11 <= len(digits) <= 15:
+        return None
+
+    return '+' + digits
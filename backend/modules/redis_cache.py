@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache L2 no Redis
+Cache compartilhado entre os workers, entre o cache em memória de cada
+processo e o PostgreSQL
+"""
+
+import os
+import json
+import zlib
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from backend.modules.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+REDIS_CACHE_ENABLED = os.getenv('REDIS_CACHE_ENABLED', 'true').lower() == 'true'
+REDIS_CACHE_PREFIX = os.getenv('REDIS_CACHE_PREFIX', 'cobranca:')
+REDIS_CACHE_TTL_SECONDS = int(os.getenv('REDIS_CACHE_TTL_SECONDS', 24 * 3600))
+# Timeout curto: um Redis lento não pode atrasar mais que a ida ao banco
+REDIS_CACHE_TIMEOUT = float(os.getenv('REDIS_CACHE_TIMEOUT', 0.25))
+# Valores a partir deste tamanho são gravados comprimidos (zlib)
+REDIS_CACHE_COMPRESS_MIN_BYTES = int(os.getenv('REDIS_CACHE_COMPRESS_MIN_BYTES', 512))
+# Chaves por MGET dentro do pipeline
+REDIS_CACHE_MGET_CHUNK = int(os.getenv('REDIS_CACHE_MGET_CHUNK', 500))
+
+COMPRESSED_MARKER = b'z'
+
+def encode_value(value: Any, compress_min_bytes: int = REDIS_CACHE_COMPRESS_MIN_BYTES) -> bytes:
+    """JSON sem espaços; comprimido com zlib (prefixo `z`) quando grande"""
+    data = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    if compress_min_bytes and len(data) >= compress_min_bytes:
+        compressed = zlib.compress(data)
+        if len(compressed) + 1 < len(data):
+            return COMPRESSED_MARKER + compressed
+    return data
+
+def decode_value(data: bytes) -> Any:
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    # JSON nunca começa com `z`: o prefixo identifica o valor comprimido
+    if data[:1] == COMPRESSED_MARKER:
+        data = zlib.decompress(data[1:])
+    return json.loads(data.decode('utf-8'))
+
+class RedisCache:
+    """
+    Cache de valores JSON no Redis com TTL por chave
+
+    Falhas do Redis nunca chegam ao chamador: leituras viram miss e escritas
+    são ignoradas. Depois de falhas seguidas um circuit breaker suspende as
+    chamadas por alguns segundos, para não pagar o timeout a cada consulta.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = REDIS_CACHE_PREFIX,
+                 default_ttl: int = REDIS_CACHE_TTL_SECONDS, timeout: float = REDIS_CACHE_TIMEOUT,
+                 mget_chunk: int = REDIS_CACHE_MGET_CHUNK):
+        self.url = url
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.mget_chunk = max(1, mget_chunk)
+        self._client = client
+        self.breaker = CircuitBreaker('redis-cache', failure_threshold=3, slow_call_seconds=0,
+                                      reset_timeout=15.0)
+
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'deletes': 0,
+            'errors': 0,
+            'skipped': 0,
+            'round_trips': 0
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(
+                self.url,
+                socket_timeout=self.timeout,
+                socket_connect_timeout=self.timeout
+            )
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _run(self, operation: str, fn: Callable[[], Any], default: Any) -> Any:
+        """Executa no Redis pelo circuit breaker; `default` em falha ou circuito aberto"""
+        if not self.breaker.allow_request():
+            self.metrics['skipped'] += 1
+            return default
+        try:
+            result = fn()
+        except Exception as e:
+            self.breaker.record_failure()
+            self.metrics['errors'] += 1
+            logger.warning(f"⚠️ Redis indisponível ({operation}): {str(e)}")
+            return default
+        self.breaker.record_success()
+        self.metrics['round_trips'] += 1
+        return result
+
+    def _decode(self, key: str, data: Optional[bytes]) -> Optional[Any]:
+        if data is None:
+            self.metrics['misses'] += 1
+            return None
+        try:
+            value = decode_value(data)
+        except (ValueError, zlib.error) as e:
+            logger.warning(f"⚠️ Valor inválido no cache Redis ({key}): {str(e)}")
+            self.metrics['misses'] += 1
+            return None
+        self.metrics['hits'] += 1
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor da chave ou None (ausente, inválido ou Redis indisponível)"""
+        data = self._run('get', lambda: self.client.get(self._key(key)), None)
+        return self._decode(key, data)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Valores encontrados, em uma única ida ao Redis (MGETs em pipeline)"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        def fetch():
+            pipeline = self.client.pipeline(transaction=False)
+            for start in range(0, len(keys), self.mget_chunk):
+                pipeline.mget([self._key(key) for key in keys[start:start + self.mget_chunk]])
+            return [data for chunk in pipeline.execute() for data in chunk]
+
+        values = self._run('get_many', fetch, None)
+        if values is None:
+            self.metrics['misses'] += len(keys)
+            return {}
+
+        found = {}
+        for key, data in zip(keys, values):
+            value = self._decode(key, data)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Grava a chave com TTL (padrão default_ttl segundos)"""
+        data = encode_value(value)
+        ttl = ttl or self.default_ttl
+        success = self._run('set', lambda: self.client.set(self._key(key), data, ex=ttl), False)
+        if success:
+            self.metrics['sets'] += 1
+        return bool(success)
+
+    def set_many(self, items: Iterable[Tuple[str, Any]], ttl: Optional[int] = None) -> int:
+        """Grava vários pares (chave, valor) em um pipeline; retorna quantos"""
+        ttl = ttl or self.default_ttl
+        encoded = [(self._key(key), encode_value(value)) for key, value in items]
+        if not encoded:
+            return 0
+
+        def store():
+            pipeline = self.client.pipeline(transaction=False)
+            for key, data in encoded:
+                pipeline.set(key, data, ex=ttl)
+            pipeline.execute()
+            return len(encoded)
+
+        stored = self._run('set_many', store, 0)
+        self.metrics['sets'] += stored
+        return stored
+
+    def delete(self, *keys: str) -> int:
+        """Remove as chaves; retorna quantas existiam"""
+        if not keys:
+            return 0
+        removed = self._run('delete', lambda: self.client.delete(*[self._key(key) for key in keys]), 0)
+        self.metrics['deletes'] += removed or 0
+        return removed or 0
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove as chaves que começam com `prefix` (SCAN em lotes, sem KEYS); retorna quantas"""
+        def remove():
+            removed = 0
+            batch = []
+            for key in self.client.scan_iter(match=f"{self._key(prefix)}*", count=self.mget_chunk):
+                batch.append(key)
+                if len(batch) >= self.mget_chunk:
+                    removed += self.client.delete(*batch)
+                    batch = []
+            if batch:
+                removed += self.client.delete(*batch)
+            return removed
+
+        removed = self._run('delete_prefix', remove, 0)
+        self.metrics['deletes'] += removed or 0
+        return removed or 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.metrics['hits'] + self.metrics['misses']
+        return {
+            **self.metrics,
+            'hit_rate': round(self.metrics['hits'] / lookups, 4) if lookups else 0.0,
+            'default_ttl_seconds': self.default_ttl,
+            'state': self.breaker.state
+        }
+
+def create_redis_cache(url: Optional[str] = None) -> Optional[RedisCache]:
+    """Cache L2 configurado por REDIS_URL (None se desabilitado ou sem URL)"""
+    url = url or os.getenv('REDIS_URL')
+    if not REDIS_CACHE_ENABLED or not url:
+        return None
+
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        logger.warning("⚠️ redis não instalado - cache L2 desabilitado (pip install redis)")
+        return None
+
+    logger.info("🧊 Cache L2 no Redis habilitado")
+    return RedisCache(url)
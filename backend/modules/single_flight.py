@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single-flight
+Junta chamadas simultâneas com a mesma chave em uma única execução: a
+primeira executa, as demais aguardam e recebem o mesmo resultado
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class _Call:
+    """Execução em andamento de uma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Coalescência entre threads
+
+    Chamadas com a mesma chave durante uma execução esperam por ela e
+    recebem o mesmo resultado (ou a mesma exceção). Nada fica guardado
+    depois que a execução termina: não é um cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.metrics = {
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.metrics['executions'] += 1
+            else:
+                self.metrics['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, 'in_flight': len(self._calls)}
+
+class AsyncSingleFlight:
+    """
+    Coalescência entre corrotinas do mesmo event loop
+
+    A execução roda em uma task compartilhada; quem espera usa
+    asyncio.shield, então cancelar um dos chamadores não cancela a busca
+    dos demais.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.metrics = {
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks de outro event loop não podem ser aguardadas aqui
+            self._loop = loop
+            self._calls = {}
+
+        task = self._calls.get(key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+            self.metrics['executions'] += 1
+        else:
+            self.metrics['coalesced'] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marca a exceção como lida mesmo se todos os chamadores foram cancelados
+        if not task.cancelled():
+            task.exception()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, 'in_flight': len(self._calls)}
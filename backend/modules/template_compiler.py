@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compilador de Templates de Mensagem
+Analisa os templates uma única vez e mantém um cache dos textos renderizados
+"""
+
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, List, Any, Optional, Tuple
+
+# Parte compilada: (texto literal, slot, conversão, formato, valor padrão)
+TemplatePart = Tuple[str, Optional[str], Optional[str], str, str]
+
+class CompiledTemplate:
+    """Template pré-analisado que conhece seus slots de variáveis"""
+
+    def __init__(self, template_id: str, source: str, defaults: Optional[Dict[str, Any]] = None):
+        self.template_id = template_id
+        self.source = source
+        self.parts: List[TemplatePart] = []
+
+        defaults = defaults or {}
+        slots = []
+
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            if field_name is None:
+                self.parts.append((literal, None, None, '', ''))
+                continue
+
+            # Variável ausente é resolvida aqui: usa o padrão ou mantém o placeholder original
+            if field_name in defaults:
+                fallback = str(defaults[field_name])
+            else:
+                fallback = self._placeholder(field_name, conversion, format_spec)
+
+            self.parts.append((literal, field_name, conversion, format_spec or '', fallback))
+            if field_name not in slots:
+                slots.append(field_name)
+
+        self.slots: Tuple[str, ...] = tuple(slots)
+
+    @staticmethod
+    def _placeholder(field_name: str, conversion: Optional[str], format_spec: Optional[str]) -> str:
+        """Reconstrói o placeholder original para slots sem valor"""
+        placeholder = field_name
+        if conversion:
+            placeholder += '!' + conversion
+        if format_spec:
+            placeholder += ':' + format_spec
+        return '{' + placeholder + '}'
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        """Renderiza o template; slots sem valor usam o fallback compilado"""
+        chunks = []
+        for literal, slot, conversion, format_spec, fallback in self.parts:
+            chunks.append(literal)
+            if slot is None:
+                continue
+
+            if slot not in variables:
+                chunks.append(fallback)
+                continue
+
+            value = variables[slot]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            elif conversion == 's':
+                value = str(value)
+
+            chunks.append(format(value, format_spec) if format_spec else str(value))
+
+        return ''.join(chunks)
+
+class TemplateRenderer:
+    """Registro de templates compilados com cache LRU de textos renderizados"""
+
+    def __init__(self, cache_size: int = 256):
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'renders': 0,
+            'cache_hits': 0,
+            'cache_misses': 0
+        }
+
+    def register(self, template_id: str, source: str,
+                 defaults: Optional[Dict[str, Any]] = None) -> CompiledTemplate:
+        """Compila e registra um template (substitui versão anterior)"""
+        compiled = CompiledTemplate(template_id, source, defaults)
+
+        with self._lock:
+            self.templates[template_id] = compiled
+            # Remove renderizações antigas deste template
+            for key in [key for key in self._cache if key[0] == template_id]:
+                del self._cache[key]
+
+        return compiled
+
+    def get(self, template_id: str) -> Optional[CompiledTemplate]:
+        """Obter template compilado por ID"""
+        return self.templates.get(template_id)
+
+    def render(self, template_id: str, variables: Dict[str, Any]) -> Optional[str]:
+        """Renderiza um template registrado usando o cache quando possível"""
+        compiled = self.templates.get(template_id)
+        if compiled is None:
+            return None
+
+        self.stats['renders'] += 1
+
+        try:
+            # Tipo entra na chave: 1, 1.0 e True são iguais mas renderizam diferente
+            key = (template_id,) + tuple(
+                (type(variables[slot]), variables[slot]) if slot in variables else None
+                for slot in compiled.slots
+            )
+            hash(key)
+        except TypeError:
+            # Valores não hasheáveis não entram no cache
+            self.stats['cache_misses'] += 1
+            return compiled.render(variables)
+
+        with self._lock:
+            rendered = self._cache.get(key)
+            if rendered is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return rendered
+
+        rendered = compiled.render(variables)
+
+        with self._lock:
+            self.stats['cache_misses'] += 1
+            self._cache[key] = rendered
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return rendered
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do renderizador"""
+        return {
+            **self.stats,
+            'templates': len(self.templates),
+            'cached_renders': len(self._cache),
+            'cache_size': self.cache_size
+        }
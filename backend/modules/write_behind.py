@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Buffer Write-Behind com Coalescência por Chave
+Acumula escritas em memória, junta as da mesma chave e grava em lotes
+a cada intervalo ou quando o lote enche
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindBuffer:
+    """
+    Buffer limitado de escritas pendentes, uma entrada por chave
+
+    `merge(pendente, nova)` junta duas escritas da mesma chave; `flush(lote)`
+    grava a lista de entradas e retorna True em caso de sucesso. Lotes que
+    falham voltam para o buffer e são tentados de novo no próximo ciclo.
+
+    O buffer nunca passa de `max_pending` chaves: cheio, quem escreve grava
+    o lote; se a gravação falhar (ou outra já estiver em andamento), a nova
+    escrita vai para `overflow(entradas)` ou, sem ele, é descartada.
+    """
+
+    def __init__(self, flush: Callable[[List[Any]], bool], merge: Callable[[Any, Any], Any],
+                 flush_interval: float = 0.2, max_batch: int = 500, max_pending: int = 10000,
+                 name: str = 'write-behind', overflow: Optional[Callable[[List[Any]], bool]] = None):
+        if max_batch < 1 or max_pending < max_batch:
+            raise ValueError("max_batch deve ser >= 1 e <= max_pending")
+
+        self._flush_fn = flush
+        self._merge = merge
+        self._overflow = overflow
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.name = name
+
+        self._pending: Dict[Hashable, Any] = {}
+        self._first_pending_at = 0.0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._last_failure_at = float('-inf')
+
+        self.metrics = {
+            'submitted': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'flushed_entries': 0,
+            'failed_flushes': 0,
+            'backpressure_flushes': 0,
+            'overflowed': 0,
+            'dropped': 0,
+            'total_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'last_flush_seconds': 0.0
+        }
+
+    def submit(self, key: Hashable, entry: Any):
+        """Enfileira uma escrita (juntando com a pendente da mesma chave)"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"{self.name}: buffer fechado")
+
+            self.metrics['submitted'] += 1
+            if key in self._pending:
+                self._pending[key] = self._merge(self._pending[key], entry)
+                self.metrics['coalesced'] += 1
+                return
+
+            if len(self._pending) < self.max_pending:
+                self._add(key, entry)
+                self._start_thread()
+                return
+            # Após uma falha recente não repetir a ida ao banco a cada escrita
+            backpressure = time.monotonic() - self._last_failure_at >= self.flush_interval
+            if backpressure:
+                self.metrics['backpressure_flushes'] += 1
+
+        # Buffer cheio: quem escreve grava o lote (contrapressão)
+        if backpressure:
+            self.flush(blocking=False)
+        with self._condition:
+            if key in self._pending:
+                self._pending[key] = self._merge(self._pending[key], entry)
+                return
+            if len(self._pending) < self.max_pending:
+                self._add(key, entry)
+                self._start_thread()
+                return
+
+        # Continua cheio (gravação falhando ou em andamento): não passar do limite
+        self._overflow_entries([entry])
+
+    def _overflow_entries(self, entries: List[Any]):
+        try:
+            handled = self._overflow is not None and self._overflow(entries)
+        except Exception as e:
+            logger.error(f"❌ {self.name}: erro ao desviar escritas do buffer cheio: {str(e)}")
+            handled = False
+
+        with self._condition:
+            self.metrics['overflowed' if handled else 'dropped'] += len(entries)
+        if not handled:
+            logger.error(
+                f"❌ {self.name}: buffer cheio ({self.max_pending}) e gravação falhando: "
+                f"{len(entries)} escritas descartadas"
+            )
+
+    def _add(self, key: Hashable, entry: Any):
+        first = not self._pending
+        if first:
+            self._first_pending_at = time.monotonic()
+        self._pending[key] = entry
+        if first or len(self._pending) >= self.max_batch:
+            self._condition.notify()
+
+    def _start_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Laço da thread de gravação: lote cheio ou intervalo vencido"""
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._pending:
+                        remaining = self._first_pending_at + self.flush_interval - time.monotonic()
+                        if len(self._pending) >= self.max_batch or remaining <= 0:
+                            break
+                    else:
+                        remaining = None
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self, blocking: bool = True) -> bool:
+        """
+        Grava as escritas pendentes em lotes de até max_batch entradas
+
+        Com `blocking=False` retorna False sem esperar se outra gravação
+        estiver em andamento.
+        """
+        if not self._flush_lock.acquire(blocking=blocking):
+            return False
+        try:
+            with self._condition:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return True
+
+            entries = list(batch.items())
+            for start in range(0, len(entries), self.max_batch):
+                chunk = entries[start:start + self.max_batch]
+                if not self._flush_chunk(chunk):
+                    self._requeue(entries[start:])
+                    return False
+            return True
+        finally:
+            self._flush_lock.release()
+
+    def _flush_chunk(self, chunk: List[tuple]) -> bool:
+        started = time.monotonic()
+        try:
+            success = self._flush_fn([entry for _, entry in chunk])
+        except Exception as e:
+            logger.error(f"❌ {self.name}: erro ao gravar lote: {str(e)}")
+            success = False
+        elapsed = time.monotonic() - started
+
+        with self._condition:
+            self.metrics['last_flush_seconds'] = elapsed
+            self.metrics['max_flush_seconds'] = max(self.metrics['max_flush_seconds'], elapsed)
+            if success:
+                self.metrics['flushes'] += 1
+                self.metrics['flushed_entries'] += len(chunk)
+                self.metrics['total_flush_seconds'] += elapsed
+            else:
+                self.metrics['failed_flushes'] += 1
+                self._last_failure_at = time.monotonic()
+        return success
+
+    def _requeue(self, entries: List[tuple]):
+        """Devolve um lote que falhou, antes das escritas que chegaram depois"""
+        overflow = []
+        with self._condition:
+            newer = self._pending
+            self._pending = dict(entries)
+            for key, entry in newer.items():
+                if key in self._pending:
+                    self._pending[key] = self._merge(self._pending[key], entry)
+                elif len(self._pending) < self.max_pending:
+                    self._pending[key] = entry
+                else:
+                    # Chegaram durante a gravação e não cabem mais
+                    overflow.append(entry)
+            self._first_pending_at = time.monotonic()
+        logger.warning(f"⚠️ {self.name}: {len(entries)} escritas mantidas para nova tentativa")
+        if overflow:
+            self._overflow_entries(overflow)
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """Para a thread e grava o que estiver pendente (chamar no desligamento)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        success = self.flush()
+        if not success:
+            logger.error(f"❌ {self.name}: {self.pending} escritas não gravadas no desligamento")
+        return success
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas: latência dos lotes e taxa de coalescência"""
+        with self._condition:
+            flushes = self.metrics['flushes']
+            submitted = self.metrics['submitted']
+            return {
+                **self.metrics,
+                'pending': len(self._pending),
+                'avg_flush_seconds': self.metrics['total_flush_seconds'] / flushes if flushes else 0.0,
+                # Fração das escritas absorvidas por outra da mesma chave
+                'coalescing_ratio': self.metrics['coalesced'] / submitted if submitted else 0.0
+            }
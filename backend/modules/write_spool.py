@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spool Local de Escritas
+Guarda em disco (JSON por linha) as escritas feitas com o banco fora do ar
+e as reaplica em ordem quando ele volta
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class WriteSpool:
+    """
+    Fila de escritas em arquivo, aplicada na ordem de chegada
+
+    `drain(apply)` entrega as entradas pendentes a `apply`, que retorna
+    quantas (do início) foram gravadas; o resto volta para a frente da fila.
+    Durante o drain as entradas ficam em `<path>.replay`: se o processo cair,
+    são reaplicadas no próximo drain (entrega ao menos uma vez).
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.replay_path = f"{path}.replay"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._pending = len(self._read(self.replay_path)) + len(self._read(self.path))
+
+        self.metrics = {
+            'spooled': 0,
+            'replayed': 0,
+            'rejected': 0,
+            'replay_failures': 0
+        }
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def append(self, kind: str, payload: Dict[str, Any]) -> bool:
+        """Acrescenta uma escrita; False se o spool estiver cheio ou o disco falhar"""
+        line = json.dumps({'kind': kind, 'payload': payload}, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._pending >= self.max_entries:
+                self.metrics['rejected'] += 1
+                logger.error(f"❌ Spool cheio ({self.max_entries} escritas): escrita {kind} descartada")
+                return False
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+                    f.flush()
+            except OSError as e:
+                self.metrics['rejected'] += 1
+                logger.error(f"❌ Erro ao gravar no spool: {str(e)}")
+                return False
+            self._pending += 1
+            self.metrics['spooled'] += 1
+            return True
+
+    def drain(self, apply: Callable[[List[Dict[str, Any]]], int]) -> int:
+        """Reaplica as escritas pendentes; retorna quantas foram gravadas"""
+        if not self._drain_lock.acquire(blocking=False):
+            return 0  # Outro drain em andamento
+
+        try:
+            with self._lock:
+                if not os.path.exists(self.replay_path) and os.path.exists(self.path):
+                    os.replace(self.path, self.replay_path)
+                entries = self._read(self.replay_path)
+            if not entries:
+                return 0
+
+            try:
+                applied = max(0, min(apply(entries), len(entries)))
+            except Exception as e:
+                logger.error(f"❌ Erro ao reaplicar o spool: {str(e)}")
+                applied = 0
+
+            with self._lock:
+                remaining = entries[applied:]
+                newer = self._read(self.path)
+                if remaining:
+                    # Não aplicadas voltam antes das que chegaram durante o drain
+                    self._write(self.path, remaining + newer)
+                    self.metrics['replay_failures'] += 1
+                os.remove(self.replay_path)
+                self._pending = len(remaining) + len(newer)
+                self.metrics['replayed'] += applied
+
+            if applied:
+                logger.info(f"📤 Spool: {applied} escritas reaplicadas, {len(remaining)} pendentes")
+            return applied
+
+        finally:
+            self._drain_lock.release()
+
+    def _read(self, path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Linha truncada (queda no meio da gravação)
+                    logger.warning(f"⚠️ Linha inválida ignorada no spool: {line[:80]}")
+        return entries
+
+    def _write(self, path: str, entries: List[Dict[str, Any]]):
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        os.replace(temporary, path)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, 'pending': self._pending}
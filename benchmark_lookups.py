@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark das consultas quentes do DatabaseManager
+Compara SQL enviado como texto (RealDictCursor) com consultas preparadas
+(EXECUTE + tuplas) usando o mesmo pool de conexões
+
+Uso: DATABASE_URL=postgresql://... python benchmark_lookups.py [consultas por cenário]
+Rodar contra um banco com clientes e conversas reais (réplica ou cópia de
+produção); banco vazio ou local não reproduz a latência de rede
+"""
+
+import sys
+import time
+import statistics
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+sys.path.append(str(Path(__file__).parent))
+
+from backend.database.database_manager import (
+    db_manager, CUSTOMER_SELECT, CONVERSATION_SELECT, CONVERSATION_HISTORY_LIMIT
+)
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+def measure(label, lookup, keys):
+    """Executa a consulta para cada chave e imprime latências (ms)"""
+    timings = []
+    for key in keys:
+        started = time.perf_counter()
+        lookup(key)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<40} média {statistics.mean(timings):7.3f} ms | "
+          f"p50 {statistics.median(timings):7.3f} ms | p95 {p95:7.3f} ms")
+
+def text_customer_lookup(protocolo):
+    """Antes: SQL em texto e linha como dict"""
+    with db_manager._cursor() as cursor:
+        cursor.execute(f"SELECT {CUSTOMER_SELECT} FROM customers WHERE protocolo = %s", (protocolo,))
+        return cursor.fetchone()
+
+def text_context_lookup(phone):
+    """Antes: contexto + eventos em SQL de texto"""
+    with db_manager._cursor() as cursor:
+        cursor.execute(f"SELECT {CONVERSATION_SELECT} FROM conversations WHERE phone = %s", (phone,))
+        cursor.fetchone()
+        cursor.execute("""
+            SELECT event_timestamp, customer_message, bot_response, intent, urgency_level, message_type
+            FROM conversation_events WHERE phone = %s ORDER BY event_timestamp DESC LIMIT %s
+        """, (phone, CONVERSATION_HISTORY_LIMIT))
+        return cursor.fetchall()
+
+def main():
+    """Função principal"""
+    print("⏱️ BENCHMARK DE CONSULTAS QUENTES")
+    print("=" * 50)
+
+    if not db_manager.connected:
+        print("❌ Banco não conectado")
+        return
+
+    with db_manager._cursor(positional=True) as cursor:
+        cursor.execute("SELECT protocolo FROM customers ORDER BY random() LIMIT 100")
+        protocolos = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT phone FROM conversations ORDER BY random() LIMIT 100")
+        phones = [row[0] for row in cursor.fetchall()]
+
+    if not protocolos or not phones:
+        print("❌ Banco sem clientes ou conversas para medir")
+        return
+
+    customer_keys = [protocolos[i % len(protocolos)] for i in range(ITERATIONS)]
+    phone_keys = [phones[i % len(phones)] for i in range(ITERATIONS)]
+
+    print(f"🔁 {ITERATIONS} consultas por cenário\n")
+    measure("cliente por protocolo (texto)", text_customer_lookup, customer_keys)
+    measure("cliente por protocolo (preparada)", db_manager.get_customer_by_protocolo, customer_keys)
+    measure("contexto da conversa (texto)", text_context_lookup, phone_keys)
+    measure("contexto da conversa (preparada)", db_manager.get_conversation_context, phone_keys)
+
+    db_manager.close()
+
+if __name__ == "__main__":
+    main()
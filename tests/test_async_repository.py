@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o repositório assíncrono (partes que não dependem de conexão)
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from backend.database import async_repository as module
+from backend.database.async_repository import (
+    AsyncRepository, _event_arrays, _encode_temporal, _decode_temporal
+)
+
+class TestAsyncRepositoryHelpers:
+    """Testes para conversões de parâmetros"""
+
+    @pytest.mark.unit
+    def test_temporal_codecs(self):
+        """Testa datas em texto no mesmo formato do DatabaseManager"""
+        assert _encode_temporal(datetime(2024, 1, 2, 3, 4, 5)) == '2024-01-02T03:04:05'
+        assert _encode_temporal('2024-01-02') == '2024-01-02'
+        assert _decode_temporal('2024-01-02 03:04:05.5') == '2024-01-02T03:04:05.5'
+
+    @pytest.mark.unit
+    def test_event_arrays_by_column(self):
+        """Testa turnos convertidos em arrays por coluna para o unnest"""
+        events = [
+            {'timestamp': datetime(2024, 1, 1, 10, 0), 'customer_message': 'oi', 'urgency_level': 1},
+            {'customer_message': 'tchau', 'message_type': 'farewell'}
+        ]
+
+        timestamps, messages, responses, intents, urgency, types = _event_arrays(events)
+
+        assert timestamps[0] == '2024-01-01T10:00:00'
+        assert timestamps[1]
+        assert messages == ['oi', 'tchau']
+        assert responses == [None, None]
+        assert urgency == [1.0, None]
+        assert types == ['conversation', 'farewell']
+
+class TestAsyncRepositoryUnavailable:
+    """Testes sem asyncpg instalado"""
+
+    @pytest.mark.unit
+    def test_methods_degrade_without_asyncpg(self, monkeypatch):
+        """Testa retornos vazios sem driver assíncrono"""
+        monkeypatch.setattr(module, 'ASYNCPG_AVAILABLE', False)
+        repository = AsyncRepository(dsn='postgresql://invalido')
+
+        async def run():
+            return (
+                await repository.get_customer_by_phone('5511999998888'),
+                await repository.get_customers_page(10),
+                await repository.append_conversation_events('5511999998888', [{'customer_message': 'oi'}])
+            )
+
+        assert asyncio.run(run()) == (None, ([], None), False)
+        assert not repository.connected
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o filtro de Bloom
+"""
+
+import pytest
+
+from backend.modules.bloom_filter import BloomFilter
+
+class TestBloomFilter:
+    """Testes para pertinência e dimensionamento do filtro"""
+
+    @pytest.mark.unit
+    def test_no_false_negatives(self):
+        """Testa que todo item adicionado é encontrado"""
+        phones = [f"+55119{i:08d}" for i in range(5000)]
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        bloom.update(phones)
+
+        assert all(phone in bloom for phone in phones)
+        assert len(bloom) == 5000
+
+    @pytest.mark.unit
+    def test_false_positive_rate_close_to_target(self):
+        """Testa a taxa de falso positivo com o filtro na capacidade"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        bloom.update(f"+55119{i:08d}" for i in range(5000))
+
+        false_positives = sum(f"+55219{i:08d}" in bloom for i in range(10000))
+
+        assert false_positives / 10000 < 0.02
+        assert bloom.get_metrics()['expected_false_positive_rate'] == pytest.approx(0.01, abs=0.002)
+
+    @pytest.mark.unit
+    def test_invalid_parameters(self):
+        """Testa validação de capacidade e taxa"""
+        with pytest.raises(ValueError):
+            BloomFilter(capacity=0)
+        with pytest.raises(ValueError):
+            BloomFilter(capacity=10, error_rate=1.5)
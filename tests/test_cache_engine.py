@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o cache LRU com expiração
+"""
+
+import pytest
+
+from backend.modules.cache_engine import LRUTTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestLRUTTLCache:
+    """Testes para limite, expiração e contadores do cache"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.clock = FakeClock()
+        self.cache = LRUTTLCache(max_entries=2, ttl=10, clock=self.clock)
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used(self):
+        """Testa que o item menos usado sai quando o cache enche"""
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        assert self.cache.get('a') == 1  # 'a' passa a ser o mais recente
+        self.cache['c'] = 3
+
+        assert 'b' not in self.cache
+        assert self.cache['a'] == 1 and self.cache['c'] == 3
+        assert self.cache.get_metrics()['evictions'] == 1
+
+    @pytest.mark.unit
+    def test_lazy_expiry_on_access(self):
+        """Testa que o item vencido é removido ao ser acessado"""
+        self.cache['a'] = 1
+        self.clock.now = 10
+
+        assert self.cache.get('a', allow_stale=True) == 1
+        assert self.cache.get('a') is None
+        assert len(self.cache) == 0
+
+        metrics = self.cache.get_metrics()
+        assert metrics['expirations'] == 1
+        assert metrics['hits'] == 1 and metrics['misses'] == 1
+
+    @pytest.mark.unit
+    def test_put_renews_expiry_and_purge(self):
+        """Testa renovação na gravação e limpeza só dos vencidos"""
+        self.cache['a'] = 1
+        self.clock.now = 5
+        self.cache['b'] = 2
+        self.clock.now = 8
+        self.cache['a'] = 10
+        self.clock.now = 16
+
+        assert self.cache.purge_expired() == 1
+        assert self.cache['a'] == 10
+        assert 'b' not in self.cache
+
+    @pytest.mark.unit
+    def test_missing_key_raises(self):
+        """Testa KeyError e pop de chave ausente"""
+        with pytest.raises(KeyError):
+            self.cache['x']
+        assert self.cache.pop('x') is None
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o circuit breaker e o spool local de escritas
+"""
+
+import pytest
+
+from backend.modules.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+)
+from backend.modules.write_spool import WriteSpool
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker:
+    """Testes para as transições de estado do circuito"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('teste', failure_threshold=3, slow_call_seconds=1.0,
+                                      reset_timeout=10.0, clock=self.clock)
+        self.transitions = []
+        self.breaker.listeners.append(lambda previous, state: self.transitions.append((previous, state)))
+
+    @pytest.mark.unit
+    def test_opens_after_consecutive_failures(self):
+        """Testa abertura após falhas seguidas e recusa imediata"""
+        self.breaker.record_failure()
+        self.breaker.record_success(0.1)
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        assert self.breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            self.breaker.call(lambda: 'não chamado')
+        assert self.breaker.get_metrics()['rejected'] == 1
+        assert self.transitions == [(CLOSED, OPEN)]
+
+    @pytest.mark.unit
+    def test_slow_calls_count_as_failures(self):
+        """Testa abertura por latência acima do limite"""
+        for _ in range(3):
+            self.breaker.record_success(2.5)
+
+        assert self.breaker.is_open
+        assert self.breaker.get_metrics()['slow_calls'] == 3
+
+    @pytest.mark.unit
+    def test_half_open_allows_one_trial(self):
+        """Testa tentativa única após o intervalo e fechamento no sucesso"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10.0
+
+        assert self.breaker.state == HALF_OPEN
+        assert self.breaker.allow_request() is True
+        assert self.breaker.allow_request() is False
+
+        self.breaker.record_success(0.1)
+
+        assert self.breaker.state == CLOSED
+        assert self.transitions[-1] == (HALF_OPEN, CLOSED)
+
+    @pytest.mark.unit
+    def test_failed_trial_reopens(self):
+        """Testa reabertura quando a tentativa falha"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10.0
+
+        with pytest.raises(RuntimeError):
+            self.breaker.call(self._fail)
+
+        assert self.breaker.state == OPEN
+        self.clock.now = 15.0
+        assert self.breaker.is_open
+
+    @pytest.mark.unit
+    def test_release_returns_trial_without_outcome(self):
+        """Testa que a passagem devolvida não fecha nem reabre o circuito"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10.0
+        assert self.breaker.allow_request() is True
+
+        self.breaker.release()
+
+        assert self.breaker.state == HALF_OPEN
+        assert self.breaker.allow_request() is True
+
+    @staticmethod
+    def _fail():
+        raise RuntimeError('banco fora do ar')
+
+class TestWriteSpool:
+    """Testes para o spool de escritas em disco"""
+
+    @pytest.mark.unit
+    def test_drain_in_order_and_keep_failed_tail(self, tmp_path):
+        """Testa reaplicação parcial: o que falhou volta antes das novas"""
+        spool = WriteSpool(str(tmp_path / 'spool.jsonl'))
+        for index in range(3):
+            spool.append('turn', {'index': index})
+
+        def apply(entries):
+            spool.append('turn', {'index': 3})  # chega durante o drain
+            return 1
+
+        assert spool.drain(apply) == 1
+        assert spool.pending == 3
+
+        seen = []
+        spool.drain(lambda entries: seen.extend(e['payload']['index'] for e in entries) or len(entries))
+
+        assert seen == [1, 2, 3]
+        assert spool.pending == 0
+
+    @pytest.mark.unit
+    def test_pending_survives_restart(self, tmp_path):
+        """Testa que as escritas continuam no disco para a próxima execução"""
+        path = str(tmp_path / 'spool.jsonl')
+        WriteSpool(path).append('customer', {'phone': '11999999999'})
+
+        assert WriteSpool(path).pending == 1
+
+    @pytest.mark.unit
+    def test_full_spool_rejects(self, tmp_path):
+        """Testa o limite de escritas pendentes"""
+        spool = WriteSpool(str(tmp_path / 'spool.jsonl'), max_entries=1)
+
+        assert spool.append('turn', {}) is True
+        assert spool.append('turn', {}) is False
+        assert spool.get_metrics()['rejected'] == 1
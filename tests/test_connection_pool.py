@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o pool de conexões
+"""
+
+import threading
+
+import pytest
+
+from backend.database.connection_pool import ConnectionPool, PoolError, PoolTimeout
+
+class FakeCursor:
+    """Cursor falso para a verificação de saúde"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise RuntimeError('conexão perdida')
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """Conexão falsa com a interface usada pelo pool"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise RuntimeError('conexão perdida')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+class TestConnectionPool:
+    """Testes para checkout, saúde, reconexão e métricas"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.created = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+    @pytest.mark.unit
+    def test_min_size_opened_on_start(self):
+        """Testa abertura das conexões mínimas"""
+        pool = ConnectionPool(self.connect, min_size=2, max_size=4)
+
+        metrics = pool.get_metrics()
+        assert metrics['size'] == 2
+        assert metrics['idle'] == 2
+
+    @pytest.mark.unit
+    def test_connection_reused(self):
+        """Testa devolução e reaproveitamento da conexão"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert len(self.created) == 1
+        assert pool.get_metrics()['checkouts'] == 2
+
+    @pytest.mark.unit
+    def test_checkout_timeout_when_saturated(self):
+        """Testa tempo limite com todas as conexões em uso"""
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1)
+        conn = pool.getconn()
+
+        with pytest.raises(PoolTimeout):
+            pool.getconn(timeout=0.05)
+
+        metrics = pool.get_metrics()
+        assert metrics['saturation'] == 1.0
+        assert metrics['timeouts'] == 1
+        pool.putconn(conn)
+
+    @pytest.mark.unit
+    def test_waiting_checkout_gets_returned_connection(self):
+        """Testa checkout bloqueado liberado por uma devolução"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=1)
+        conn = pool.getconn()
+        result = []
+
+        waiter = threading.Thread(target=lambda: result.append(pool.getconn(timeout=5)))
+        waiter.start()
+        pool.putconn(conn)
+        waiter.join(5)
+
+        assert result == [conn]
+        metrics = pool.get_metrics()
+        assert metrics['waited_checkouts'] == 1
+        assert metrics['max_wait_seconds'] > 0
+
+    @pytest.mark.unit
+    def test_broken_connection_discarded(self):
+        """Testa descarte de conexão quebrada durante uma operação"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2)
+
+        with pytest.raises(RuntimeError):
+            with pool.connection() as conn:
+                conn.broken = True
+                raise RuntimeError('falha na query')
+
+        assert conn.closed
+        assert pool.get_metrics()['size'] == 0
+
+        with pool.connection() as fresh:
+            assert fresh is not conn
+
+    @pytest.mark.unit
+    def test_failed_health_check_replaces_connection(self):
+        """Testa verificação de saúde de conexão ociosa"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2, health_check_interval=0)
+        stale = self.created[0]
+        stale.broken = True
+
+        conn = pool.getconn()
+
+        assert conn is not stale
+        assert pool.get_metrics()['health_check_failures'] == 1
+        pool.putconn(conn)
+
+    @pytest.mark.unit
+    def test_reconnect_backoff(self):
+        """Testa backoff após falha de conexão"""
+        attempts = []
+
+        def failing_connect():
+            attempts.append(1)
+            raise RuntimeError('banco fora do ar')
+
+        pool = ConnectionPool(failing_connect, min_size=1, max_size=2, initial_backoff=60)
+
+        assert not pool.available
+        with pytest.raises(PoolError):
+            pool.getconn()
+
+        # Durante o backoff não há nova tentativa de conexão
+        assert len(attempts) == 1
+        assert pool.get_metrics()['backoff_seconds'] > 0
+
+    @pytest.mark.unit
+    def test_on_connect_runs_once_per_connection(self):
+        """Testa preparação executada uma vez por conexão aberta"""
+        prepared = []
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2, on_connect=prepared.append)
+
+        for _ in range(3):
+            with pool.connection():
+                pass
+
+        assert prepared == self.created
+
+    @pytest.mark.unit
+    def test_on_connect_failure_counts_as_connect_failure(self):
+        """Testa falha na preparação da conexão"""
+        def broken_setup(conn):
+            raise RuntimeError('falha no PREPARE')
+
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2, on_connect=broken_setup)
+
+        assert pool.get_metrics()['connect_failures'] == 1
+        assert self.created[0].closed
+
+    @pytest.mark.unit
+    def test_invalid_sizes(self):
+        """Testa tamanhos inválidos"""
+        with pytest.raises(ValueError):
+            ConnectionPool(self.connect, min_size=3, max_size=2)
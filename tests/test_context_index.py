@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o índice de contextos ativos
+"""
+
+import pytest
+
+from backend.modules.context_index import ActiveContextIndex
+
+class TestActiveContextIndex:
+    """Testes para ordenação, paginação e filtro por prefixo"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.index = ActiveContextIndex()
+        for i in range(10):
+            self.index.touch(f"5511{i:04d}", 1000.0 + i)
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_page_ordered_by_last_activity(self):
+        """Testa se a primeira página traz os mais recentes"""
+        phones, next_cursor = self.index.page(3)
+
+        assert phones == ['55110009', '55110008', '55110007']
+        assert next_cursor is not None
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_cursor_walks_all_pages(self):
+        """Testa se os cursores percorrem tudo sem repetir nem pular"""
+        seen = []
+        cursor = None
+        while True:
+            phones, cursor = self.index.page(4, cursor)
+            seen.extend(phones)
+            if cursor is None:
+                break
+
+        assert seen == [f"5511{i:04d}" for i in reversed(range(10))]
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_touch_moves_to_front(self):
+        """Testa se nova atividade reposiciona o telefone"""
+        self.index.touch('55110002', 2000.0)
+
+        phones, _ = self.index.page(2)
+
+        assert phones == ['55110002', '55110009']
+        assert len(self.index) == 10
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_same_timestamp_tie_break(self):
+        """Testa paginação estável com timestamps iguais"""
+        index = ActiveContextIndex()
+        for phone in ['553', '551', '552']:
+            index.touch(phone, 500.0)
+
+        first, cursor = index.page(2)
+        second, last_cursor = index.page(2, cursor)
+
+        assert first + second == ['551', '552', '553']
+        assert last_cursor is None
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_phone_prefix_filter(self):
+        """Testa filtro por prefixo de telefone com paginação"""
+        self.index.touch('5521999', 1500.0)
+        self.index.touch('5521888', 1400.0)
+
+        phones, cursor = self.index.page(1, phone_prefix='5521')
+        rest, last_cursor = self.index.page(5, cursor, phone_prefix='5521')
+
+        assert phones == ['5521999']
+        assert rest == ['5521888']
+        assert last_cursor is None
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_common_prefix_reads_bounded_and_resumes(self):
+        """Testa prefixo comum: leitura limitada por página e cursor que continua de onde parou"""
+        index = ActiveContextIndex(prefix_scan_limit=3)
+        for i in range(10):
+            index.touch(f"5511{i:04d}", 1000.0 + i)
+            index.touch(f"5521{i:04d}", 1000.5 + i)
+
+        pages = []
+        cursor = None
+        while True:
+            phones, cursor = index.page(2, cursor, phone_prefix='5511')
+            pages.append(phones)
+            if cursor is None:
+                break
+
+        assert all(len(page) <= 2 for page in pages)
+        assert [phone for page in pages for phone in page] == [f"5511{i:04d}" for i in reversed(range(10))]
+        # Prefixo raro (até o limite) segue pelo índice de telefones
+        assert index.page(5, phone_prefix='55110003') == (['55110003'], None)
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_remove(self):
+        """Testa remoção do índice"""
+        assert self.index.remove('55110009')
+        assert not self.index.remove('55110009')
+
+        phones, _ = self.index.page(1)
+
+        assert phones == ['55110008']
+        assert self.index.page(5, phone_prefix='55110009')[0] == []
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_invalid_cursor(self):
+        """Testa cursor inválido"""
+        with pytest.raises(ValueError):
+            self.index.page(5, cursor='nao-e-um-cursor')
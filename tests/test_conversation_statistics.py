@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para as estatísticas incrementais das conversas
+"""
+
+import pytest
+
+from backend.modules.conversation_bot import ConversationBot
+
+CUSTOMER = {
+    'name': 'João Silva',
+    'debt_amount': 1500.00,
+    'days_overdue': 45,
+    'previous_contacts': 3,
+    'payment_promises': 1
+}
+
+def brute_force_statistics(bot: ConversationBot):
+    """Calcula as estatísticas percorrendo todos os contextos"""
+    contexts = list(bot.active_contexts.values())
+    total_interactions = sum(len(c.conversation_history) for c in contexts)
+    return {
+        'total_active_conversations': len(contexts),
+        'total_interactions': total_interactions,
+        'average_interactions': total_interactions / len(contexts) if contexts else 0,
+        'average_cooperation': sum(c.cooperation_level for c in contexts) / len(contexts) if contexts else 0
+    }
+
+class TestConversationStatistics:
+    """Testes para os contadores mantidos pelo ConversationBot"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.bot = ConversationBot()
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_empty_statistics(self):
+        """Testa estatísticas sem conversas ativas"""
+        stats = self.bot.get_conversation_statistics()
+
+        assert stats['total_active_conversations'] == 0
+        assert stats['average_interactions'] == 0
+        assert stats['average_cooperation'] == 0
+        assert stats['intent_distribution'] == {}
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_statistics_match_full_scan(self):
+        """Testa se os contadores batem com a varredura completa"""
+        self.bot.process_message('11999999999', 'Oi, tudo bem?', CUSTOMER)
+        self.bot.process_message('11999999999', 'Já fiz o PIX', CUSTOMER)
+        self.bot.process_message('11888888888', 'Pode parcelar em 3 vezes?', CUSTOMER)
+
+        stats = self.bot.get_conversation_statistics()
+        expected = brute_force_statistics(self.bot)
+
+        assert stats['total_active_conversations'] == expected['total_active_conversations']
+        assert stats['total_interactions'] == expected['total_interactions'] == 3
+        assert stats['average_interactions'] == pytest.approx(expected['average_interactions'])
+        assert stats['average_cooperation'] == pytest.approx(expected['average_cooperation'])
+
+        # Distribuição conta a última intenção de cada conversa ativa
+        assert sum(stats['intent_distribution'].values()) == 2
+        assert sum(stats['sentiment_distribution'].values()) == 2
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_statistics_after_eviction(self):
+        """Testa se a remoção de contexto atualiza os contadores"""
+        self.bot.process_message('11999999999', 'Oi, tudo bem?', CUSTOMER)
+        self.bot.process_message('11888888888', 'Obrigado pela informação', CUSTOMER)
+
+        assert self.bot.clear_context('11999999999')
+        assert not self.bot.clear_context('11999999999')
+
+        stats = self.bot.get_conversation_statistics()
+        expected = brute_force_statistics(self.bot)
+
+        assert stats['total_active_conversations'] == 1
+        assert stats['total_interactions'] == expected['total_interactions']
+        assert stats['average_cooperation'] == pytest.approx(expected['average_cooperation'])
+        assert sum(stats['intent_distribution'].values()) == 1
+
+    @pytest.mark.unit
+    @pytest.mark.conversation
+    def test_history_cap_keeps_counters(self):
+        """Testa contadores quando o histórico atinge o limite de 50 interações"""
+        for _ in range(55):
+            self.bot.process_message('11999999999', 'Oi, tudo bem?', CUSTOMER)
+
+        stats = self.bot.get_conversation_statistics()
+
+        assert stats['total_interactions'] == 50
+        assert len(self.bot.get_context('11999999999').conversation_history) == 50
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o gerenciador de dados dos clientes
+"""
+
+import threading
+import time
+
+import pytest
+
+from backend.modules.customer_data_manager import (
+    CustomerDataManager, CustomerData, ConversationContext, merge_pending_turns,
+    NEGATIVE_CACHE_TTL_SECONDS
+)
+from backend.modules.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.modules.redis_cache import RedisCache
+from backend.modules.write_behind import WriteBehindBuffer
+from backend.modules.write_spool import WriteSpool
+from tests.test_redis_cache import FakeRedis
+
+class FakeDatabaseManager:
+    """Banco falso que registra as chamadas de escrita"""
+
+    def __init__(self):
+        self.turns = []
+        self.batches = []
+        self.lookups = []
+
+    def commit_conversation_turn(self, context, protocolo=None, payment_promise=False):
+        self.turns.append((context.phone, protocolo, payment_promise))
+        return True
+
+    def commit_conversation_turns(self, turns):
+        self.batches.append(turns)
+        self.turns.extend((context.phone, protocolo, promises > 0) for context, protocolo, _, promises in turns)
+        return True
+
+    def save_customer_data(self, customer):
+        return True
+
+    def find_customer_by_phone(self, phone):
+        self.lookups.append(phone)
+        return None
+
+    def iter_customer_phones(self):
+        return iter([('+5511988887777', '123.456.789-00'), (None, '11977776666')])
+
+class TestCommitConversationTurn:
+    """Testes para a gravação do turno da conversa"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = CustomerDataManager()
+        self.manager.db_manager = FakeDatabaseManager()
+        self.manager.database_available = True
+        self.manager.write_buffer = None
+
+        self.phone = '11999999999'
+        self.manager.memory_cache[self.phone] = CustomerData(
+            phone=self.phone, name='João', documento='', debt_amount=100.0,
+            days_overdue=10, due_date='', protocolo='P123', contrato='',
+            regional='', territorio='', plano='', valor_mensalidade=0.0,
+            company='', status='active', priority='medium', is_customer=True
+        )
+
+    def _context(self):
+        return ConversationContext(
+            phone=self.phone, customer_name='João', debt_amount=100.0,
+            days_overdue=10, conversation_history=[{'customer_message': 'oi'}]
+        )
+
+    @pytest.mark.unit
+    def test_single_database_call_with_protocolo(self):
+        """Testa gravação do turno em uma chamada com o protocolo do cliente"""
+        assert self.manager.commit_conversation_turn(
+            self.phone, self._context(), {'intent': 'pagamento_confirmado'}
+        )
+
+        assert self.manager.db_manager.turns == [(self.phone, 'P123', True)]
+
+    @pytest.mark.unit
+    def test_cache_counters_updated(self):
+        """Testa atualização dos contadores do cliente no cache"""
+        self.manager.commit_conversation_turn(self.phone, self._context(), {'intent': 'saudacao'})
+
+        customer = self.manager.memory_cache[self.phone]
+        assert customer.conversation_count == 1
+        assert customer.payment_promises == 0
+        assert customer.last_contact is not None
+        assert self.manager.conversation_cache[self.phone].created_at is not None
+
+    @pytest.mark.unit
+    def test_unknown_customer(self):
+        """Testa turno de telefone sem cliente cadastrado"""
+        context = self._context()
+        context.phone = '11888888888'
+
+        assert self.manager.commit_conversation_turn('11888888888', context, {})
+        assert self.manager.db_manager.turns == [('11888888888', None, False)]
+
+class TestConversationWriteBehind:
+    """Testes para a gravação em lote das conversas"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = CustomerDataManager()
+        self.manager.db_manager = FakeDatabaseManager()
+        self.manager.database_available = True
+        self.manager.write_buffer = WriteBehindBuffer(
+            self.manager._flush_pending_turns, merge_pending_turns, flush_interval=60
+        )
+
+    def teardown_method(self):
+        """Encerra a thread do buffer"""
+        self.manager.write_buffer.close()
+
+    def _context(self, phone, message):
+        return ConversationContext(
+            phone=phone, customer_name='João', debt_amount=100.0, days_overdue=10,
+            conversation_history=[{'customer_message': message}]
+        )
+
+    @pytest.mark.unit
+    def test_turns_of_same_phone_coalesced(self):
+        """Testa turnos seguidos do mesmo telefone gravados como uma entrada"""
+        for message in ('oi', 'quero pagar', 'amanhã'):
+            self.manager.commit_conversation_turn('11999999999', self._context('11999999999', message),
+                                                  {'intent': 'pagamento_confirmado'})
+        self.manager.commit_conversation_turn('11888888888', self._context('11888888888', 'oi'), {})
+
+        assert self.manager.db_manager.batches == []
+        assert self.manager.flush_pending_writes()
+
+        (batch,) = self.manager.db_manager.batches
+        context, _, interactions, promises = batch[0]
+        assert [event['customer_message'] for event in context.conversation_history] == [
+            'oi', 'quero pagar', 'amanhã'
+        ]
+        assert (interactions, promises) == (3, 3)
+        assert len(batch) == 2
+        assert self.manager.write_buffer.get_metrics()['coalescing_ratio'] == 0.5
+
+    @pytest.mark.unit
+    def test_cache_reflects_unflushed_turn(self):
+        """Testa leitura do contexto antes da gravação no banco"""
+        context = self._context('11999999999', 'oi')
+        self.manager.commit_conversation_turn('11999999999', context, {})
+
+        assert self.manager.get_conversation_context('11999999999') is context
+
+class TestDegradedMode:
+    """Testes para o modo degradado com o circuito do banco aberto"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = CustomerDataManager()
+        self.manager.db_manager = FakeDatabaseManager()
+        self.now = [0.0]
+        self.manager.db_manager.breaker = CircuitBreaker('teste', failure_threshold=1, reset_timeout=60,
+                                                         clock=lambda: self.now[0])
+        self.manager.database_available = True
+        self.manager.write_buffer = None
+
+    def _open_breaker(self):
+        self.manager.db_manager.breaker.record_failure()
+
+    def _context(self, message):
+        return ConversationContext(
+            phone='11999999999', customer_name='João', debt_amount=100.0, days_overdue=10,
+            conversation_history=[{'customer_message': message}]
+        )
+
+    @pytest.mark.unit
+    def test_reads_skip_database_and_writes_go_to_spool(self, tmp_path):
+        """Testa leitura só do cache e escrita no spool com o circuito aberto"""
+        self.manager.spool = WriteSpool(str(tmp_path / 'spool.jsonl'))
+        self._open_breaker()
+
+        assert self.manager.get_customer_data('11999999999') is None
+        assert self.manager.commit_conversation_turn('11999999999', self._context('oi'), {})
+
+        assert self.manager.db_manager.lookups == []
+        assert self.manager.db_manager.turns == []
+        assert self.manager.spool.pending == 1
+        assert self.manager.get_cache_stats()['degraded_mode'] is True
+
+    @pytest.mark.unit
+    def test_spool_replayed_in_order(self, tmp_path):
+        """Testa reaplicação do spool quando o banco volta"""
+        self.manager.spool = WriteSpool(str(tmp_path / 'spool.jsonl'))
+        self.manager._schedule_replay = lambda force=False: None
+        self._open_breaker()
+        for message in ('oi', 'quero pagar'):
+            self.manager.commit_conversation_turn('11999999999', self._context(message),
+                                                  {'intent': 'pagamento_confirmado'})
+
+        # Após o reset_timeout a chamada de teste passa e fecha o circuito
+        self.now[0] = 61.0
+
+        assert self.manager.replay_spool() == 2
+        (batch,) = self.manager.db_manager.batches
+        assert [context.conversation_history[0]['customer_message'] for context, _, _, _ in batch] == [
+            'oi', 'quero pagar'
+        ]
+        assert [promises for _, _, _, promises in batch] == [1, 1]
+        assert self.manager.spool.pending == 0
+
+    @pytest.mark.unit
+    def test_half_open_rejections_go_to_spool(self, tmp_path):
+        """Testa escritas recusadas durante a chamada de teste do half_open"""
+        self.manager.spool = WriteSpool(str(tmp_path / 'spool.jsonl'))
+        self.manager._schedule_replay = lambda force=False: None
+        breaker = self.manager.db_manager.breaker
+        self._open_breaker()
+        self.now[0] = 61.0
+        # Outra thread está com a chamada de teste em andamento
+        assert breaker.allow_request()
+        # O DatabaseManager engole o CircuitOpenError e devolve False
+        self.manager.db_manager.commit_conversation_turn = lambda *args, **kwargs: breaker.allow_request()
+
+        assert self.manager.commit_conversation_turn('11999999999', self._context('oi'), {})
+
+        assert self.manager.spool.pending == 1
+        (entry,) = self.manager.spool._read(self.manager.spool.path)
+        assert entry['kind'] == 'turn'
+        assert '11999999999' not in self.manager.negative_cache
+
+class TestL2Cache:
+    """Testes para o cache L2 (Redis) entre a memória e o banco"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = CustomerDataManager()
+        self.manager.db_manager = FakeDatabaseManager()
+        self.manager.database_available = True
+        self.manager.write_buffer = None
+        self.manager.l2_cache = RedisCache(client=FakeRedis())
+
+    def _customer(self, phone):
+        return {'phone': phone, 'name': 'João', 'debt_amount': 100.0, 'protocolo': f"P{phone}"}
+
+    @pytest.mark.unit
+    def test_saved_customer_is_shared_through_l2(self):
+        """Testa que outro worker (cache em memória vazio) lê o cliente do Redis"""
+        self.manager.save_customer_data(self._customer('11999999999'))
+        self.manager.memory_cache.clear()
+
+        customer = self.manager.get_customer_data('11999999999')
+
+        assert customer.protocolo == 'P11999999999'
+        assert self.manager.db_manager.lookups == []
+        assert '11999999999' in self.manager.memory_cache
+
+    @pytest.mark.unit
+    def test_get_customers_data_falls_back_to_database(self):
+        """Testa a busca em lote: memória, Redis e só os restantes no banco"""
+        for phone in ('1', '2'):
+            self.manager.save_customer_data(self._customer(phone))
+        self.manager.memory_cache.pop('2')
+
+        found = self.manager.get_customers_data(['1', '2', '3'])
+
+        assert sorted(found) == ['1', '2']
+        assert self.manager.db_manager.lookups == ['3']
+
+    @pytest.mark.unit
+    def test_bulk_import_discards_cached_customers(self):
+        """Testa que a carga em massa descarta os clientes do Redis (dívida pode ter mudado)"""
+        self.manager.save_customer_data(self._customer('11999999999'))
+        self.manager.l2_cache.set('context:11999999999', {'phone': '11999999999'})
+
+        self.manager._on_customers_imported({'rows': 1, 'inserted': 0})
+
+        assert self.manager.get_customer_data('11999999999') is None
+        assert self.manager.db_manager.lookups == ['11999999999']
+        assert self.manager.l2_cache.get('context:11999999999') is not None
+
+    @pytest.mark.unit
+    def test_conversation_turn_refreshes_l2_counters(self):
+        """Testa que os contadores do turno chegam ao Redis lido pelos outros workers"""
+        self.manager.save_customer_data(self._customer('11999999999'))
+        context = ConversationContext(phone='11999999999', customer_name='João', debt_amount=100.0,
+                                      days_overdue=10, conversation_history=[])
+
+        self.manager.commit_conversation_turn('11999999999', context, {'intent': 'pagamento_confirmado'})
+
+        cached = self.manager.l2_cache.get('customer:11999999999')
+        assert (cached['conversation_count'], cached['payment_promises']) == (1, 1)
+
+class TestNonCustomerLookups:
+    """Testes para o cache negativo e o filtro de telefones"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = CustomerDataManager()
+        self.manager.db_manager = FakeDatabaseManager()
+        self.manager.database_available = True
+        self.manager.write_buffer = None
+        self.manager.l2_cache = None
+
+    @pytest.mark.unit
+    def test_unknown_phone_queries_database_once(self):
+        """Testa que a segunda mensagem de um não cliente não vai ao banco"""
+        assert self.manager.get_customer_data('11900000000') is None
+        assert self.manager.get_customer_data('11900000000') is None
+        assert self.manager.get_customers_data(['11900000000']) == {}
+
+        assert self.manager.db_manager.lookups == ['11900000000']
+        assert self.manager.lookup_metrics['negative_cache_hits'] == 2
+
+    @pytest.mark.unit
+    def test_saved_customer_leaves_negative_cache(self):
+        """Testa que o cadastro remove o telefone do cache negativo"""
+        self.manager.get_customer_data('11900000000')
+        self.manager.save_customer_data({'phone': '11900000000', 'name': 'Ana'})
+
+        assert '11900000000' not in self.manager.negative_cache
+        assert self.manager.get_customer_data('11900000000').name == 'Ana'
+
+    @pytest.mark.unit
+    def test_phone_filter_rejects_without_database(self):
+        """Testa o filtro de Bloom: fora do filtro não consulta o banco"""
+        assert self.manager.rebuild_phone_filter()
+
+        assert self.manager.get_customer_data('11911112222') is None
+        assert self.manager.db_manager.lookups == []
+
+        # Telefone em outro formato e documento de registro antigo passam pelo filtro
+        self.manager.get_customer_data('(11) 98888-7777')
+        self.manager.get_customer_data('11977776666')
+        assert self.manager.db_manager.lookups == ['(11) 98888-7777', '11977776666']
+
+    @pytest.mark.unit
+    def test_failed_lookup_not_negative_cached(self):
+        """Testa que erro na busca (pool esgotado, circuito) não marca o telefone como não cliente"""
+        lookup = self.manager.db_manager.find_customer_by_phone
+
+        def failing_lookup(phone):
+            lookup(phone)
+            raise CircuitOpenError('banco: circuito aberto')
+
+        self.manager.db_manager.find_customer_by_phone = failing_lookup
+        assert self.manager.get_customer_data('11900000000') is None
+        assert self.manager.get_customers_data(['11900000000']) == {}
+
+        assert '11900000000' not in self.manager.negative_cache
+        self.manager.db_manager.find_customer_by_phone = lookup
+        assert self.manager.get_customer_data('11900000000') is None
+        assert self.manager.db_manager.lookups == ['11900000000'] * 3
+        assert '11900000000' in self.manager.negative_cache
+
+    @pytest.mark.unit
+    def test_bulk_import_rebuilds_phone_filter(self):
+        """Testa que clientes importados em massa passam a ser encontrados pelo filtro"""
+        self.manager._schedule_filter_rebuild = self.manager.rebuild_phone_filter
+        assert self.manager.rebuild_phone_filter()
+        assert self.manager.get_customer_data('11911112222') is None
+
+        self.manager.db_manager.iter_customer_phones = lambda: iter([('+5511911112222', None)])
+        self.manager._on_customers_imported({'rows': 1, 'inserted': 0})
+
+        self.manager.get_customer_data('11911112222')
+        assert self.manager.db_manager.lookups == ['11911112222']
+
+    @pytest.mark.unit
+    def test_stale_phone_filter_confirms_rejection_in_database(self):
+        """Testa que filtro mais velho que o cache negativo não recusa sem consultar o banco"""
+        self.manager._schedule_filter_rebuild = lambda: None
+        assert self.manager.rebuild_phone_filter()
+        self.manager._filter_built_at -= NEGATIVE_CACHE_TTL_SECONDS + 1
+
+        assert self.manager.get_customer_data('11911112222') is None
+        assert self.manager.get_customer_data('11911112222') is None
+
+        # A confirmação no banco entra no cache negativo
+        assert self.manager.db_manager.lookups == ['11911112222']
+        assert self.manager.lookup_metrics['phone_filter_stale_checks'] == 1
+        assert self.manager.lookup_metrics['phone_filter_rejections'] == 0
+
+    @pytest.mark.unit
+    def test_rebuild_requested_while_running_runs_again(self):
+        """Testa que um pedido durante a reconstrução gera outra reconstrução ao terminar"""
+        started = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def slow_rebuild():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return True
+
+        self.manager.rebuild_phone_filter = slow_rebuild
+        self.manager._schedule_filter_rebuild()
+        assert started.wait(5)
+        thread = self.manager._filter_thread
+        self.manager._schedule_filter_rebuild()
+        self.manager._schedule_filter_rebuild()
+        release.set()
+        thread.join(5)
+
+        assert len(runs) == 2
+        assert self.manager._filter_thread is None
+
+class TestConcurrentLookups:
+    """Testes para a busca única por telefone com misses simultâneos"""
+
+    @pytest.mark.unit
+    def test_concurrent_misses_query_database_once(self):
+        """Testa que threads buscando o mesmo telefone fazem uma consulta"""
+        manager = CustomerDataManager()
+        manager.db_manager = FakeDatabaseManager()
+        manager.database_available = True
+        manager.l2_cache = None
+        lookup = manager.db_manager.find_customer_by_phone
+
+        def slow_lookup(phone):
+            time.sleep(0.05)
+            return lookup(phone)
+
+        manager.db_manager.find_customer_by_phone = slow_lookup
+        threads = [threading.Thread(target=manager.get_customer_data, args=('11900000000',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert manager.db_manager.lookups == ['11900000000']
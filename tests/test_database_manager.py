@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para as partes do gerenciador de banco que não dependem de conexão
+"""
+
+import json
+import threading
+
+import pytest
+
+from contextlib import contextmanager
+from datetime import datetime
+
+from backend.database.connection_pool import PoolError
+from backend.modules.circuit_breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpenError
+from backend.database.database_manager import (
+    DatabaseManager, Customer, BULK_CUSTOMER_COLUMNS, CUSTOMER_COLUMNS, CONVERSATION_HISTORY_LIMIT,
+    PREPARED_STATEMENTS, REQUIRED_INDEXES, format_copy_row, history_entries, recent_history_json
+)
+
+class MissingStatementError(Exception):
+    """Erro com o SQLSTATE de consulta preparada inexistente"""
+    pgcode = '26000'
+
+class FakeConnection:
+    """Conexão falsa que registra rollbacks"""
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class FakeCursor:
+    """Cursor falso cuja conexão ainda não preparou as consultas"""
+
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.prepared = set()
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        if query.startswith('PREPARE'):
+            self.prepared.add(query.split()[1])
+        elif query.startswith('EXECUTE') and query.split()[1] not in self.prepared:
+            raise MissingStatementError('prepared statement does not exist')
+
+class TestBulkUpsertRows:
+    """Testes para a preparação das linhas da carga em massa"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        self.manager.pool = None
+
+    @pytest.mark.unit
+    def test_format_copy_row_escapes(self):
+        """Testa escape de caracteres especiais e NULL"""
+        row = format_copy_row(['a\tb', 'linha\nnova', 'barra\\', None, 10.5])
+
+        assert row == 'a\\tb\tlinha\\nnova\tbarra\\\\\t\\N\t10.5\n'
+
+    @pytest.mark.unit
+    def test_chunks_respect_size(self):
+        """Testa divisão em lotes"""
+        customers = [{'protocolo': str(i), 'first_name': f'Cliente {i}'} for i in range(5)]
+
+        chunks = list(self.manager._customer_chunks(customers, chunk_size=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert len(chunks[0][0]) == len(BULK_CUSTOMER_COLUMNS)
+
+    @pytest.mark.unit
+    def test_chunks_keep_last_duplicate_and_blank_as_null(self):
+        """Testa protocolo repetido no lote e string vazia como NULL"""
+        customers = [
+            {'protocolo': '1', 'first_name': 'Antigo'},
+            {'protocolo': '1', 'first_name': 'Novo', 'documento': ''},
+            {'protocolo': '', 'first_name': 'Sem protocolo'}
+        ]
+
+        chunks = list(self.manager._customer_chunks(customers, chunk_size=10))
+
+        assert len(chunks) == 1
+        (row,) = chunks[0]
+        assert row[1] == 'Novo'
+        assert row[2] is None
+
+    @pytest.mark.unit
+    def test_chunks_accept_customer_objects(self):
+        """Testa entrada com objetos Customer"""
+        customer = Customer(
+            protocolo='99', first_name='Ana', documento='123', cobrado_fpd=10.0,
+            dias_fpd=5, data_vencimento_fpd='2024-01-01', contrato='C1',
+            regional='R', territorio='T', dsc_plano='Plano',
+            valor_mensalidade=99.9, empresa='E'
+        )
+
+        (chunk,) = list(self.manager._customer_chunks([customer], chunk_size=10))
+
+        assert chunk[0][:3] == ('99', 'Ana', '123')
+
+    @pytest.mark.unit
+    def test_chunks_normalize_phone(self):
+        """Testa telefone normalizado para a coluna phone_e164"""
+        customers = [{'protocolo': '1', 'phone': '(11) 99999-8888'}, {'protocolo': '2'}]
+
+        (chunk,) = list(self.manager._customer_chunks(customers, chunk_size=10))
+
+        index = BULK_CUSTOMER_COLUMNS.index('phone_e164')
+        assert [row[index] for row in chunk] == ['+5511999998888', None]
+
+class BulkConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class BulkCursor:
+    """Cursor falso da carga em massa; o INSERT do lote `fail_chunk` é rejeitado"""
+
+    def __init__(self, fail_chunk=None, updates_only=False):
+        self.connection = BulkConnection()
+        self.fail_chunk = fail_chunk
+        self.updates_only = updates_only
+        self.copies = 0
+        self.copied_rows = 0
+        self.result = None
+
+    def copy_expert(self, query, buffer):
+        self.copies += 1
+        self.copied_rows = buffer.getvalue().count('\n')
+
+    def execute(self, query, params=None):
+        if 'INSERT INTO customers' in query:
+            if self.copies == self.fail_chunk:
+                raise ValueError('violação de restrição no lote')
+            inserted = 0 if self.updates_only else self.copied_rows
+            self.result = {'total': self.copied_rows, 'inserted': inserted}
+
+    def fetchone(self):
+        return self.result
+
+class TestBulkUpsertChunks:
+    """Testes para lotes rejeitados e contagens da carga em massa"""
+
+    def make_manager(self, cursor):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.pool = type('Pool', (), {'available': True})()
+        manager.import_listeners = []
+
+        @contextmanager
+        def fake_cursor(expect_slow=False):
+            yield cursor
+
+        manager._cursor = fake_cursor
+        return manager
+
+    @pytest.mark.unit
+    def test_rejected_chunk_is_reported_and_load_continues(self):
+        """Testa que um lote rejeitado é desfeito e contado, e os seguintes são gravados"""
+        cursor = BulkCursor(fail_chunk=2)
+        manager = self.make_manager(cursor)
+        customers = [{'protocolo': str(i)} for i in range(5)] + [{'first_name': 'Sem protocolo'}]
+
+        stats = manager.bulk_upsert_customers(customers, chunk_size=2)
+
+        assert stats['success'] is False
+        assert (stats['rows'], stats['failed'], stats['skipped']) == (3, 2, 1)
+        assert stats['chunks'] == 2
+        assert len(stats['errors']) == 1 and stats['errors'][0].startswith('lote 2:')
+        assert cursor.connection.rollbacks == 1
+
+    @pytest.mark.unit
+    def test_shared_phone_and_repeated_protocolo(self):
+        """Testa telefone repetido em contratos distintos e protocolo repetido mesclado"""
+        manager = self.make_manager(BulkCursor())
+        customers = [
+            {'protocolo': '1', 'phone': '11999998888'},
+            {'protocolo': '2', 'phone': '11999998888'},
+            {'protocolo': '2', 'phone': '11999998888', 'first_name': 'Ana'}
+        ]
+
+        stats = manager.bulk_upsert_customers(customers, chunk_size=10)
+
+        assert stats['success'] is True
+        assert (stats['rows'], stats['merged'], stats['failed']) == (2, 1, 0)
+
+    @pytest.mark.unit
+    def test_listeners_notified_when_only_updates(self):
+        """Testa que carga só com clientes existentes também avisa os listeners"""
+        manager = self.make_manager(BulkCursor(updates_only=True))
+        notified = []
+        manager.import_listeners.append(notified.append)
+
+        stats = manager.bulk_upsert_customers([{'protocolo': '1', 'phone': '11999998888'}])
+
+        assert (stats['inserted'], stats['updated']) == (0, 1)
+        assert notified == [stats]
+
+class TestKeysetPagination:
+    """Testes para a validação dos cursores de paginação"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        self.manager.pool = None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('method', ['get_customers_page', 'get_conversations_page'])
+    def test_invalid_cursor(self, method):
+        """Testa cursor inválido antes de consultar o banco"""
+        with pytest.raises(ValueError):
+            getattr(self.manager, method)(10, 'cursor-invalido')
+
+    @pytest.mark.unit
+    def test_disconnected_returns_empty_page(self):
+        """Testa página vazia sem conexão"""
+        assert self.manager.get_customers_page(10) == ([], None)
+
+class TestPreparedLookups:
+    """Testes para consultas preparadas e conversão posicional"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        self.manager.pool = None
+
+    @pytest.mark.unit
+    def test_execute_prepares_on_demand(self):
+        """Testa PREPARE sob demanda quando a conexão não tem a consulta"""
+        cursor = FakeCursor()
+
+        self.manager._execute_prepared(cursor, 'customer_by_protocolo', ('P1',))
+
+        assert cursor.connection.rollbacks == 1
+        assert cursor.executed[-2].startswith('PREPARE customer_by_protocolo (text)')
+        assert cursor.executed[-1] == 'EXECUTE customer_by_protocolo (%s)'
+
+    @pytest.mark.unit
+    def test_execute_propagates_other_errors(self):
+        """Testa que outros erros não são tratados como consulta ausente"""
+        cursor = FakeCursor()
+        cursor.execute = lambda query, params=None: (_ for _ in ()).throw(RuntimeError('timeout'))
+
+        with pytest.raises(RuntimeError):
+            self.manager._execute_prepared(cursor, 'customer_by_protocolo', ('P1',))
+
+    @pytest.mark.unit
+    def test_convert_customer_from_tuple(self):
+        """Testa conversão posicional de uma linha de customers"""
+        row = dict.fromkeys(CUSTOMER_COLUMNS)
+        row.update(protocolo='P1', first_name='Ana', cobrado_fpd='150.50', dias_fpd=30,
+                   updated_at=datetime(2024, 1, 2, 3, 4, 5), phone_e164='+5511999998888')
+
+        customer = self.manager._convert_to_customer(tuple(row.values()))
+
+        assert customer.protocolo == 'P1'
+        assert customer.cobrado_fpd == 150.5
+        assert customer.is_customer is True
+        assert customer.updated_at == '2024-01-02T03:04:05'
+        assert customer.phone == '+5511999998888'
+
+    @pytest.mark.unit
+    def test_phone_lookup_picks_latest_contract(self):
+        """Testa que a busca por telefone (não única) retorna só o contrato mais recente"""
+        query = PREPARED_STATEMENTS['customer_by_phone'][1]
+
+        assert query.endswith('ORDER BY updated_at DESC, protocolo DESC LIMIT 1')
+        assert 'idx_customers_phone_e164_updated_at' in REQUIRED_INDEXES
+
+    @pytest.mark.unit
+    def test_verify_indexes_fails_when_missing(self):
+        """Testa falha de inicialização com índices ausentes"""
+        self.manager.pool = type('Pool', (), {'available': True})()
+        self.manager.get_missing_indexes = lambda: ['idx_customers_phone_e164_updated_at']
+
+        with pytest.raises(RuntimeError, match='idx_customers_phone_e164_updated_at'):
+            self.manager.verify_required_indexes()
+
+    @pytest.mark.unit
+    def test_missing_indexes_ignore_absent_tables(self):
+        """Testa que índices de tabelas ainda inexistentes não bloqueiam a inicialização"""
+        results = [[{'indexname': 'uq_customers_protocolo'}], [{'table_name': 'customers'}]]
+
+        class IndexCursor:
+            def execute(self, query, params=None):
+                self.rows = results.pop(0)
+
+            def fetchall(self):
+                return self.rows
+
+        @contextmanager
+        def cursor():
+            yield IndexCursor()
+
+        self.manager._cursor = cursor
+
+        assert self.manager.get_missing_indexes() == sorted(
+            name for name, table in REQUIRED_INDEXES.items()
+            if table == 'customers' and name != 'uq_customers_protocolo'
+        )
+
+class StatsCursor:
+    """Cursor falso para as consultas de estatísticas"""
+
+    def __init__(self, stats_row=None, table_exists=True):
+        self.connection = FakeConnection()
+        self.stats_row = stats_row
+        self.table_exists = table_exists
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        if 'FROM database_stats' in query and not self.table_exists:
+            raise RuntimeError('relation "database_stats" does not exist')
+
+    def fetchone(self):
+        if 'FROM database_stats' in self.executed[-1]:
+            return self.stats_row
+        return {'customers_total': 3, 'conversations_total': 2,
+                'customers_with_debt': 1, 'total_debt': 10}
+
+class TestDatabaseStats:
+    """Testes para a leitura das estatísticas mantidas por triggers"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        self.manager.pool = None
+
+    @pytest.mark.unit
+    def test_reads_single_row(self):
+        """Testa leitura da linha de database_stats numa única consulta"""
+        row = {'customers_total': 5, 'conversations_total': 4, 'customers_with_debt': 2,
+               'total_debt': 300, 'updated_at': datetime(2024, 1, 1)}
+        cursor = StatsCursor(stats_row=row)
+
+        assert self.manager._read_stats_row(cursor) is row
+        assert len(cursor.executed) == 1
+
+    @pytest.mark.unit
+    def test_missing_table_falls_back_to_aggregates(self):
+        """Testa cálculo direto quando a migração ainda não foi aplicada"""
+        cursor = StatsCursor(table_exists=False)
+
+        assert self.manager._read_stats_row(cursor) is None
+        assert cursor.connection.rollbacks == 1
+        assert self.manager._aggregate_stats(cursor)['customers_total'] == 3
+
+class FakePool:
+    """Pool falso que entrega conexões marcadas com o nome do pool"""
+
+    def __init__(self, name, lag=0.0, available=True, fail_checkout=False):
+        self.name = name
+        self.lag = lag
+        self.available = available
+        self.fail_checkout = fail_checkout
+        self.returned = []
+
+    def getconn(self, timeout=None):
+        if self.fail_checkout:
+            raise PoolError('réplica fora do ar')
+        return self.name
+
+    def putconn(self, conn, discard=False):
+        self.returned.append(conn)
+
+    def get_metrics(self):
+        return {'size': 1}
+
+    def connection(self):
+        pool = self
+
+        class LagConnection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def cursor(self):
+                return self
+
+            def execute(self, query, params=None):
+                pass
+
+            def fetchone(self):
+                return (pool.lag,)
+
+            def close(self):
+                pass
+
+            def rollback(self):
+                pass
+
+        return LagConnection()
+
+class TestReadRouting:
+    """Testes para leituras na réplica com fallback para o primário"""
+
+    def make_manager(self, read_pool):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.pool = FakePool('primary')
+        manager.read_pool = read_pool
+        manager.max_replica_lag = 10.0
+        manager._replica_lock = threading.Lock()
+        manager._metrics_lock = threading.Lock()
+        manager._replica_lag = None
+        manager._replica_checked_at = float('-inf')
+        manager.replica_metrics = {'replica_reads': 0, 'primary_fallbacks': 0, 'lag_checks': 0}
+        return manager
+
+    @pytest.mark.unit
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        """Testa roteamento de leitura e escrita"""
+        manager = self.make_manager(FakePool('replica', lag=1.0))
+
+        assert manager._checkout(read_only=True)[1] == 'replica'
+        assert manager._checkout(read_only=False)[1] == 'primary'
+        assert manager.get_replica_stats()['replica_reads'] == 1
+
+    @pytest.mark.unit
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Testa fallback quando o atraso passa do limite"""
+        manager = self.make_manager(FakePool('replica', lag=30.0))
+
+        assert manager._checkout(read_only=True)[1] == 'primary'
+        assert manager.get_replica_stats()['primary_fallbacks'] == 1
+        assert manager.get_replica_stats()['lag_seconds'] == 30.0
+
+    @pytest.mark.unit
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Testa fallback com a réplica fora do ar"""
+        manager = self.make_manager(FakePool('replica', fail_checkout=True))
+
+        assert manager._checkout(read_only=True)[1] == 'primary'
+        # Após a falha a réplica só volta depois de uma nova medição
+        assert manager._replica_lag is None
+
+    @pytest.mark.unit
+    def test_replica_errors_do_not_trip_primary_breaker(self):
+        """Testa que erro de conexão na réplica a tira das leituras sem abrir o circuito do primário"""
+        manager = self.make_manager(FakePool('replica', lag=1.0))
+        manager.breaker = CircuitBreaker('banco', failure_threshold=1)
+        pool, _ = manager._checkout(read_only=True)
+
+        assert manager.breaker.allow_request()
+        manager._record_outcome(pool, healthy=False, elapsed=0.0)
+
+        assert manager.breaker.state == CLOSED
+        assert manager.breaker.get_metrics()['failures'] == 0
+        assert manager._checkout(read_only=True)[1] == 'primary'
+
+        manager._record_outcome(manager.pool, healthy=False, elapsed=0.0)
+        assert manager.breaker.state == OPEN
+
+    @pytest.mark.unit
+    def test_lag_measured_once_per_interval(self):
+        """Testa cache da medição de atraso"""
+        manager = self.make_manager(FakePool('replica', lag=0.0))
+
+        for _ in range(5):
+            manager._checkout(read_only=True)
+
+        assert manager.replica_metrics['lag_checks'] == 1
+
+    @pytest.mark.unit
+    def test_without_replica_everything_uses_primary(self):
+        """Testa configuração sem réplica"""
+        manager = self.make_manager(None)
+
+        assert manager._checkout(read_only=True)[1] == 'primary'
+        assert manager.get_replica_stats() == {}
+
+class StreamCursor:
+    """Cursor nomeado falso que entrega `rows` e pode falhar no meio"""
+
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.itersize = None
+        self.executed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.executed = (query, params)
+
+    def __iter__(self):
+        for index, row in enumerate(self.rows):
+            if index == self.fail_after:
+                raise RuntimeError('conexão perdida no meio da leitura')
+            yield row
+
+class StreamConnection:
+    def __init__(self, cursor, fail_rollback=False):
+        self.stream_cursor = cursor
+        self.fail_rollback = fail_rollback
+        self.cursor_names = []
+        self.rollbacks = 0
+
+    def cursor(self, name=None, **kwargs):
+        self.cursor_names.append(name)
+        return self.stream_cursor
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.fail_rollback:
+            raise RuntimeError('conexão quebrada')
+
+class StreamPool:
+    available = True
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.checkouts = 0
+        self.returned = []
+
+    def getconn(self, timeout=None):
+        self.checkouts += 1
+        return self.conn
+
+    def putconn(self, conn, discard=False):
+        self.returned.append((conn, discard))
+
+class TestStreamCustomers:
+    """Testes para a leitura em streaming (cursor server-side)"""
+
+    def make_manager(self, cursor, fail_rollback=False):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.conn = StreamConnection(cursor, fail_rollback)
+        manager.pool = StreamPool(manager.conn)
+        manager.read_pool = None
+        manager.breaker = CircuitBreaker('teste', failure_threshold=1, reset_timeout=60)
+        # Linhas do cursor falso já são o resultado
+        manager._convert_to_customer = lambda row: row
+        return manager
+
+    @pytest.mark.unit
+    def test_named_cursor_with_itersize(self):
+        """Testa cursor nomeado, itersize e devolução da conexão ao pool"""
+        cursor = StreamCursor([('1', 'João'), ('2', 'Maria')])
+        manager = self.make_manager(cursor)
+
+        rows = list(manager.iter_customers(itersize=500))
+
+        assert rows == [('1', 'João'), ('2', 'Maria')]
+        assert manager.conn.cursor_names[0].startswith('stream_customers_')
+        assert cursor.itersize == 500
+        assert manager.pool.returned == [(manager.conn, False)]
+        assert manager.breaker.get_metrics()['successes'] == 1
+
+    @pytest.mark.unit
+    def test_early_close_rolls_back_and_returns_connection(self):
+        """Testa iterador abandonado: rollback e conexão de volta ao pool"""
+        manager = self.make_manager(StreamCursor([('1', 'João'), ('2', 'Maria')]))
+
+        rows = manager.iter_customers()
+        assert next(rows) == ('1', 'João')
+        rows.close()
+
+        assert manager.conn.rollbacks == 1
+        assert manager.pool.returned == [(manager.conn, False)]
+
+    @pytest.mark.unit
+    def test_failed_rollback_discards_connection(self):
+        """Testa descarte da conexão quando o rollback falha"""
+        manager = self.make_manager(StreamCursor([('1', 'João')]), fail_rollback=True)
+
+        list(manager.iter_customers())
+
+        assert manager.pool.returned == [(manager.conn, True)]
+
+    @pytest.mark.unit
+    def test_mid_stream_error_propagates(self):
+        """Testa que erro no meio da leitura chega ao chamador"""
+        manager = self.make_manager(StreamCursor([('1', 'João'), ('2', 'Maria')], fail_after=1))
+        rows = manager.iter_customers()
+
+        assert next(rows) == ('1', 'João')
+        with pytest.raises(RuntimeError):
+            next(rows)
+        assert manager.pool.returned == [(manager.conn, False)]
+
+    @pytest.mark.unit
+    def test_open_circuit_does_not_touch_pool(self):
+        """Testa CircuitOpenError sem retirar conexão do pool"""
+        manager = self.make_manager(StreamCursor([]))
+        manager.breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            list(manager.iter_customers())
+        assert manager.pool.checkouts == 0
+
+class TestRecentHistory:
+    """Testes para a cauda JSONB do histórico"""
+
+    @pytest.mark.unit
+    def test_entries_normalized(self):
+        """Testa itens no mesmo formato lido de conversation_events"""
+        (entry,) = history_entries([{'timestamp': datetime(2024, 1, 1), 'urgency_level': '0.5'}])
+
+        assert entry['timestamp'] == '2024-01-01T00:00:00'
+        assert entry['urgency_level'] == 0.5
+        assert entry['message_type'] == 'conversation'
+
+    @pytest.mark.unit
+    def test_json_trimmed_to_tail_size(self):
+        """Testa corte dos turnos novos no tamanho da cauda"""
+        events = [{'customer_message': str(i)} for i in range(CONVERSATION_HISTORY_LIMIT + 5)]
+
+        tail = json.loads(recent_history_json(events))
+
+        assert len(tail) == CONVERSATION_HISTORY_LIMIT
+        assert tail[-1]['customer_message'] == str(CONVERSATION_HISTORY_LIMIT + 4)
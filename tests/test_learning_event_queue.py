@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para a fila de eventos de aprendizado
+"""
+
+import threading
+
+import pytest
+
+from backend.modules import learning_event_queue
+from backend.modules.learning_event_queue import LearningEventQueue, DROP_NEWEST, DROP_OLDEST
+
+class FakeAtexit:
+    """atexit falso que registra as funções de encerramento"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def register(self, fn):
+        self.callbacks.append(fn)
+
+    def unregister(self, fn):
+        self.callbacks = [callback for callback in self.callbacks if callback != fn]
+
+class TestLearningEventQueue:
+    """Testes para processamento em lote, descarte e métricas"""
+
+    @pytest.mark.unit
+    def test_events_processed_in_batches(self):
+        """Testa se todos os eventos são processados em lotes"""
+        batches = []
+        queue = LearningEventQueue(batches.append, batch_size=10, flush_interval=0.01)
+
+        for i in range(25):
+            queue.publish({'id': i})
+
+        assert queue.flush(timeout=5)
+        processed = [event['id'] for batch in batches for event in batch]
+
+        assert processed == list(range(25))
+        assert all(len(batch) <= 10 for batch in batches)
+
+        metrics = queue.get_metrics()
+        assert metrics['published'] == metrics['processed'] == 25
+        assert metrics['depth'] == 0
+        queue.stop()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('policy,expected_ids', [
+        (DROP_OLDEST, [0, 3, 4]),
+        (DROP_NEWEST, [0, 1, 2])
+    ])
+    def test_drop_policy(self, policy, expected_ids):
+        """Testa descarte quando a fila está cheia"""
+        release = threading.Event()
+        started = threading.Event()
+        processed = []
+
+        def handler(batch):
+            started.set()
+            release.wait(5)
+            processed.extend(event['id'] for event in batch)
+
+        queue = LearningEventQueue(handler, max_size=2, batch_size=1,
+                                   flush_interval=0.01, drop_policy=policy)
+
+        # Primeiro evento ocupa a thread de fundo
+        queue.publish({'id': 0})
+        assert started.wait(5)
+
+        for i in range(1, 5):
+            queue.publish({'id': i})
+
+        assert queue.get_metrics()['dropped'] == 2
+
+        release.set()
+        assert queue.flush(timeout=5)
+        assert processed == expected_ids
+        queue.stop()
+
+    @pytest.mark.unit
+    def test_handler_error_does_not_stop_worker(self):
+        """Testa se erro no handler não interrompe a fila"""
+        calls = []
+
+        def handler(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError('falha')
+
+        queue = LearningEventQueue(handler, batch_size=1, flush_interval=0.01)
+        queue.publish({'id': 1})
+        queue.publish({'id': 2})
+
+        assert queue.flush(timeout=5)
+        metrics = queue.get_metrics()
+
+        assert metrics['failed_batches'] == 1
+        assert metrics['processed'] == 2
+        queue.stop()
+
+    @pytest.mark.unit
+    def test_invalid_drop_policy(self):
+        """Testa política de descarte inválida"""
+        with pytest.raises(ValueError):
+            LearningEventQueue(lambda batch: None, drop_policy='block')
+
+    @pytest.mark.unit
+    def test_shutdown_flush_registered_once_and_released_on_stop(self, monkeypatch):
+        """Testa que o atexit guarda a fila uma vez e a solta no stop"""
+        fake_atexit = FakeAtexit()
+        monkeypatch.setattr(learning_event_queue, 'atexit', fake_atexit)
+        queue = LearningEventQueue(lambda batch: None)
+
+        queue.register_shutdown_flush()
+        queue.register_shutdown_flush()
+        assert fake_atexit.callbacks == [queue.stop]
+
+        queue.stop()
+        assert fake_atexit.callbacks == []
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o executor de migrações versionadas
+"""
+
+import pytest
+
+from backend.database.migration_runner import (
+    MIGRATIONS_DIR, MigrationRunner, load_migrations, parse_migration, split_statements
+)
+
+class FakeCursor:
+    """Cursor falso que simula schema_version e o catálogo"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query.strip(), self.conn.autocommit))
+        if 'FROM schema_version' in query:
+            self.result = list(self.conn.versions.items())
+        elif 'INSERT INTO schema_version' in query:
+            self.conn.pending_versions[params[0]] = params[2]
+            if self.conn.autocommit:
+                self.conn.commit()
+        elif 'information_schema.columns' in query:
+            self.result = [(params[0] in self.conn.tables,)]
+        elif 'indisvalid' in query:
+            self.result = [(params[0] in self.conn.invalid_indexes,)]
+        elif self.conn.fail_on and self.conn.fail_on in query:
+            raise RuntimeError('falha simulada')
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+class FakeConnection:
+    def __init__(self, versions=None, tables=(), invalid_indexes=(), fail_on=None):
+        self.versions = dict(versions or {})
+        self.pending_versions = {}
+        self.tables = set(tables)
+        self.invalid_indexes = set(invalid_indexes)
+        self.fail_on = fail_on
+        self.autocommit = False
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.versions.update(self.pending_versions)
+        self.pending_versions = {}
+
+    def rollback(self):
+        self.pending_versions = {}
+
+def write_migrations(directory, files):
+    for name, sql in files.items():
+        (directory / name).write_text(sql, encoding='utf-8')
+
+class TestParsing:
+    """Testes para leitura e divisão das migrações"""
+
+    @pytest.mark.unit
+    def test_parse_directives(self):
+        """Testa as diretivas no-transaction e requires"""
+        migration = parse_migration('010_add_index.sql', (
+            "-- migration: no-transaction\n"
+            "-- requires: conversations, customers.documento\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON t(c);\n"
+        ))
+
+        assert migration.version == '010'
+        assert migration.name == 'add_index'
+        assert migration.transactional is False
+        assert migration.requires == ['conversations', 'customers.documento']
+        assert parse_migration('README.md', '') is None
+
+    @pytest.mark.unit
+    def test_split_statements_respects_quotes_and_dollar_blocks(self):
+        """Testa que `;` dentro de strings e blocos $$ não divide a instrução"""
+        sql = (
+            "-- comentário; ignorado\n"
+            "CREATE INDEX CONCURRENTLY a ON t(x);\n"
+            "INSERT INTO t VALUES ('a;b');\n"
+            "DO $$ BEGIN PERFORM 1; END $$;\n"
+        )
+
+        statements = split_statements(sql)
+
+        assert len(statements) == 3
+        assert statements[1] == "INSERT INTO t VALUES ('a;b')"
+        assert statements[2] == "DO $$ BEGIN PERFORM 1; END $$"
+
+    @pytest.mark.unit
+    def test_repository_migrations_are_ordered(self):
+        """Testa que as migrações do repositório têm versões únicas e em ordem"""
+        versions = [int(migration.version) for migration in load_migrations(MIGRATIONS_DIR)]
+
+        assert versions == sorted(versions)
+        assert len(versions) == len(set(versions))
+
+    @pytest.mark.unit
+    def test_duplicated_versions_are_rejected(self, tmp_path):
+        """Testa erro com duas migrações na mesma versão"""
+        write_migrations(tmp_path, {'001_a.sql': 'SELECT 1;', '001_b.sql': 'SELECT 2;'})
+
+        with pytest.raises(ValueError):
+            load_migrations(tmp_path)
+
+class TestMigrationRunner:
+    """Testes para a aplicação das migrações"""
+
+    @pytest.mark.unit
+    def test_applies_pending_in_order_once(self, tmp_path):
+        """Testa ordem, registro em schema_version e idempotência"""
+        write_migrations(tmp_path, {
+            '002_second.sql': 'SELECT 2;',
+            '001_first.sql': 'SELECT 1;'
+        })
+        conn = FakeConnection()
+
+        assert MigrationRunner(conn, tmp_path).run() is True
+        assert list(conn.versions) == ['001', '002']
+
+        conn.executed.clear()
+        assert MigrationRunner(conn, tmp_path).run() is True
+        assert not any(query.startswith('SELECT 1') for query, _ in conn.executed)
+
+    @pytest.mark.unit
+    def test_no_transaction_migration_runs_in_autocommit(self, tmp_path):
+        """Testa CONCURRENTLY fora de transação, refazendo índice inválido"""
+        write_migrations(tmp_path, {'001_index.sql': (
+            "-- migration: no-transaction\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_t_c ON t(c);\n"
+        )})
+        conn = FakeConnection(invalid_indexes={'idx_t_c'})
+
+        assert MigrationRunner(conn, tmp_path).run() is True
+
+        statements = {query: autocommit for query, autocommit in conn.executed}
+        create = [query for query in statements if query.endswith('IF NOT EXISTS idx_t_c ON t(c)')]
+        assert statements['DROP INDEX CONCURRENTLY IF EXISTS "idx_t_c"'] is True
+        assert len(create) == 1 and statements[create[0]] is True
+        assert '001' in conn.versions
+        assert conn.autocommit is False
+
+    @pytest.mark.unit
+    def test_missing_requirement_defers_migration(self, tmp_path):
+        """Testa que a migração e as seguintes ficam pendentes sem a tabela exigida"""
+        write_migrations(tmp_path, {
+            '001_index.sql': "-- requires: conversations.customer_protocolo\nSELECT 1;",
+            '002_other.sql': 'SELECT 2;'
+        })
+        conn = FakeConnection()
+
+        assert MigrationRunner(conn, tmp_path).run() is True
+        assert conn.versions == {}
+
+        conn.tables.add('conversations')
+        assert MigrationRunner(conn, tmp_path).run() is True
+        assert list(conn.versions) == ['001', '002']
+
+    @pytest.mark.unit
+    def test_repository_migrations_declare_table_requirements(self):
+        """Testa que migrações sobre customers/conversations não dependem de guardas silenciosas"""
+        for migration in load_migrations(MIGRATIONS_DIR)[1:7]:
+            assert migration.requires, f"{migration.version}_{migration.name} sem -- requires"
+            assert "to_regclass('public." not in migration.sql
+
+    @pytest.mark.unit
+    def test_repository_migrations_do_not_delete_rows(self):
+        """Testa que nenhuma migração apaga dados: duplicatas param a migração para o operador"""
+        migrations = load_migrations(MIGRATIONS_DIR)
+        for migration in migrations:
+            assert 'DELETE FROM' not in migration.sql.upper(), f"{migration.version}_{migration.name}"
+        assert 'RAISE EXCEPTION' in migrations[2].sql
+
+    @pytest.mark.unit
+    def test_failure_stops_and_is_not_recorded(self, tmp_path):
+        """Testa que a migração com erro não é registrada e as seguintes não rodam"""
+        write_migrations(tmp_path, {
+            '001_broken.sql': 'SELECT broken;',
+            '002_next.sql': 'SELECT 2;'
+        })
+        conn = FakeConnection(fail_on='broken')
+
+        assert MigrationRunner(conn, tmp_path).run() is False
+        assert conn.versions == {}
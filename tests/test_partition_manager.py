@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o gerenciador de partições mensais
+"""
+
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+from backend.database.partition_manager import (
+    PartitionManager, PartitionedTable, add_months, expired_partitions,
+    partition_month, partition_name
+)
+
+class FakeCursor:
+    """Cursor que responde às consultas de catálogo e registra os comandos"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.db.executed.append((query, params))
+        if 'relkind' in query:
+            self.rows = [{'relname': name} for name in self.db.partitions]
+        elif 'pg_inherits' in query:
+            self.rows = [{'relname': name} for name in sorted(self.db.partitions.get(params[0], []))]
+        elif 'create_monthly_partition' in query:
+            table, month = params
+            self.db.partitions[table].append(partition_name(table, month))
+        else:
+            self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+class FakeDatabase:
+    connected = True
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.executed = []
+
+    @contextmanager
+    def _cursor(self, positional=False, read_only=False):
+        yield FakeCursor(self)
+
+class TestPartitionNames:
+    """Testes para nomes e meses das partições"""
+
+    @pytest.mark.unit
+    def test_add_months_across_years(self):
+        """Testa soma e subtração de meses na virada do ano"""
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+        assert add_months(date(2026, 10, 1), -24) == date(2024, 10, 1)
+
+    @pytest.mark.unit
+    def test_partition_name_roundtrip(self):
+        """Testa que o mês é lido de volta do nome da partição"""
+        name = partition_name('system_logs', date(2026, 3, 1))
+        assert name == 'system_logs_2026_03'
+        assert partition_month('system_logs', name) == date(2026, 3, 1)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('name', [
+        'system_logs_default',
+        'system_logs_2026_13',
+        'conversation_events_2026_03'
+    ])
+    def test_unknown_partitions_are_ignored(self, name):
+        """Testa que DEFAULT e partições de outras tabelas não têm mês"""
+        assert partition_month('system_logs', name) is None
+
+class TestRetention:
+    """Testes para a seleção de partições expiradas"""
+
+    @pytest.mark.unit
+    def test_keeps_current_month_and_retention_window(self):
+        """Testa que só meses anteriores à janela são removidos"""
+        names = [partition_name('system_logs', date(2026, month, 1)) for month in range(1, 12)]
+        names.append('system_logs_default')
+
+        expired = expired_partitions('system_logs', names, 6, today=date(2026, 10, 18))
+
+        assert expired == ['system_logs_2026_01', 'system_logs_2026_02', 'system_logs_2026_03']
+
+    @pytest.mark.unit
+    def test_drop_expired_partitions_uses_drop_table(self):
+        """Testa que a retenção remove partições inteiras, sem DELETE"""
+        db = FakeDatabase({'system_logs': ['system_logs_2025_12', 'system_logs_2026_09', 'system_logs_default']})
+        manager = PartitionManager(db, {'system_logs': PartitionedTable('system_logs', 'created_at', 6)})
+
+        dropped = manager.drop_expired_partitions(today=date(2026, 10, 18))
+
+        assert dropped == ['system_logs_2025_12']
+        statements = [query for query, _ in db.executed]
+        assert 'DROP TABLE IF EXISTS "system_logs_2025_12"' in statements
+        assert not any('DELETE' in query for query in statements)
+
+class TestFuturePartitions:
+    """Testes para a criação antecipada de partições"""
+
+    @pytest.mark.unit
+    def test_creates_only_missing_months(self):
+        """Testa que só os meses sem partição são criados"""
+        db = FakeDatabase({'system_logs': ['system_logs_2026_10', 'system_logs_default']})
+        manager = PartitionManager(db, {'system_logs': PartitionedTable('system_logs', 'created_at', 6)})
+
+        created = manager.ensure_future_partitions(months_ahead=2, today=date(2026, 10, 18))
+
+        assert created == {'system_logs': ['system_logs_2026_11', 'system_logs_2026_12']}
+        assert manager.ensure_future_partitions(months_ahead=2, today=date(2026, 10, 18)) == {}
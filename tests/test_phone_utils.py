@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para a normalização de telefones
+"""
+
+import pytest
+
+from backend.modules.phone_utils import normalize_phone_e164
+
+class TestNormalizePhoneE164:
+    """Testes para o formato canônico E.164"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('phone', [
+        '5511999998888',
+        '+55 (11) 99999-8888',
+        '11999998888',
+        '011999998888',
+        '5511999998888@c.us'
+    ])
+    def test_equivalent_formats(self, phone):
+        """Testa formatos diferentes do mesmo número"""
+        assert normalize_phone_e164(phone) == '+5511999998888'
+
+    @pytest.mark.unit
+    def test_landline_gets_country_code(self):
+        """Testa telefone fixo nacional (10 dígitos)"""
+        assert normalize_phone_e164('(11) 3333-4444') == '+551133334444'
+
+    @pytest.mark.unit
+    def test_foreign_number_with_plus(self):
+        """Testa número estrangeiro com '+' explícito"""
+        assert normalize_phone_e164('+1 415 555 2671') == '+14155552671'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('phone', [None, '', 'abc', '12345', '+1234567890123456'])
+    def test_invalid(self, phone):
+        """Testa valores que não formam um número válido"""
+        assert normalize_phone_e164(phone) is None
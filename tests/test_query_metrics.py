@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para as métricas de consultas SQL
+"""
+
+import logging
+
+import pytest
+
+from backend.database.database_manager import CONVERSATION_ROW_TEMPLATE
+from backend.database.query_metrics import (
+    OTHER_FINGERPRINT, InstrumentedCursor, QueryMetrics, fingerprint, redact_params
+)
+
+class FakeCursor:
+    """Cursor falso com rowcount configurável"""
+
+    def __init__(self, rowcount=0, fail=False):
+        self.rowcount = rowcount
+        self.fail = fail
+        self.description = [('id',)]
+
+    def execute(self, query, params=None):
+        if self.fail:
+            raise RuntimeError('falha simulada')
+
+    def fetchall(self):
+        return [(1,)]
+
+class TestFingerprint:
+    """Testes para a normalização das instruções"""
+
+    @pytest.mark.unit
+    def test_literals_are_replaced(self):
+        """Testa que instruções com valores diferentes se agrupam"""
+        first = fingerprint("SELECT * FROM customers WHERE protocolo = '123' LIMIT 10")
+        second = fingerprint("SELECT *\n  FROM customers WHERE protocolo = 'abc''d' LIMIT 50")
+
+        assert first == second == "SELECT * FROM customers WHERE protocolo = ? LIMIT ?"
+
+    @pytest.mark.unit
+    def test_values_rows_and_lists_collapse(self):
+        """Testa lotes de VALUES e listas IN de tamanhos diferentes"""
+        small = fingerprint("INSERT INTO t (a, b) VALUES ('x', 1), ('y', NULL)")
+        large = fingerprint(b"INSERT INTO t (a, b) VALUES ('x', NULL), ('y', 2), ('z', 3)")
+
+        assert small == large
+        assert fingerprint('WHERE id IN (%s, %s, %s)') == fingerprint('WHERE id IN (%s)')
+
+    @pytest.mark.unit
+    def test_values_rows_with_nested_parentheses_collapse(self):
+        """Testa o lote de conversas (COALESCE dentro da linha) com tamanhos diferentes"""
+        values = ("'5511999999999'", "'João'", '150.5', '10', "'alta'", '0.2', "'media'",
+                  "'pagamento'", "'neutro'", '1', 'NULL', '3', "'[{\"a\": \"(oi)\"}]'")
+        row = CONVERSATION_ROW_TEMPLATE.replace('%s', '{}').format(*values)
+
+        def batch(size):
+            return ("INSERT INTO conversations (phone, last_contact) VALUES "
+                    + ', '.join([row] * size) + " ON CONFLICT (phone) DO NOTHING")
+
+        assert fingerprint(batch(2)) == fingerprint(batch(7))
+        assert fingerprint(batch(2)).endswith(
+            'VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?::jsonb), ... ON CONFLICT (phone) DO NOTHING'
+        )
+
+    @pytest.mark.unit
+    def test_keeps_identifiers_and_null_checks(self):
+        """Testa que nomes com dígitos e IS NULL não são alterados"""
+        assert fingerprint('SELECT col_1 FROM t WHERE x IS NULL AND y IS NOT NULL') == \
+            'SELECT col_1 FROM t WHERE x IS NULL AND y IS NOT NULL'
+
+class TestQueryMetrics:
+    """Testes para o registro de métricas"""
+
+    @pytest.mark.unit
+    def test_records_latency_rows_and_errors(self):
+        """Testa contadores e percentis por instrução"""
+        metrics = QueryMetrics(slow_query_ms=0)
+        for seconds in (0.002, 0.004, 0.3):
+            metrics.record("SELECT * FROM t WHERE id = 1", (1,), seconds, rows=2)
+        metrics.record("SELECT * FROM t WHERE id = 2", (2,), 0.001, error=True)
+
+        summary = metrics.get_summary()
+        statement = summary['statements'][0]
+
+        assert summary['statements_tracked'] == 1
+        assert statement['calls'] == 4
+        assert statement['errors'] == 1
+        assert statement['rows'] == 6
+        assert statement['p50_ms'] == 2.5
+        assert statement['max_ms'] == 300.0
+        assert sum(statement['histogram'].values()) == 4
+
+    @pytest.mark.unit
+    def test_slow_query_is_logged_with_redacted_params(self, caplog):
+        """Testa que o log de consulta lenta não expõe os valores"""
+        metrics = QueryMetrics(slow_query_ms=100)
+
+        with caplog.at_level(logging.WARNING, logger='backend.database.query_metrics'):
+            metrics.record("SELECT * FROM customers WHERE documento = %s", ('123.456.789-00',), 0.2)
+
+        assert metrics.slow_queries == 1
+        assert '123.456.789-00' not in caplog.text
+        assert "<str>" in caplog.text
+
+    @pytest.mark.unit
+    def test_statement_limit_groups_the_rest(self):
+        """Testa o limite de impressões digitais distintas"""
+        metrics = QueryMetrics(slow_query_ms=0, max_statements=2)
+        for table in ('a', 'b', 'c', 'd'):
+            metrics.record(f"SELECT * FROM {table}", None, 0.001)
+
+        fingerprints = [item['fingerprint'] for item in metrics.get_summary()['statements']]
+
+        assert len(fingerprints) == 3
+        assert OTHER_FINGERPRINT in fingerprints
+
+    @pytest.mark.unit
+    def test_redact_params(self):
+        """Testa ocultação de parâmetros posicionais e nomeados"""
+        assert redact_params(('a', 1, None)) == ['<str>', '<int>', '<NoneType>']
+        assert redact_params({'phone': '5511'}) == {'phone': '<str>'}
+
+class TestInstrumentedCursor:
+    """Testes para o cursor instrumentado"""
+
+    @pytest.mark.unit
+    def test_measures_execute_and_delegates(self):
+        """Testa medição do execute e acesso aos atributos do cursor original"""
+        metrics = QueryMetrics(slow_query_ms=0)
+        cursor = InstrumentedCursor(FakeCursor(rowcount=3), metrics)
+
+        cursor.execute("SELECT id FROM t WHERE id = %s", (1,))
+
+        assert cursor.fetchall() == [(1,)]
+        assert cursor.description == [('id',)]
+        assert metrics.get_summary()['statements'][0]['rows'] == 3
+
+    @pytest.mark.unit
+    def test_errors_are_counted_and_raised(self):
+        """Testa que a exceção é propagada e contada"""
+        metrics = QueryMetrics(slow_query_ms=0)
+        cursor = InstrumentedCursor(FakeCursor(fail=True), metrics)
+
+        with pytest.raises(RuntimeError):
+            cursor.execute("SELECT 1")
+
+        assert metrics.get_summary()['total_errors'] == 1
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o cache L2 no Redis
+"""
+
+import pytest
+
+from backend.modules.redis_cache import RedisCache, decode_value, encode_value
+
+class FakePipeline:
+    """Pipeline falso: acumula os comandos e executa no execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def mget(self, keys):
+        self.commands.append(lambda: [self.client.data.get(key) for key in keys])
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.client.set(key, value, ex=ex, count=False))
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [command() for command in self.commands]
+
+class FakeRedis:
+    """Cliente Redis falso em memória"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.ttls = {}
+        self.fail = fail
+        self.round_trips = 0
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError('redis fora do ar')
+
+    def get(self, key):
+        self._check()
+        self.round_trips += 1
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, count=True):
+        self._check()
+        if count:
+            self.round_trips += 1
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def delete(self, *keys):
+        self._check()
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def scan_iter(self, match=None, count=None):
+        self._check()
+        self.round_trips += 1
+        return iter([key for key in list(self.data) if key.startswith(match.rstrip('*'))])
+
+    def pipeline(self, transaction=True):
+        self._check()
+        return FakePipeline(self)
+
+class TestRedisCache:
+    """Testes para leitura e escrita no cache L2"""
+
+    @pytest.mark.unit
+    def test_serialization_compresses_large_values(self):
+        """Testa JSON compacto e compressão dos valores grandes"""
+        small = {'name': 'João', 'debt_amount': 150.5}
+        large = {'history': ['mensagem repetida'] * 100}
+
+        assert encode_value(small) == '{"name":"João","debt_amount":150.5}'.encode('utf-8')
+        assert encode_value(large).startswith(b'z')
+        assert decode_value(encode_value(small)) == small
+        assert decode_value(encode_value(large)) == large
+
+    @pytest.mark.unit
+    def test_set_get_with_ttl(self):
+        """Testa gravação com prefixo e TTL por chave"""
+        client = FakeRedis()
+        cache = RedisCache(client=client, prefix='t:', default_ttl=60)
+
+        assert cache.set('customer:1', {'name': 'Ana'})
+        assert cache.set('customer:2', {'name': 'Bia'}, ttl=5)
+
+        assert cache.get('customer:1') == {'name': 'Ana'}
+        assert cache.get('customer:3') is None
+        assert client.ttls == {'t:customer:1': 60, 't:customer:2': 5}
+        assert cache.get_metrics()['hit_rate'] == 0.5
+
+    @pytest.mark.unit
+    def test_get_many_uses_one_round_trip(self):
+        """Testa o multi-get em pipeline, com MGETs em blocos"""
+        client = FakeRedis()
+        cache = RedisCache(client=client, mget_chunk=2)
+        cache.set_many([(f"k{i}", i) for i in range(5)])
+        client.round_trips = 0
+
+        found = cache.get_many(['k0', 'k4', 'k9', 'k2'])
+
+        assert found == {'k0': 0, 'k4': 4, 'k2': 2}
+        assert client.round_trips == 1
+
+    @pytest.mark.unit
+    def test_delete_prefix_removes_only_matching_keys(self):
+        """Testa a remoção por prefixo em lotes, sem tocar nas outras chaves"""
+        client = FakeRedis()
+        cache = RedisCache(client=client, prefix='t:', mget_chunk=2)
+        cache.set_many([(f"customer:{i}", i) for i in range(5)] + [('context:1', 1)])
+
+        assert cache.delete_prefix('customer:') == 5
+
+        assert list(client.data) == ['t:context:1']
+        assert cache.get_metrics()['deletes'] == 5
+
+    @pytest.mark.unit
+    def test_redis_failures_become_misses(self):
+        """Testa que falhas do Redis viram miss e abrem o circuito"""
+        client = FakeRedis(fail=True)
+        cache = RedisCache(client=client)
+
+        for _ in range(3):
+            assert cache.get('k') is None
+        assert cache.set('k', 1) is False
+        assert cache.get_many(['a', 'b']) == {}
+
+        metrics = cache.get_metrics()
+        assert metrics['errors'] == 3
+        assert metrics['skipped'] == 2
+        assert metrics['state'] == 'open'
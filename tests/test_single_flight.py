@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para a coalescência de chamadas simultâneas
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.modules.single_flight import AsyncSingleFlight, SingleFlight
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+class TestSingleFlight:
+    """Testes para a variante com threads"""
+
+    @pytest.mark.unit
+    def test_concurrent_calls_share_one_execution(self):
+        """Testa que chamadas simultâneas executam a função uma vez"""
+        flight = SingleFlight()
+        started = threading.Event()
+        executions = []
+        results = []
+
+        def load():
+            executions.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 'cliente'
+
+        def call():
+            results.append(flight.do('11999999999', load))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(timeout=5)
+        run_concurrently(5, call)
+        leader.join(timeout=5)
+
+        assert executions == [1]
+        assert results == ['cliente'] * 6
+        assert flight.get_metrics() == {'executions': 1, 'coalesced': 5, 'in_flight': 0}
+
+    @pytest.mark.unit
+    def test_error_is_shared_and_key_released(self):
+        """Testa exceção repassada a quem espera e nova execução depois"""
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError('banco fora do ar')
+
+        with pytest.raises(RuntimeError):
+            flight.do('k', fail)
+
+        assert flight.do('k', lambda: 42) == 42
+
+class TestAsyncSingleFlight:
+    """Testes para a variante asyncio"""
+
+    @pytest.mark.unit
+    def test_concurrent_coroutines_share_one_execution(self):
+        """Testa que corrotinas simultâneas aguardam a mesma busca"""
+        flight = AsyncSingleFlight()
+        executions = []
+
+        async def load():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 'contexto'
+
+        async def run():
+            return await asyncio.gather(*(flight.do('k', load) for _ in range(5)))
+
+        assert asyncio.run(run()) == ['contexto'] * 5
+        assert executions == [1]
+        assert flight.get_metrics()['in_flight'] == 0
+
+    @pytest.mark.unit
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Testa que cancelar um chamador não cancela a busca compartilhada"""
+        flight = AsyncSingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return 'ok'
+
+        async def run():
+            first = asyncio.ensure_future(flight.do('k', load))
+            second = asyncio.ensure_future(flight.do('k', load))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == 'ok'
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o compilador de templates
+"""
+
+import pytest
+
+from backend.modules.template_compiler import CompiledTemplate, TemplateRenderer
+
+class TestCompiledTemplate:
+    """Testes para templates compilados"""
+
+    @pytest.mark.unit
+    def test_slots_detected_once(self):
+        """Testa detecção dos slots do template"""
+        template = CompiledTemplate('t', "Olá {name}! R$ {amount} - {name}")
+
+        assert template.slots == ('name', 'amount')
+
+    @pytest.mark.unit
+    def test_render_matches_format(self):
+        """Testa se a renderização equivale a str.format"""
+        source = "{name}, débito de R$ {amount:>8} há {days} dias. {{literal}}"
+        variables = {'name': 'João', 'amount': '150.00', 'days': 45}
+
+        assert CompiledTemplate('t', source).render(variables) == source.format(**variables)
+
+    @pytest.mark.unit
+    def test_missing_variable_keeps_placeholder(self):
+        """Testa variável ausente sem exceção na renderização"""
+        template = CompiledTemplate('t', "Olá {client_name}, vencimento {due_date}")
+
+        assert template.render({'client_name': 'Ana'}) == "Olá Ana, vencimento {due_date}"
+
+    @pytest.mark.unit
+    def test_missing_variable_uses_default(self):
+        """Testa valor padrão resolvido na compilação"""
+        template = CompiledTemplate('t', "Olá {name}", defaults={'name': 'Cliente'})
+
+        assert template.render({}) == "Olá Cliente"
+
+class TestTemplateRenderer:
+    """Testes para o renderizador com cache"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.renderer = TemplateRenderer(cache_size=2)
+        self.renderer.register('greeting', "Olá {name}!")
+
+    @pytest.mark.unit
+    def test_cache_hit(self):
+        """Testa reaproveitamento de renderização repetida"""
+        first = self.renderer.render('greeting', {'name': 'Ana'})
+        second = self.renderer.render('greeting', {'name': 'Ana'})
+
+        assert first == second == "Olá Ana!"
+        assert self.renderer.stats['cache_hits'] == 1
+        assert self.renderer.stats['cache_misses'] == 1
+
+    @pytest.mark.unit
+    def test_cache_key_includes_type(self):
+        """Testa que valores iguais de tipos diferentes não colidem"""
+        assert self.renderer.render('greeting', {'name': 1}) == "Olá 1!"
+        assert self.renderer.render('greeting', {'name': True}) == "Olá True!"
+
+    @pytest.mark.unit
+    def test_cache_is_bounded(self):
+        """Testa limite do cache LRU"""
+        for name in ['Ana', 'Bia', 'Caio']:
+            self.renderer.render('greeting', {'name': name})
+
+        assert self.renderer.get_stats()['cached_renders'] == 2
+
+    @pytest.mark.unit
+    def test_unhashable_values(self):
+        """Testa renderização com valores não hasheáveis"""
+        assert self.renderer.render('greeting', {'name': ['Ana']}) == "Olá ['Ana']!"
+
+    @pytest.mark.unit
+    def test_unknown_template(self):
+        """Testa template inexistente"""
+        assert self.renderer.render('missing', {}) is None
+
+    @pytest.mark.unit
+    def test_register_invalidates_cache(self):
+        """Testa que recompilar um template descarta renderizações antigas"""
+        self.renderer.render('greeting', {'name': 'Ana'})
+        self.renderer.register('greeting', "Oi {name}!")
+
+        assert self.renderer.render('greeting', {'name': 'Ana'}) == "Oi Ana!"
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes para o buffer write-behind
+"""
+
+import time
+
+import pytest
+
+from backend.modules.write_behind import WriteBehindBuffer
+
+class TestWriteBehindBuffer:
+    """Testes para coalescência, lotes, falhas e desligamento"""
+
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.batches = []
+        self.fail = False
+
+    def flush(self, entries):
+        if self.fail:
+            raise RuntimeError('banco fora do ar')
+        self.batches.append(list(entries))
+        return True
+
+    def make_buffer(self, **kwargs):
+        options = {'flush_interval': 60, 'max_batch': 10, 'max_pending': 100}
+        options.update(kwargs)
+        return WriteBehindBuffer(self.flush, lambda old, new: old + new, **options)
+
+    @pytest.mark.unit
+    def test_same_key_coalesced(self):
+        """Testa escritas da mesma chave juntadas antes do lote"""
+        buffer = self.make_buffer()
+        for value in (1, 2, 3):
+            buffer.submit('a', value)
+        buffer.submit('b', 10)
+
+        assert buffer.flush()
+        assert self.batches == [[6, 10]]
+        metrics = buffer.get_metrics()
+        assert metrics['coalesced'] == 2
+        assert metrics['coalescing_ratio'] == 0.5
+        buffer.close()
+
+    @pytest.mark.unit
+    def test_interval_flush_in_background(self):
+        """Testa gravação pela thread após o intervalo"""
+        buffer = self.make_buffer(flush_interval=0.01)
+        buffer.submit('a', 1)
+
+        deadline = time.monotonic() + 2
+        while not self.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert self.batches == [[1]]
+        assert buffer.get_metrics()['flushes'] == 1
+        buffer.close()
+
+    @pytest.mark.unit
+    def test_failed_flush_requeued_and_merged(self):
+        """Testa lote com falha devolvido antes das escritas novas"""
+        buffer = self.make_buffer()
+        buffer.submit('a', 1)
+        self.fail = True
+
+        assert not buffer.flush()
+        buffer.submit('a', 2)
+        self.fail = False
+
+        assert buffer.flush()
+        assert self.batches == [[3]]
+        assert buffer.get_metrics()['failed_flushes'] == 1
+        buffer.close()
+
+    @pytest.mark.unit
+    def test_full_buffer_flushes_in_caller(self):
+        """Testa contrapressão com o buffer cheio (sem descartar escritas)"""
+        buffer = self.make_buffer(max_batch=2, max_pending=2)
+        # Sem thread de fundo: só o chamador grava
+        buffer._start_thread = lambda: None
+        for key in ('a', 'b', 'c'):
+            buffer.submit(key, 1)
+
+        assert self.batches == [[1, 1]]
+        assert buffer.pending == 1
+        assert buffer.get_metrics()['backpressure_flushes'] == 1
+        buffer.close()
+
+    @pytest.mark.unit
+    def test_full_buffer_with_failing_flush_stays_bounded(self):
+        """Testa que o buffer cheio com gravação falhando não passa do limite"""
+        buffer = self.make_buffer(max_batch=1, max_pending=1)
+        buffer._start_thread = lambda: None
+        self.fail = True
+        for key in ('a', 'b', 'c'):
+            buffer.submit(key, 1)
+
+        metrics = buffer.get_metrics()
+        assert buffer.pending == 1
+        assert metrics['dropped'] == 2
+        # Só a primeira tentativa vai ao banco; as seguintes respeitam o intervalo
+        assert metrics['backpressure_flushes'] == 1
+        self.fail = False
+        buffer.close()
+
+    @pytest.mark.unit
+    def test_full_buffer_with_failing_flush_uses_overflow(self):
+        """Testa escritas que não cabem desviadas para o overflow"""
+        overflowed = []
+
+        def overflow(entries):
+            overflowed.extend(entries)
+            return True
+
+        buffer = self.make_buffer(max_batch=1, max_pending=1, overflow=overflow)
+        buffer._start_thread = lambda: None
+        self.fail = True
+        buffer.submit('a', 1)
+        buffer.submit('b', 2)
+
+        assert buffer.pending == 1
+        assert overflowed == [2]
+        assert buffer.get_metrics()['overflowed'] == 1
+        self.fail = False
+        assert buffer.close()
+        assert self.batches == [[1]]
+
+    @pytest.mark.unit
+    def test_close_flushes_pending(self):
+        """Testa gravação do que estiver pendente no desligamento"""
+        buffer = self.make_buffer()
+        buffer.submit('a', 1)
+
+        assert buffer.close()
+        assert self.batches == [[1]]
+        with pytest.raises(RuntimeError):
+            buffer.submit('a', 2)